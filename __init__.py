@@ -60,8 +60,8 @@ def run_atrain():
 def _print_project_info():
     """Печать информации о проекте"""
     try:
-        from .core.storage import StorageManager
-        sm = StorageManager()
+        from .core.storage import get_storage_manager
+        sm = get_storage_manager()
         project_info = sm.get_project_info()
         
         print(f"A-Train: Project directory: {project_info['project_directory']}")
@@ -128,9 +128,9 @@ def quick_write(preset_name=None, auto_increment=True, format_type="exr"):
     """
     try:
         from .core.nuke import nuke_bridge, NodeUtils
-        from .core.storage import StorageManager
+        from .core.storage import get_storage_manager
         from .core.path_builder import PathBuilder
-        from .core.utils.version import get_next_available_version
+        from .core.utils.reservation import get_version_reservations
         
         bridge = nuke_bridge()
         if not bridge.available:
@@ -142,26 +142,10 @@ def quick_write(preset_name=None, auto_increment=True, format_type="exr"):
         
         if preset_name:
             # Загружаем пресет
-            sm = StorageManager()
-            preset = sm.get_preset(preset_name)
-            if preset:
-                # Добавляем теги из пресета
-                all_tags = sm.get_all_tags()
-                tags_dict = {tag.name: tag for tag in all_tags}
-                
-                for tag_name in preset.tags:
-                    if tag_name in tags_dict:
-                        path_builder.add_tag(tags_dict[tag_name])
-                
-                # Добавляем format тег
-                from .core.models import TagData, TagType
-                format_tag = TagData(
-                    name='format',
-                    type=TagType.FORMAT,
-                    format=preset.format,
-                    padding='%04d'
-                )
-                path_builder.add_tag(format_tag)
+            resolved = get_storage_manager().resolve_preset(preset_name)
+            if resolved:
+                # Теги пресета уже привязаны и закешированы
+                path_builder.set_tags(resolved.tags)
         else:
             # Используем дефолтный путь
             from .core.models import PathContext
@@ -174,15 +158,25 @@ def quick_write(preset_name=None, auto_increment=True, format_type="exr"):
         # Строим путь
         output_path = path_builder.build_path()
         
-        # Автоинкремент если нужно
+        # Автоинкремент если нужно (с атомарным резервом версии)
+        claim = None
         if auto_increment:
-            output_path = get_next_available_version(output_path)
+            claim = get_version_reservations().reserve(output_path)
+            output_path = claim.path
         
         # Создаём Write ноду
         node_utils = NodeUtils()
         write_node = node_utils.create_write_node(output_path)
         
+        if not write_node and claim:
+            claim.release()
+        
         if write_node:
+            from .core.utils.version_index import get_version_index
+            get_version_index().record(output_path)
+            if claim:
+                claim.settle()
+            
             # Добавляем метку A-Train
             bridge.set_knob_value(write_node, 'note', f'A-Train\n{os.path.basename(output_path)}')
             
@@ -236,8 +230,8 @@ def get_next_version(path):
 def get_all_presets():
     """Получить все доступные пресеты"""
     try:
-        from .core.storage import StorageManager
-        sm = StorageManager()
+        from .core.storage import get_storage_manager
+        sm = get_storage_manager()
         return {name: preset.to_dict() for name, preset in sm.get_all_presets().items()}
     except Exception as e:
         print(f"A-Train: Error getting presets: {e}")
@@ -246,8 +240,8 @@ def get_all_presets():
 def get_all_tags():
     """Получить все доступные теги"""
     try:
-        from .core.storage import StorageManager
-        sm = StorageManager()
+        from .core.storage import get_storage_manager
+        sm = get_storage_manager()
         return [tag.to_dict() for tag in sm.get_all_tags()]
     except Exception as e:
         print(f"A-Train: Error getting tags: {e}")
@@ -321,7 +315,7 @@ if __name__ == "__main__":
         from .core.nuke import nuke_bridge
         print("✓ Nuke bridge ready")
         
-        from .core.storage import StorageManager
+        from .core.storage import get_storage_manager
         print("✓ Storage ready")
         
         from .core.path_builder import PathBuilder
@@ -5,8 +5,32 @@
 
 from .batch_processor import BatchProcessor
 from .batch_operations import BatchOperations
+from .batch_plan import BatchPlan, PlanItem, build_plan
+from .checkpoint import CheckpointJournal, list_checkpoints
+from .collision_index import CollisionIndex
+from .directory_stage import DirectoryStage, DirectoryReport
+from .progress import CancellationToken, ProgressReporter, ProgressUpdate
+from .render_executor import RenderExecutor, RenderTask, RenderOutcome
+from .render_scheduler import RenderScheduler, WriteRender, split_frame_range
 
 __all__ = [
     'BatchProcessor',
-    'BatchOperations'
+    'BatchOperations',
+    'BatchPlan',
+    'PlanItem',
+    'build_plan',
+    'CheckpointJournal',
+    'list_checkpoints',
+    'CollisionIndex',
+    'DirectoryStage',
+    'DirectoryReport',
+    'CancellationToken',
+    'ProgressReporter',
+    'ProgressUpdate',
+    'RenderExecutor',
+    'RenderTask',
+    'RenderOutcome',
+    'RenderScheduler',
+    'WriteRender',
+    'split_frame_range'
 ]
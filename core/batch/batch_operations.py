@@ -6,6 +6,9 @@
 from typing import List, Dict, Any, Optional, Callable
 
 from .batch_processor import BatchProcessor
+from .batch_plan import BatchPlan
+from .collision_index import COLLISION_POLICY_OPTION
+from .progress import CancellationToken, ProgressReporter
 from ..models import BatchOperation, BatchOperationType, BatchOperationResult
 from ..nuke import nuke_bridge
 from ..utils import event_bus
@@ -23,7 +26,9 @@ class BatchOperations:
                                preset_name: Optional[str] = None,
                                format_type: str = "exr",
                                auto_increment: bool = True,
-                               progress_callback: Optional[Callable] = None) -> BatchOperationResult:
+                               progress_callback: Optional[Callable] = None,
+                               cancel_token: Optional[CancellationToken] = None,
+                               collision_policy: Optional[str] = None) -> BatchOperationResult:
         """
         Создать Write ноды для Read нод
         
@@ -33,6 +38,8 @@ class BatchOperations:
             format_type: Формат выходных файлов
             auto_increment: Автоинкремент версий
             progress_callback: Callback для прогресса
+            cancel_token: Токен отмены из UI
+            collision_policy: Разрешение конфликтов путей: fail, suffix, version
             
         Returns:
             BatchOperationResult: Результат операции
@@ -56,7 +63,9 @@ class BatchOperations:
             source_nodes=read_nodes,
             preset_name=preset_name,
             format_type=format_type,
-            auto_increment=auto_increment
+            auto_increment=auto_increment,
+            options=_collision_options(collision_policy),
+            cancel_token=cancel_token
         )
         
         # Выполняем
@@ -66,7 +75,9 @@ class BatchOperations:
                        output_path: Optional[str] = None,
                        format_type: str = "mov",
                        frame_range: Optional[tuple] = None,
-                       progress_callback: Optional[Callable] = None) -> BatchOperationResult:
+                       progress_callback: Optional[Callable] = None,
+                       cancel_token: Optional[CancellationToken] = None,
+                       collision_policy: Optional[str] = None) -> BatchOperationResult:
         """
         Транскодировать Read ноды (создать Write + рендер)
         
@@ -76,6 +87,8 @@ class BatchOperations:
             format_type: Формат выходных файлов
             frame_range: Диапазон кадров (first, last)
             progress_callback: Callback для прогресса
+            cancel_token: Токен отмены из UI
+            collision_policy: Разрешение конфликтов путей: fail, suffix, version
             
         Returns:
             BatchOperationResult: Результат операции
@@ -103,20 +116,24 @@ class BatchOperations:
             source_nodes=read_nodes,
             format_type=format_type,
             frame_range=frame_range,
-            custom_path=output_path
+            custom_path=output_path,
+            options=_collision_options(collision_policy),
+            cancel_token=cancel_token
         )
         
         # Выполняем
         return self.processor.process_operation(operation, progress_callback)
     
     def update_write_versions(self, write_nodes: Optional[List[Any]] = None,
-                            progress_callback: Optional[Callable] = None) -> BatchOperationResult:
+                            progress_callback: Optional[Callable] = None,
+                            cancel_token: Optional[CancellationToken] = None) -> BatchOperationResult:
         """
         Обновить версии Write нод
         
         Args:
             write_nodes: Список Write нод (если None - все A-Train Write ноды)
             progress_callback: Callback для прогресса
+            cancel_token: Токен отмены из UI
             
         Returns:
             BatchOperationResult: Результат операции
@@ -137,7 +154,8 @@ class BatchOperations:
         # Создаем операцию
         operation = BatchOperation(
             operation_type=BatchOperationType.UPDATE_VERSIONS,
-            source_nodes=write_nodes
+            source_nodes=write_nodes,
+            cancel_token=cancel_token
         )
         
         # Выполняем
@@ -145,7 +163,10 @@ class BatchOperations:
     
     def render_writes(self, write_nodes: Optional[List[Any]] = None,
                      frame_range: Optional[tuple] = None,
-                     progress_callback: Optional[Callable] = None) -> BatchOperationResult:
+                     progress_callback: Optional[Callable] = None,
+                     chunk_size: Optional[int] = None,
+                     proxy_step: Optional[int] = None,
+                     cancel_token: Optional[CancellationToken] = None) -> BatchOperationResult:
         """
         Рендерить Write ноды
         
@@ -153,6 +174,9 @@ class BatchOperations:
             write_nodes: Список Write нод
             frame_range: Диапазон кадров
             progress_callback: Callback для прогресса
+            chunk_size: Кадров в куске рендера (None - автоматически)
+            proxy_step: Шаг кадров прохода для просмотра (None - без него)
+            cancel_token: Токен отмены из UI
             
         Returns:
             BatchOperationResult: Результат операции
@@ -174,12 +198,108 @@ class BatchOperations:
         operation = BatchOperation(
             operation_type=BatchOperationType.RENDER_WRITES,
             source_nodes=write_nodes,
-            frame_range=frame_range
+            frame_range=frame_range,
+            chunk_size=chunk_size,
+            proxy_step=proxy_step,
+            cancel_token=cancel_token
         )
         
         # Выполняем
         return self.processor.process_operation(operation, progress_callback)
     
+    # =====================
+    # План и выполнение
+    # =====================
+    
+    def plan_writes_for_reads(self, read_nodes: Optional[List[Any]] = None,
+                              preset_name: Optional[str] = None,
+                              format_type: str = "exr",
+                              auto_increment: bool = True,
+                              output_path: Optional[str] = None,
+                              collision_policy: Optional[str] = None) -> Optional[BatchPlan]:
+        """
+        Пробный план создания Write нод (dry-run)
+        
+        Ничего не создает и не резервирует: показывает пути, версии,
+        директории и конфликты. План можно сохранить в JSON и выполнить
+        позже через execute_plan.
+        
+        Args:
+            read_nodes: Список Read нод (если None - использует выбранные)
+            preset_name: Имя пресета для генерации путей
+            format_type: Формат выходных файлов
+            auto_increment: Автоинкремент версий
+            output_path: Базовый путь вместо пресета
+            collision_policy: Разрешение конфликтов путей: fail, suffix, version
+            
+        Returns:
+            BatchPlan или None если не удалось получить базовый путь
+        """
+        if read_nodes is None:
+            read_nodes = self.get_selected_read_nodes()
+        
+        operation = BatchOperation(
+            operation_type=BatchOperationType.CREATE_WRITE,
+            source_nodes=read_nodes or [],
+            preset_name=preset_name,
+            format_type=format_type,
+            auto_increment=auto_increment,
+            custom_path=output_path,
+            options=_collision_options(collision_policy)
+        )
+        return self.processor.plan_operation(operation)
+    
+    def execute_plan(self, plan: BatchPlan, nodes: Optional[List[Any]] = None,
+                     progress_callback: Optional[Callable] = None,
+                     cancel_token: Optional[CancellationToken] = None) -> BatchOperationResult:
+        """
+        Выполнить план (версии пробного плана резервируются перед выполнением)
+        
+        Args:
+            plan: План из plan_writes_for_reads или BatchPlan.load
+            nodes: Исходные ноды в порядке плана (если None - ищутся по именам)
+            progress_callback: Callback для прогресса
+            cancel_token: Токен отмены из UI
+            
+        Returns:
+            BatchOperationResult: Результат операции
+        """
+        progress_callback = ProgressReporter.wrap(progress_callback)
+        result = self.processor.execute_plan(plan, nodes, progress_callback,
+                                             cancel_token=cancel_token)
+        if progress_callback:
+            progress_callback.flush()
+        self.event_bus.publish('batch_operation_completed', result)
+        return result
+    
+    def resume_operation(self, checkpoint_path: Optional[str] = None,
+                         progress_callback: Optional[Callable] = None,
+                         cancel_token: Optional[CancellationToken] = None) -> Optional[BatchOperationResult]:
+        """
+        Продолжить прерванную операцию по журналу
+        
+        Args:
+            checkpoint_path: Файл журнала (если None - последний незавершенный
+                журнал проекта)
+            progress_callback: Callback для прогресса
+            cancel_token: Токен отмены из UI
+            
+        Returns:
+            BatchOperationResult или None если продолжать нечего
+        """
+        if checkpoint_path is None:
+            from .checkpoint import list_checkpoints
+            unfinished = list_checkpoints()
+            if not unfinished:
+                print("BatchOperations: No interrupted operations to resume")
+                return None
+            checkpoint_path = str(unfinished[0])
+        
+        result = self.processor.resume_operation(checkpoint_path, progress_callback, cancel_token)
+        if result is not None:
+            self.event_bus.publish('batch_operation_completed', result)
+        return result
+    
     # =====================
     # Утилиты для получения нод
     # =====================
@@ -275,6 +395,11 @@ class BatchOperations:
         self.processor.reset_stats()
 
 
+def _collision_options(collision_policy: Optional[str]) -> dict:
+    """Опции операции с политикой конфликтов путей"""
+    return {COLLISION_POLICY_OPTION: collision_policy} if collision_policy else {}
+
+
 # Глобальный экземпляр для удобства
 _batch_operations = None
 
@@ -0,0 +1,351 @@
+# atrain/core/batch/batch_plan.py
+"""
+План batch операции: все пути, версии и директории до создания нод
+"""
+
+import os
+import json
+import time
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+from .collision_index import (
+    CollisionIndex, COLLISION_POLICY_OPTION, normalize_output_path, resolve_policy
+)
+from ..models import BatchOperation
+
+
+# Версия формата сериализованного плана
+PLAN_FORMAT_VERSION = 1
+
+# Виды конфликтов выходных путей
+COLLISION_DUPLICATE = 'duplicate'  # тот же путь у другого элемента плана
+COLLISION_EXISTS = 'exists'        # файлы по пути уже есть на диске
+COLLISION_SCRIPT = 'script'        # путь уже у Write ноды в скрипте
+
+
+@dataclass
+class PlanItem:
+    """Элемент плана: одна исходная нода и ее выходной путь"""
+    source: str                         # полное имя исходной ноды
+    source_path: str = ''               # файл исходной ноды
+    clean_name: str = ''
+    output_path: Optional[str] = None
+    version: Optional[str] = None
+    directory: str = ''
+    collision: str = ''                 # COLLISION_* или пусто
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def ready(self) -> bool:
+        """Элемент можно выполнять"""
+        return bool(self.output_path) and not self.errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PlanItem':
+        known = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        return cls(**known)
+
+
+@dataclass
+class BatchPlan:
+    """
+    План batch операции
+
+    Строится без Nuke по именам и путям исходных нод: выходные пути,
+    версии (разрешенные одним проходом по директориям), директории,
+    которые нужно создать, и конфликты путей. Выполнение плана
+    (BatchProcessor.execute_plan) только создает ноды. План сериализуется
+    в JSON для просмотра и повторного использования.
+    """
+    operation_type: str
+    base_path: str
+    items: List[PlanItem] = field(default_factory=list)
+
+    # Параметры операции
+    auto_increment: bool = True
+    connect_nodes: bool = True
+    create_directories: bool = True
+    format_type: str = "exr"
+    frame_range: Optional[Tuple[int, int]] = None
+    chunk_size: Optional[int] = None
+    proxy_step: Optional[int] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    # Результат планирования
+    directories: List[str] = field(default_factory=list)  # еще не существуют
+    reserved: bool = False   # версии зарезервированы (иначе - пробный план)
+    created_at: str = ''
+    planning_time: float = 0.0
+
+    @property
+    def ready_items(self) -> List[PlanItem]:
+        """Элементы без ошибок"""
+        return [item for item in self.items if item.ready]
+
+    @property
+    def failed_items(self) -> List[PlanItem]:
+        """Элементы с ошибками"""
+        return [item for item in self.items if not item.ready]
+
+    @property
+    def collisions(self) -> List[PlanItem]:
+        """Элементы с конфликтами путей"""
+        return [item for item in self.items if item.collision]
+
+    def summary(self) -> Dict[str, Any]:
+        """Краткая сводка для UI и логов"""
+        return {
+            'operation_type': self.operation_type,
+            'items': len(self.items),
+            'ready': len(self.ready_items),
+            'failed': len(self.failed_items),
+            'collisions': len(self.collisions),
+            'directories': len(self.directories),
+            'reserved': self.reserved,
+            'planning_time': self.planning_time
+        }
+
+    # =====================
+    # Сериализация
+    # =====================
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['format_version'] = PLAN_FORMAT_VERSION
+        data['frame_range'] = list(self.frame_range) if self.frame_range else None
+        data['options'] = _json_safe(self.options)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BatchPlan':
+        version = data.get('format_version', PLAN_FORMAT_VERSION)
+        if version > PLAN_FORMAT_VERSION:
+            raise ValueError(f"Unsupported plan format version: {version}")
+
+        known = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        known['items'] = [PlanItem.from_dict(item) for item in data.get('items', [])]
+        if known.get('frame_range'):
+            known['frame_range'] = tuple(known['frame_range'])
+        return cls(**known)
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'BatchPlan':
+        return cls.from_dict(json.loads(text))
+
+    def save(self, path: str) -> bool:
+        """Сохранить план в файл"""
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.to_json())
+            return True
+        except OSError as e:
+            print(f"BatchPlan: Cannot save plan to {path}: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: str) -> Optional['BatchPlan']:
+        """Загрузить план из файла"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_json(f.read())
+        except (OSError, ValueError, TypeError) as e:
+            print(f"BatchPlan: Cannot load plan from {path}: {e}")
+            return None
+
+
+def build_plan(operation: BatchOperation, base_path: str,
+               sources: List[Tuple[str, str]],
+               reserve_versions: Optional[Callable[[List[str]], List[str]]] = None,
+               script_writes: Optional[List[Tuple[str, str]]] = None,
+               release_claim: Optional[Callable[[str], None]] = None) -> BatchPlan:
+    """
+    Построить план без обращения к Nuke
+
+    Все файловые операции пакетные: версии разрешаются одним проходом
+    (каждая директория читается один раз), существование директорий и
+    выходных файлов проверяется параллельно. Конфликты путей между
+    элементами и с Write нодами скрипта ищутся по CollisionIndex и
+    разрешаются по options['collision_policy'] (fail, suffix, version).
+
+    Args:
+        operation: Параметры операции (source_nodes не используются)
+        base_path: Базовый путь с [read_name]
+        sources: (имя ноды, путь файла ноды) для каждой исходной ноды
+        reserve_versions: Функция резервирования версий для набора путей
+            (план для выполнения); без нее версии только прогнозируются
+            (пробный план)
+        script_writes: (имя Write ноды, путь) всех Write нод скрипта
+        release_claim: Снятие резерва пути, замененного при разрешении
+            конфликта
+
+    Returns:
+        BatchPlan
+    """
+    from ..nuke import NodeUtils
+    from ..utils.version import extract_version
+
+    started = time.monotonic()
+    node_utils = NodeUtils()
+
+    plan = BatchPlan(
+        operation_type=operation.operation_type.value,
+        base_path=base_path,
+        auto_increment=operation.auto_increment,
+        connect_nodes=operation.connect_nodes,
+        create_directories=operation.create_directories,
+        format_type=operation.format_type,
+        frame_range=tuple(operation.frame_range) if operation.frame_range else None,
+        chunk_size=operation.chunk_size,
+        proxy_step=operation.proxy_step,
+        options=_json_safe(operation.options),
+        reserved=reserve_versions is not None and operation.auto_increment,
+        created_at=time.strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+    # Пути с подставленным именем источника
+    for name, source_path in sources:
+        clean_name = node_utils.extract_clean_name(source_path) if source_path else name
+        plan.items.append(PlanItem(
+            source=name,
+            source_path=source_path or '',
+            clean_name=clean_name,
+            output_path=base_path.replace('[read_name]', clean_name)
+        ))
+
+    # Версии всех элементов одним проходом
+    if operation.auto_increment:
+        paths = [item.output_path for item in plan.items]
+        if reserve_versions is not None:
+            resolved = reserve_versions(paths)
+        else:
+            from ..utils.version import resolve_next_versions
+            resolved = resolve_next_versions(paths)
+        for item, path in zip(plan.items, resolved):
+            item.output_path = path
+
+    _resolve_collisions(plan, script_writes or [], reserve_versions, release_claim)
+
+    for item in plan.items:
+        item.directory = os.path.dirname(item.output_path)
+        item.version = extract_version(item.output_path)
+
+    _check_directories(plan)
+
+    plan.planning_time = time.monotonic() - started
+    return plan
+
+
+def _resolve_collisions(plan: BatchPlan, script_writes: List[Tuple[str, str]],
+                        reserve_versions: Optional[Callable[[List[str]], List[str]]],
+                        release_claim: Optional[Callable[[str], None]]):
+    """
+    Найти и разрешить конфликты выходных путей
+
+    Индекс строится один раз по Write нодам скрипта, затем элементы плана
+    добавляются по порядку - весь поиск линейный по числу нод.
+    """
+    policy = resolve_policy(plan.options.get(COLLISION_POLICY_OPTION))
+    index = CollisionIndex.from_paths(script_writes)
+    script_names = {name for name, _path in script_writes}
+
+    reserved = []
+
+    def reserve_next(path):
+        # Следующая версия сразу резервируется
+        path = reserve_versions([path])[0]
+        reserved.append(path)
+        return path
+
+    next_version = (reserve_next if reserve_versions is not None and plan.reserved
+                    else _next_free_version)
+
+    # Владелец пути элемента - его позиция в плане: у нескольких элементов
+    # может быть один и тот же source, а конфликт между ними все равно нужен
+    for position, item in enumerate(plan.items):
+        original = item.output_path
+        resolution = index.resolve(original, position, policy, next_version)
+        if resolution.conflict is None:
+            continue
+
+        if resolution.conflict in script_names:
+            item.collision = COLLISION_SCRIPT
+            owner = f"Write node {resolution.conflict}"
+        else:
+            item.collision = COLLISION_DUPLICATE
+            owner = plan.items[resolution.conflict].source
+
+        if resolution.resolved:
+            item.output_path = resolution.path
+            item.warnings.append(
+                f"Output path is also used by {owner}, "
+                f"using {os.path.basename(resolution.path)}"
+            )
+        else:
+            item.errors.append(f"Output path is also used by {owner}")
+
+        # Резерв нужен только итоговому пути
+        if release_claim is not None:
+            for path in [original] + reserved:
+                if path != item.output_path:
+                    release_claim(path)
+        reserved.clear()
+
+
+def _next_free_version(path: str) -> str:
+    """Следующая версия пути, не ниже следующей свободной на диске"""
+    from ..utils.version import find_version, increment_version, resolve_next_versions
+
+    bumped = increment_version(path)
+    available = resolve_next_versions([path])[0]
+    bumped_span, available_span = find_version(bumped), find_version(available)
+    if bumped_span and available_span and available_span.number > bumped_span.number:
+        return available
+    return bumped
+
+
+def _check_directories(plan: BatchPlan):
+    """Найти отсутствующие директории и уже записанные выходные файлы"""
+    from ..utils.scanner import get_scanner
+    from ..utils.version_index import get_version_index
+
+    directories = sorted({item.directory for item in plan.items if item.directory})
+    scanner = get_scanner()
+    exists = scanner.exists(directories).results
+    plan.directories = [directory for directory in directories if not exists.get(directory)]
+
+    # В существующих директориях ищем уже записанные файлы тех же путей
+    existing = [directory for directory in directories if exists.get(directory)]
+    if not existing:
+        return
+
+    records = scanner.map(get_version_index().directory_records, existing).results
+    written = set()
+    for directory, directory_records in records.items():
+        for record in directory_records or []:
+            written.add(normalize_output_path(os.path.join(directory, record.pattern)))
+
+    for item in plan.items:
+        if item.collision or normalize_output_path(item.output_path) not in written:
+            continue
+        item.collision = COLLISION_EXISTS
+        item.warnings.append("Output files already exist and will be overwritten")
+
+
+def _json_safe(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Только значения, которые сериализуются в JSON"""
+    safe = {}
+    for key, value in options.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        safe[key] = value
+    return safe
@@ -5,13 +5,21 @@
 
 import os
 import time
+import uuid
+from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
 
-from ..models import BatchOperation, BatchResult, BatchOperationResult, PathContext
+from .batch_plan import BatchPlan, PlanItem, build_plan, normalize_output_path
+from .checkpoint import CheckpointJournal, ITEM_NODE_CREATED, new_checkpoint_path
+from .directory_stage import DirectoryStage, DirectoryReport
+from .progress import CancellationToken, ProgressReporter, CANCELLED_ERROR, is_cancelled
+from .render_executor import RenderTask
+from ..models import BatchOperation, BatchOperationType, BatchResult, BatchOperationResult
 from ..nuke import nuke_bridge, NodeUtils
 from ..path_builder import PathBuilder
-from ..storage import StorageManager
+from ..storage import StorageManager, get_storage_manager
 from ..utils import event_bus
+from ..utils.version import extract_version
 
 
 class BatchProcessor:
@@ -20,7 +28,6 @@ class BatchProcessor:
     def __init__(self):
         self.bridge = nuke_bridge()
         self.node_utils = NodeUtils()
-        self.storage = StorageManager()
         self.event_bus = event_bus()
         
         # Статистика операций
@@ -30,6 +37,14 @@ class BatchProcessor:
             'failed_operations': 0,
             'total_time': 0.0
         }
+        
+        # Зарезервированные версии по выходному пути (снимаются при неудаче)
+        self._claims: Dict[str, Any] = {}
+    
+    @property
+    def storage(self) -> StorageManager:
+        """Общий StorageManager текущего проекта"""
+        return get_storage_manager()
     
     def process_operation(self, operation: BatchOperation,
                          progress_callback: Optional[Callable] = None) -> BatchOperationResult:
@@ -38,12 +53,14 @@ class BatchProcessor:
         
         Args:
             operation: Операция для выполнения
-            progress_callback: Callback для прогресса (current, total, message)
+            progress_callback: Callback для прогресса (current, total, message);
+                вызовы прореживаются ProgressReporter
             
         Returns:
             BatchOperationResult: Результат операции
         """
         start_time = time.time()
+        progress_callback = ProgressReporter.wrap(progress_callback)
         result = BatchOperationResult(operation=operation)
         result.start_time = time.strftime('%Y-%m-%d %H:%M:%S')
         
@@ -81,6 +98,9 @@ class BatchProcessor:
                 result.results.append(batch_result)
         
         # Финализируем результат
+        result.cancelled = is_cancelled(operation.cancel_token)
+        if progress_callback:
+            progress_callback.flush()
         result.end_time = time.strftime('%Y-%m-%d %H:%M:%S')
         result.total_time = time.time() - start_time
         self.stats['total_time'] += result.total_time
@@ -92,14 +112,24 @@ class BatchProcessor:
     
     def _process_create_write(self, operation: BatchOperation,
                             progress_callback: Optional[Callable]) -> BatchOperationResult:
-        """Обработать создание Write нод"""
-        result = BatchOperationResult(operation=operation)
-        total = len(operation.source_nodes)
+        """Обработать создание Write нод: план, затем создание нод"""
+        result, journal = self._plan_and_execute(operation, progress_callback)
+        if journal is not None and not result.cancelled:
+            journal.finish()
+        return result
+    
+    def _plan_and_execute(self, operation: BatchOperation,
+                          progress_callback: Optional[Callable]) -> tuple:
+        """
+        Построить план с резервом версий, завести журнал и создать ноды
         
-        # Генерируем базовый путь
-        base_path = self._generate_base_path(operation)
-        if not base_path:
+        Returns:
+            (BatchOperationResult, CheckpointJournal или None)
+        """
+        plan = self.plan_operation(operation, reserve=True)
+        if plan is None:
             # Ошибка для всех нод
+            result = BatchOperationResult(operation=operation)
             for node in operation.source_nodes:
                 batch_result = BatchResult(
                     source_node=node,
@@ -107,53 +137,261 @@ class BatchProcessor:
                     errors=["Failed to generate base path"]
                 )
                 result.results.append(batch_result)
-            return result
+            return result, None
         
-        # Обрабатываем каждую ноду
-        for i, node in enumerate(operation.source_nodes):
+        journal = self._start_checkpoint(operation, plan)
+        result = self.execute_plan(plan, operation.source_nodes, progress_callback,
+                                   journal, operation.cancel_token)
+        return result, journal
+    
+    # =====================
+    # План и выполнение
+    # =====================
+    
+    def plan_operation(self, operation: BatchOperation,
+                       reserve: bool = False) -> Optional[BatchPlan]:
+        """
+        Построить план создания Write нод
+        
+        Из Nuke читаются только имена и пути исходных и Write нод, остальное
+        (версии, директории, конфликты) вычисляется пакетно без Nuke.
+        
+        Args:
+            operation: Операция create_write или transcode_reads
+            reserve: Зарезервировать версии; без этого план пробный (dry-run)
+                и ничего не меняет
+        
+        Returns:
+            BatchPlan или None если не удалось получить базовый путь
+        """
+        base_path = self._generate_base_path(operation)
+        if not base_path:
+            return None
+        
+        sources = [self._plan_source(node) for node in operation.source_nodes]
+        script_writes = self._script_write_paths()
+        if reserve:
+            return build_plan(operation, base_path, sources, self._reserve_versions,
+                              script_writes, self._release_claim)
+        return build_plan(operation, base_path, sources, script_writes=script_writes)
+    
+    def execute_plan(self, plan: BatchPlan, nodes: Optional[List[Any]] = None,
+                     progress_callback: Optional[Callable] = None,
+                     journal: Optional[CheckpointJournal] = None,
+                     cancel_token: Optional[CancellationToken] = None) -> BatchOperationResult:
+        """
+        Выполнить план: создать Write ноды
+        
+        Args:
+            plan: План (в том числе загруженный из JSON)
+            nodes: Исходные ноды в порядке элементов плана; если не заданы,
+                ищутся по именам
+            progress_callback: Callback для прогресса (current, total, message)
+            journal: Журнал выполнения; для загруженного журнала уже
+                созданные Write ноды используются повторно
+            cancel_token: Отмена; проверяется перед каждым элементом
+        
+        Returns:
+            BatchOperationResult: Результат операции
+        """
+        if nodes is None:
+            nodes = [self._find_node(item.source) for item in plan.items]
+        elif len(nodes) != len(plan.items):
+            raise ValueError(f"Plan has {len(plan.items)} items but {len(nodes)} nodes were given")
+        
+        operation = BatchOperation(
+            operation_type=plan.operation_type,
+            source_nodes=list(nodes),
+            auto_increment=plan.auto_increment,
+            connect_nodes=plan.connect_nodes,
+            create_directories=plan.create_directories,
+            format_type=plan.format_type,
+            frame_range=plan.frame_range,
+            chunk_size=plan.chunk_size,
+            proxy_step=plan.proxy_step,
+            custom_path=plan.base_path,
+            options=dict(plan.options),
+            cancel_token=cancel_token
+        )
+        result = BatchOperationResult(operation=operation)
+        total = len(plan.items)
+        atrain_writes = None
+        
+        if journal is not None:
+            result.checkpoint_path = str(journal.path)
+        
+        # Пробный план: версии могли занять после планирования
+        if plan.auto_increment and not plan.reserved:
+            self._reserve_plan(plan)
+        
+        # Все выходные директории создаются и проверяются до первой ноды
+        if progress_callback:
+            progress_callback(0, total, "Preparing output directories")
+        directories = DirectoryStage.from_options(plan.options, plan.create_directories).run(
+            item.output_path for item in plan.items if item.ready
+        )
+        
+        for i, (item, node) in enumerate(zip(plan.items, nodes)):
+            if is_cancelled(cancel_token):
+                # С журналом резерв версии нужен для продолжения
+                if journal is None:
+                    self._release_claim(item.output_path)
+                result.results.append(BatchResult(
+                    source_node=node,
+                    success=False,
+                    source_name=item.clean_name,
+                    errors=[CANCELLED_ERROR]
+                ))
+                continue
+            
             if progress_callback:
-                node_name = self.node_utils.get_node_file_info(node)['clean_name']
-                progress_callback(i, total, f"Processing: {node_name}")
+                progress_callback(i, total, f"Processing: {item.clean_name}")
+            
+            batch_result = BatchResult(source_node=node, success=False,
+                                       source_name=item.clean_name)
+            batch_result.warnings.extend(item.warnings)
+            batch_result.metadata['version'] = item.version
+            
+            adopted = None
+            if journal is not None and journal.resumed and item.ready:
+                if atrain_writes is None:
+                    atrain_writes = self._atrain_writes_by_path()
+                adopted = self._adopt_write(i, item, journal, atrain_writes)
+            
+            directory_error = directories.error_for(item.output_path) if item.ready else ''
+            
+            if not item.ready:
+                batch_result.errors.extend(item.errors or ["No output path planned"])
+                self._release_claim(item.output_path)
+            elif directory_error:
+                batch_result.add_error(directory_error)
+                self._release_claim(item.output_path)
+            elif adopted is not None:
+                # Нода создана до сбоя
+                batch_result.success = True
+                batch_result.created_node = adopted
+                batch_result.output_path = item.output_path
+                batch_result.metadata['resumed'] = True
+                self._settle_claim(item.output_path)
+            elif node is None:
+                batch_result.add_error(f"Source node not found: {item.source}")
+                self._release_claim(item.output_path)
+            else:
+                self._create_write_for_node(node, item.output_path,
+                                            plan.connect_nodes, batch_result)
+                if journal is not None and batch_result.success:
+                    journal.node_created(i, self._node_name(batch_result.created_node))
             
-            batch_result = self._create_write_for_node(node, base_path, operation)
             result.results.append(batch_result)
             
             if progress_callback:
                 status = "Success" if batch_result.success else "Failed"
                 progress_callback(i + 1, total, f"{status}: {batch_result.source_name}")
         
+        result.cancelled = is_cancelled(cancel_token)
         return result
     
-    def _create_write_for_node(self, node: Any, base_path: str,
-                              operation: BatchOperation) -> BatchResult:
-        """Создать Write ноду для конкретной ноды"""
-        batch_result = BatchResult(source_node=node, success=False)
+    def _plan_source(self, node: Any) -> tuple:
+        """Имя и путь исходной ноды для плана"""
+        try:
+            name = self._node_name(node)
+        except Exception:
+            name = str(node)
+        return name, self.bridge.get_knob_value(node, 'file', '')
+    
+    def _script_write_paths(self) -> List[tuple]:
+        """Имена и пути всех Write нод скрипта для поиска конфликтов"""
+        writes = []
+        for node in self.bridge.get_all_nodes('Write'):
+            path = self.bridge.get_knob_value(node, 'file', '')
+            if path:
+                writes.append((self._node_name(node), path))
+        return writes
+    
+    def _find_node(self, name: str) -> Optional[Any]:
+        """Найти ноду по полному имени"""
+        if not self.bridge.available:
+            return None
+        try:
+            return self.bridge.nuke.toNode(name)
+        except Exception:
+            return None
+    
+    def _reserve_plan(self, plan: BatchPlan):
+        """Зарезервировать версии пробного плана перед выполнением"""
+        items = plan.ready_items
+        paths = self._reserve_versions([item.output_path for item in items])
+        
+        for item, path in zip(items, paths):
+            if path != item.output_path:
+                item.warnings.append(
+                    f"Version changed since planning: {os.path.basename(item.output_path)}"
+                    f" -> {os.path.basename(path)}"
+                )
+                item.output_path = path
+                item.version = extract_version(path)
+        plan.reserved = True
+    
+    def _reserve_versions(self, paths: List[str]) -> List[str]:
+        """Зарезервировать следующие версии путей и запомнить резервы"""
+        from ..utils.reservation import get_version_reservations
         
+        claims = get_version_reservations().reserve_many(paths)
+        for claim in claims:
+            if claim.reserved:
+                self._claims[claim.path] = claim
+        return [claim.path for claim in claims]
+    
+    def _release_claim(self, path: Optional[str]):
+        """Снять резерв версии, если путь так и не был использован"""
+        claim = self._claims.pop(path, None) if path else None
+        if claim:
+            claim.release()
+    
+    def _settle_claim(self, path: Optional[str]):
+        """Путь использован нодой: метку уберет cleanup(), когда появятся файлы версии"""
+        claim = self._claims.pop(path, None) if path else None
+        if claim:
+            claim.settle()
+    
+    @staticmethod
+    def _cleanup_claims(paths: List[str]):
+        """Убрать метки версий в директориях отрендеренных путей"""
+        from ..utils.reservation import get_version_reservations
+        from ..utils.version import find_version
+        
+        directories = set()
+        for path in paths:
+            span = find_version(path) if path else None
+            if span is not None:
+                directories.add(span.component(path)[0])
+        
+        reservations = get_version_reservations()
+        for directory in sorted(directories):
+            reservations.cleanup(directory)
+    
+    def _create_write_for_node(self, node: Any, output_path: str,
+                              connect_nodes: bool, batch_result: BatchResult):
+        """
+        Создать Write ноду для конкретной ноды
+        
+        Args:
+            output_path: Выходной путь из плана
+            connect_nodes: Подключить Write к исходной ноде
+            batch_result: Результат элемента, заполняется на месте
+        """
         try:
-            # Получаем информацию о ноде
-            node_info = self.node_utils.get_node_file_info(node)
-            batch_result.source_name = node_info['clean_name']
-            
-            # Создаем контекст
-            context = PathContext()
-            context.read_name = node_info['clean_name']
-            context.read_path = node_info['file_path']
-            context.auto_increment = operation.auto_increment
-            
-            # Заменяем placeholder в пути
-            output_path = base_path.replace('[read_name]', context.read_name)
-            
-            # Автоинкремент если нужно
-            if operation.auto_increment:
-                from ..utils.version import get_next_available_version
-                output_path = get_next_available_version(output_path)
-            
             # Создаем Write ноду
             write_node = self.node_utils.create_write_node(output_path)
             
             if write_node:
+                # Версия занята - следующий элемент пакета получит более новую
+                from ..utils.version_index import get_version_index
+                get_version_index().record(output_path)
+                self._settle_claim(output_path)
+                
                 # Подключаем к источнику
-                if operation.connect_nodes:
+                if connect_nodes:
                     write_node.setInput(0, node)
                     self.node_utils.position_node_relative(write_node, node, 0, 80)
                 
@@ -168,11 +406,11 @@ class BatchProcessor:
                 batch_result.output_path = output_path
             else:
                 batch_result.add_error("Failed to create Write node")
-            
+                self._release_claim(output_path)
+        
         except Exception as e:
             batch_result.add_error(f"Error: {e}")
-        
-        return batch_result
+            self._release_claim(output_path)
     
     def _generate_base_path(self, operation: BatchOperation) -> Optional[str]:
         """Генерировать базовый путь для операции"""
@@ -181,32 +419,17 @@ class BatchProcessor:
                 return operation.custom_path
             
             if operation.preset_name:
-                # Используем пресет
-                preset = self.storage.get_preset(operation.preset_name)
-                if not preset:
+                # Используем пресет с готовой цепочкой тегов
+                resolved = self.storage.resolve_preset(
+                    operation.preset_name, operation.format_type
+                )
+                if not resolved:
                     print(f"BatchProcessor: Preset '{operation.preset_name}' not found")
                     return None
                 
                 # Строим путь из пресета
                 path_builder = PathBuilder()
-                
-                # Добавляем теги из пресета
-                all_tags = self.storage.get_all_tags()
-                tags_dict = {tag.name: tag for tag in all_tags}
-                
-                for tag_name in preset.tags:
-                    if tag_name in tags_dict:
-                        path_builder.add_tag(tags_dict[tag_name])
-                
-                # Добавляем format тег
-                from ..models import TagData, TagType
-                format_tag = TagData(
-                    name='format',
-                    type=TagType.FORMAT,
-                    format=operation.format_type,
-                    padding='%04d'
-                )
-                path_builder.add_tag(format_tag)
+                path_builder.set_tags(resolved.tags)
                 
                 return path_builder.build_path()
             
@@ -229,33 +452,66 @@ class BatchProcessor:
         """Обработать транскодирование Read нод"""
         # Транскодирование = создание Write + рендер
         # Сначала создаем Write ноды
-        result = self._process_create_write(operation, progress_callback)
+        result, journal = self._plan_and_execute(operation, progress_callback)
+        self._render_created_writes(result, progress_callback, journal)
+        
+        result.cancelled = is_cancelled(operation.cancel_token)
+        if journal is not None and not result.cancelled:
+            journal.finish()
+        return result
+    
+    def _render_created_writes(self, result: BatchOperationResult,
+                               progress_callback: Optional[Callable],
+                               journal: Optional[CheckpointJournal] = None):
+        """Отрендерить созданные Write ноды и добавить ошибки рендера в результат"""
+        operation = result.operation
         
         # Если есть успешные Write ноды, запускаем рендер
-        writes_to_render = []
-        for batch_result in result.results:
-            if batch_result.success and batch_result.created_node:
-                writes_to_render.append(batch_result.created_node)
+        created = [
+            batch_result for batch_result in result.results
+            if batch_result.success and batch_result.created_node
+        ]
+        
+        if created and operation.frame_range and is_cancelled(operation.cancel_token):
+            # Отменено до рендера - ноды созданы, но не отрендерены
+            for batch_result in created:
+                batch_result.success = False
+                batch_result.add_error(CANCELLED_ERROR)
         
-        if writes_to_render and operation.frame_range:
+        elif created and operation.frame_range:
             # Создаем операцию рендера
             render_op = BatchOperation(
                 operation_type='render_writes',
-                source_nodes=writes_to_render,
-                frame_range=operation.frame_range
+                source_nodes=[batch_result.created_node for batch_result in created],
+                frame_range=operation.frame_range,
+                chunk_size=operation.chunk_size,
+                proxy_step=operation.proxy_step,
+                options=operation.options,
+                cancel_token=operation.cancel_token
             )
             
             # Рендерим
-            render_result = self._process_render_writes(render_op, progress_callback)
+            render_result = self._process_render_writes(render_op, progress_callback, journal)
             
-            # Объединяем результаты
-            for i, render_res in enumerate(render_result.results):
-                if i < len(result.results):
-                    if not render_res.success:
-                        result.results[i].success = False
-                        result.results[i].errors.extend(render_res.errors)
-        
-        return result
+            # Объединяем результаты по имени Write, а не по позиции в списке
+            render_results = {
+                self._node_name(render_res.source_node): render_res
+                for render_res in render_result.results if render_res.source_node is not None
+            }
+            for batch_result in created:
+                render_res = render_results.get(self._node_name(batch_result.created_node))
+                if render_res is None:
+                    batch_result.success = False
+                    batch_result.add_error("No render result for Write node")
+                    continue
+                batch_result.warnings.extend(render_res.warnings)
+                batch_result.metadata.update(render_res.metadata)
+                if not render_res.success:
+                    batch_result.success = False
+                    batch_result.errors.extend(render_res.errors)
+            
+            # Файлы версий появились - метки резерва больше не нужны
+            self._cleanup_claims([batch_result.output_path for batch_result in created])
     
     def _process_update_versions(self, operation: BatchOperation,
                                progress_callback: Optional[Callable]) -> BatchOperationResult:
@@ -263,7 +519,22 @@ class BatchProcessor:
         result = BatchOperationResult(operation=operation)
         total = len(operation.source_nodes)
         
+        # Новые версии всех нод разрешаются одним проходом по директориям
+        # и резервируются атомарно
+        current_paths = [
+            self.bridge.get_knob_value(node, 'file', '') for node in operation.source_nodes
+        ]
+        resolved = iter(self._reserve_versions([path for path in current_paths if path]))
+        next_paths = [next(resolved) if path else '' for path in current_paths]
+        
         for i, node in enumerate(operation.source_nodes):
+            if is_cancelled(operation.cancel_token):
+                self._release_claim(next_paths[i])
+                result.results.append(BatchResult(
+                    source_node=node, success=False, errors=[CANCELLED_ERROR]
+                ))
+                continue
+            
             if progress_callback:
                 progress_callback(i, total, f"Updating: {node.name()}")
             
@@ -271,18 +542,20 @@ class BatchProcessor:
             
             try:
                 # Получаем текущий путь
-                current_path = self.bridge.get_knob_value(node, 'file', '')
+                current_path = current_paths[i]
                 if not current_path:
                     batch_result.add_error("No file path found")
                     result.results.append(batch_result)
                     continue
                 
                 # Обновляем версию
-                from ..utils.version import get_next_available_version
-                new_path = get_next_available_version(current_path)
+                new_path = next_paths[i]
                 
                 if new_path != current_path:
                     self.bridge.set_knob_value(node, 'file', new_path)
+                    from ..utils.version_index import get_version_index
+                    get_version_index().record(new_path)
+                    self._settle_claim(new_path)
                     batch_result.success = True
                     batch_result.output_path = new_path
                     
@@ -296,11 +569,13 @@ class BatchProcessor:
                             new_note += f"\n{version}"
                         self.bridge.set_knob_value(node, 'note', new_note)
                 else:
+                    self._release_claim(new_path)
                     batch_result.add_warning("No version update needed")
                     batch_result.success = True
                 
             except Exception as e:
                 batch_result.add_error(f"Error updating version: {e}")
+                self._release_claim(next_paths[i])
             
             result.results.append(batch_result)
             
@@ -311,35 +586,93 @@ class BatchProcessor:
         return result
     
     def _process_render_writes(self, operation: BatchOperation,
-                             progress_callback: Optional[Callable]) -> BatchOperationResult:
-        """Обработать рендер Write нод"""
-        result = BatchOperationResult(operation=operation)
-        total = len(operation.source_nodes)
+                             progress_callback: Optional[Callable],
+                             journal: Optional[CheckpointJournal] = None) -> BatchOperationResult:
+        """
+        Обработать рендер Write нод
         
+        По умолчанию каждая Write рендерится отдельным процессом Nuke
+        (RenderExecutor), процессы работают параллельно. Режим
+        options['render_mode'] = 'local' рендерит последовательно в текущей сессии.
+        С журналом готовые куски пропускаются, а начало и конец каждого
+        куска записываются. Выходные директории всех Write готовятся заранее,
+        Write с недоступной директорией не рендерятся.
+        """
         if not operation.frame_range:
             # Используем диапазон из проекта
             operation.frame_range = self.bridge.get_frame_range()
         
+        from .render_executor import RENDER_MODE_LOCAL, RENDER_MODE_SUBPROCESS
+        mode = operation.options.get('render_mode', RENDER_MODE_SUBPROCESS)
+        
+        directories = DirectoryStage.from_options(operation.options, operation.create_directories).run(
+            self.bridge.get_knob_value(node, 'file', '') for node in operation.source_nodes
+        )
+        
+        if mode == RENDER_MODE_LOCAL:
+            return self._render_writes_locally(operation, progress_callback, journal, directories)
+        
+        return self._render_writes_in_subprocesses(operation, progress_callback, journal, directories)
+    
+    def _render_writes_locally(self, operation: BatchOperation,
+                               progress_callback: Optional[Callable],
+                               journal: Optional[CheckpointJournal] = None,
+                               directories: Optional[DirectoryReport] = None) -> BatchOperationResult:
+        """Последовательный рендер в текущей сессии"""
+        result = BatchOperationResult(operation=operation)
+        total = len(operation.source_nodes)
         first_frame, last_frame = operation.frame_range
         
         for i, node in enumerate(operation.source_nodes):
+            if is_cancelled(operation.cancel_token):
+                result.results.append(BatchResult(
+                    source_node=node, success=False, errors=[CANCELLED_ERROR]
+                ))
+                continue
+            
             if progress_callback:
                 progress_callback(i, total, f"Rendering: {node.name()}")
             
             batch_result = BatchResult(source_node=node, success=False)
             batch_result.operation_time = time.time()
+            write_name = self._node_name(node)
+            frames = f"{first_frame}-{last_frame}"
+            
+            directory_error = directories.error_for(
+                self.bridge.get_knob_value(node, 'file', '')
+            ) if directories else ''
+            if directory_error:
+                batch_result.add_error(directory_error)
+                result.results.append(batch_result)
+                continue
             
             try:
-                # Выполняем рендер
-                success = self.bridge.execute_node(node, first_frame, last_frame)
+                if journal is not None and journal.chunk_done(write_name, frames):
+                    # Отрендерено до сбоя
+                    success = True
+                    batch_result.metadata['frames_skipped'] = last_frame - first_frame + 1
+                else:
+                    if journal is not None:
+                        journal.render_started(write_name, frames)
+                    
+                    # Выполняем рендер
+                    success = self.bridge.execute_node(node, first_frame, last_frame)
+                    
+                    if success:
+                        batch_result.metadata['frames_rendered'] = last_frame - first_frame + 1
+                        if journal is not None:
+                            journal.render_chunk_done(write_name, frames)
+                            journal.render_done(write_name)
                 
                 if success:
                     batch_result.success = True
                     batch_result.output_path = self.bridge.get_knob_value(node, 'file', '')
-                    batch_result.metadata['frames_rendered'] = last_frame - first_frame + 1
                 else:
                     batch_result.add_error("Render failed")
                 
+            except Exception as e:
+                batch_result.add_error(f"Render error: {e}")
+            
             batch_result.operation_time = time.time() - batch_result.operation_time
             result.results.append(batch_result)
             
@@ -349,6 +682,294 @@ class BatchProcessor:
         
         return result
     
+    def _render_writes_in_subprocesses(self, operation: BatchOperation,
+                                       progress_callback: Optional[Callable],
+                                       journal: Optional[CheckpointJournal] = None,
+                                       directories: Optional[DirectoryReport] = None) -> BatchOperationResult:
+        """Параллельный рендер внешними процессами"""
+        result = BatchOperationResult(operation=operation)
+        
+        script, temporary = self._script_for_render(operation)
+        if not script:
+            for node in operation.source_nodes:
+                result.results.append(BatchResult(
+                    source_node=node,
+                    success=False,
+                    errors=["Cannot save the script for background rendering"]
+                ))
+            return result
+        
+        try:
+            self._render_script_in_subprocesses(operation, script, result, progress_callback,
+                                                journal, directories)
+        finally:
+            if temporary:
+                try:
+                    os.remove(script)
+                except OSError:
+                    pass
+        
+        return result
+    
+    def _render_script_in_subprocesses(self, operation: BatchOperation, script: str,
+                                       result: BatchOperationResult,
+                                       progress_callback: Optional[Callable],
+                                       journal: Optional[CheckpointJournal],
+                                       directories: Optional[DirectoryReport]):
+        """Отрендерить Write ноды операции из сохраненного скрипта"""
+        from .render_executor import RenderExecutor
+        from .render_scheduler import RenderScheduler, WriteRender, merge_chunk_outcomes
+        
+        writes = []
+        batch_results = {}
+        for node in operation.source_nodes:
+            batch_result = BatchResult(source_node=node, success=False)
+            batch_result.output_path = self.bridge.get_knob_value(node, 'file', '')
+            result.results.append(batch_result)
+            
+            directory_error = directories.error_for(batch_result.output_path) if directories else ''
+            if directory_error:
+                batch_result.add_error(directory_error)
+                continue
+            
+            write_name = self._node_name(node)
+            batch_results[write_name] = batch_result
+            first_frame, last_frame = self._write_frame_range(node, operation.frame_range)
+            writes.append(WriteRender(
+                write=write_name,
+                script=script,
+                first=first_frame,
+                last=last_frame,
+                output_path=batch_result.output_path
+            ))
+        
+        # Длинные диапазоны делятся на куски, куски идут от длинных к коротким
+        scheduler = RenderScheduler(operation.chunk_size, operation.proxy_step)
+        executor = RenderExecutor.from_options(operation.options)
+        
+        if journal is None:
+            outcomes = scheduler.run(executor, writes, progress_callback,
+                                     cancel_token=operation.cancel_token)
+        else:
+            # Куски должны совпадать с кусками до сбоя - размер берется из журнала
+            if 'chunk_size' not in journal.meta:
+                journal.set_meta(chunk_size=scheduler.resolve_chunk_size(writes, executor.workers))
+            scheduler.chunk_size = journal.meta['chunk_size']
+            
+            disk_frames = {}
+            
+            def chunk_finished(outcome):
+                if outcome.success:
+                    journal.render_chunk_done(outcome.task.write, outcome.task.frames)
+            
+            outcomes = scheduler.run(
+                executor, writes, progress_callback,
+                skip=lambda task: self._chunk_complete(task, journal, disk_frames),
+                started_callback=lambda task: journal.render_started(task.write, task.frames),
+                finished_callback=chunk_finished,
+                cancel_token=operation.cancel_token
+            )
+        
+        for write_name, write_outcomes in outcomes.items():
+            merge_chunk_outcomes(batch_results[write_name], write_outcomes)
+            if journal is not None and batch_results[write_name].success:
+                journal.render_done(write_name)
+    
+    def _write_frame_range(self, node: Any, default: tuple) -> tuple:
+        """Диапазон Write: собственный (use_limit) или диапазон операции"""
+        try:
+            if self.bridge.get_knob_value(node, 'use_limit', False):
+                first = int(self.bridge.get_knob_value(node, 'first', default[0]))
+                last = int(self.bridge.get_knob_value(node, 'last', default[1]))
+                if first <= last:
+                    return first, last
+        except (TypeError, ValueError):
+            pass
+        return tuple(default)
+    
+    def _script_for_render(self, operation: BatchOperation) -> tuple:
+        """
+        Скрипт для внешних процессов рендера
+        
+        Процессы читают скрипт с диска, а только что созданные Write ноды
+        есть лишь в открытой сессии. Открытый скрипт художника не
+        перезаписывается: его текущее состояние сохраняется во временную
+        копию в директории хранилища (.atrain/render_scripts), которая
+        удаляется после рендера. options['save_script'] = True вместо этого
+        сохраняет сам скрипт (nuke.scriptSave). Готовый путь можно передать
+        в options['render_script'].
+        
+        Returns:
+            (путь к скрипту или None, временная ли это копия)
+        """
+        script = operation.options.get('render_script')
+        if script:
+            return script, False
+        
+        if not self.bridge.available:
+            return None, False
+        
+        nuke = self.bridge.nuke
+        try:
+            if operation.options.get('save_script', False):
+                script = nuke.root().name()
+                if not script or script == 'Root':
+                    return None, False
+                nuke.scriptSave()
+                return script, False
+            
+            from ..storage.file_storage import resolve_storage_directory
+            
+            render_dir = Path(resolve_storage_directory()) / 'render_scripts'
+            render_dir.mkdir(parents=True, exist_ok=True)
+            script = str(render_dir / f"render_{os.getpid()}_{uuid.uuid4().hex[:12]}.nk")
+            
+            # Сохраняет копию, не меняя имя и состояние открытого скрипта
+            nuke.scriptSaveToTemp(script)
+            return script, True
+        except Exception as e:
+            print(f"BatchProcessor: Cannot save script for render: {e}")
+            return None, False
+    
+    # =====================
+    # Продолжение после сбоя
+    # =====================
+    
+    def resume_operation(self, checkpoint_path: str,
+                         progress_callback: Optional[Callable] = None,
+                         cancel_token: Optional[CancellationToken] = None) -> Optional[BatchOperationResult]:
+        """
+        Продолжить операцию по журналу
+        
+        Готовые элементы пропускаются: Write ноды, записанные в журнал или
+        найденные по метке A-Train и пути, используются повторно, куски
+        рендера, завершенные по журналу или уже лежащие на диске целиком,
+        не рендерятся заново.
+        
+        Args:
+            checkpoint_path: Файл журнала
+            progress_callback: Callback для прогресса (current, total, message)
+            cancel_token: Отмена; отмененную операцию можно продолжить снова
+        
+        Returns:
+            BatchOperationResult или None если журнал не читается
+        """
+        journal = CheckpointJournal.load(checkpoint_path)
+        if journal is None:
+            return None
+        
+        start_time = time.time()
+        progress_callback = ProgressReporter.wrap(progress_callback)
+        result = self.execute_plan(journal.plan, None, progress_callback, journal, cancel_token)
+        result.start_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))
+        
+        if journal.plan.operation_type == 'transcode_reads':
+            self._render_created_writes(result, progress_callback, journal)
+        
+        result.cancelled = is_cancelled(cancel_token)
+        if not result.cancelled:
+            journal.finish()
+        if progress_callback:
+            progress_callback.flush()
+        
+        result.end_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        result.total_time = time.time() - start_time
+        return result
+    
+    def _start_checkpoint(self, operation: BatchOperation,
+                          plan: BatchPlan) -> Optional[CheckpointJournal]:
+        """
+        Завести журнал операции
+        
+        По умолчанию журнал ведется для transcode_reads; options['checkpoint']
+        включает или отключает его явно, options['checkpoint_path'] задает файл.
+        """
+        enabled = operation.options.get(
+            'checkpoint', operation.operation_type == BatchOperationType.TRANSCODE_READS
+        )
+        if not enabled:
+            return None
+        
+        try:
+            path = operation.options.get('checkpoint_path') or new_checkpoint_path(
+                operation.operation_type.value
+            )
+            return CheckpointJournal.create(path, plan)
+        except OSError as e:
+            print(f"BatchProcessor: Cannot create checkpoint journal: {e}")
+            return None
+    
+    def _adopt_write(self, index: int, item: PlanItem, journal: CheckpointJournal,
+                     atrain_writes: Dict[str, Any]) -> Optional[Any]:
+        """
+        Найти Write ноду элемента, созданную до сбоя
+        
+        Сначала по имени из журнала, затем среди A-Train Write нод по пути
+        (нода могла быть создана, но не успеть попасть в журнал).
+        """
+        target = normalize_output_path(item.output_path)
+        
+        if journal.reached(index, ITEM_NODE_CREATED):
+            node = self._find_node(journal.write_name(index))
+            if node is not None:
+                path = self.bridge.get_knob_value(node, 'file', '')
+                if path and normalize_output_path(path) == target:
+                    return node
+        
+        node = atrain_writes.get(target)
+        if node is not None:
+            journal.node_created(index, self._node_name(node))
+        return node
+    
+    def _atrain_writes_by_path(self) -> Dict[str, Any]:
+        """A-Train Write ноды скрипта по нормализованному пути"""
+        writes = {}
+        for node in self.bridge.get_all_nodes('Write'):
+            if 'A-Train' not in self.bridge.get_knob_value(node, 'note', ''):
+                continue
+            path = self.bridge.get_knob_value(node, 'file', '')
+            if path:
+                writes.setdefault(normalize_output_path(path), node)
+        return writes
+    
+    def _chunk_complete(self, task: RenderTask, journal: CheckpointJournal,
+                        disk_frames: Dict[str, Dict[str, set]]) -> bool:
+        """
+        Кусок рендера уже готов
+        
+        Готов, если завершен по журналу или (при продолжении) все его
+        кадры уже есть на диске. Найденный на диске кусок записывается в
+        журнал как завершенный.
+        
+        Args:
+            disk_frames: Кеш сканирования: директория -> шаблон -> кадры
+        """
+        if journal.chunk_done(task.write, task.frames):
+            return True
+        if not journal.resumed or not task.output_path:
+            return False
+        
+        pattern = normalize_output_path(task.output_path)
+        directory = os.path.dirname(pattern)
+        if directory not in disk_frames:
+            from ..utils.sequences import scan_sequences
+            records = scan_sequences(directory) if os.path.isdir(directory) else []
+            disk_frames[directory] = {
+                normalize_output_path(os.path.join(directory, record.pattern)): set(record.frames)
+                for record in records
+            }
+        
+        existing = disk_frames[directory].get(pattern, set())
+        if all(frame in existing for frame in range(task.first, task.last + 1, task.step)):
+            journal.render_chunk_done(task.write, task.frames)
+            return True
+        return False
+    
+    @staticmethod
+    def _node_name(node: Any) -> str:
+        """Полное имя ноды"""
+        return node.fullName() if hasattr(node, 'fullName') else node.name()
+    
     def validate_nodes(self, nodes: List[Any], expected_class: str = None) -> Dict[str, List[Any]]:
         """Валидировать ноды перед операцией"""
         valid = []
@@ -0,0 +1,281 @@
+# atrain/core/batch/checkpoint.py
+"""
+Журнал выполнения batch операции для продолжения после сбоя
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set
+
+from .batch_plan import BatchPlan
+
+
+# Версия формата журнала
+CHECKPOINT_FORMAT_VERSION = 1
+
+# Расширение файлов журналов
+CHECKPOINT_SUFFIX = '.checkpoint.jsonl'
+
+# Состояния элемента (по порядку)
+ITEM_PLANNED = 'planned'
+ITEM_NODE_CREATED = 'node_created'
+ITEM_RENDER_STARTED = 'render_started'
+ITEM_RENDER_DONE = 'render_done'
+
+_STATE_ORDER = {
+    ITEM_PLANNED: 0,
+    ITEM_NODE_CREATED: 1,
+    ITEM_RENDER_STARTED: 2,
+    ITEM_RENDER_DONE: 3
+}
+
+
+class CheckpointJournal:
+    """
+    Журнал элементов batch операции в формате JSON Lines
+
+    Первая строка - заголовок с планом (все элементы в состоянии planned),
+    дальше по одной короткой строке на событие: нода создана, кусок рендера
+    начат или закончен, рендер элемента завершен. Каждая запись дописывается
+    с fsync, поэтому после сбоя Nuke журнал содержит все завершенные шаги.
+    Недописанная последняя строка при чтении отбрасывается.
+    """
+
+    def __init__(self, path: Path, plan: BatchPlan):
+        """
+        Args:
+            path: Файл журнала
+            plan: План операции
+        """
+        self.path = Path(path)
+        self.plan = plan
+        self.meta: Dict[str, Any] = {}
+        self.finished = False
+        self.resumed = False
+
+        self._lock = threading.Lock()
+        self._states: Dict[int, str] = {}
+        self._writes: Dict[int, str] = {}
+        self._chunks_done: Dict[int, Set[str]] = {}
+        self._index_by_write: Dict[str, int] = {}
+
+    # =====================
+    # Создание и загрузка
+    # =====================
+
+    @classmethod
+    def create(cls, path: Path, plan: BatchPlan) -> 'CheckpointJournal':
+        """Создать журнал для плана (заголовок пишется сразу с fsync)"""
+        journal = cls(path, plan)
+        journal.path.parent.mkdir(parents=True, exist_ok=True)
+
+        header = {
+            'type': 'header',
+            'format_version': CHECKPOINT_FORMAT_VERSION,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'plan': plan.to_dict()
+        }
+        with open(journal.path, 'wb') as f:
+            f.write(_encode(header))
+            f.flush()
+            os.fsync(f.fileno())
+
+        return journal
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['CheckpointJournal']:
+        """
+        Загрузить журнал и восстановить состояние элементов
+
+        Returns:
+            CheckpointJournal или None если журнал не читается
+        """
+        path = Path(path)
+        try:
+            with open(path, 'rb') as f:
+                lines = f.readlines()
+        except OSError as e:
+            print(f"CheckpointJournal: Cannot read {path}: {e}")
+            return None
+
+        try:
+            header = json.loads(lines[0])
+            if header.get('format_version', 0) > CHECKPOINT_FORMAT_VERSION:
+                raise ValueError(f"unsupported format version {header['format_version']}")
+            plan = BatchPlan.from_dict(header['plan'])
+        except (IndexError, KeyError, ValueError, TypeError) as e:
+            print(f"CheckpointJournal: Invalid journal {path}: {e}")
+            return None
+
+        journal = cls(path, plan)
+        journal.resumed = True
+
+        valid_size = len(lines[0])
+        for line in lines[1:]:
+            # Недописанная строка (сбой во время записи) - останавливаемся
+            if not line.endswith(b'\n'):
+                break
+            try:
+                journal._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"CheckpointJournal: Skipping corrupt record in {path.name}: {e}")
+            valid_size += len(line)
+
+        # Отрезаем недописанный хвост, иначе новая запись склеится с ним
+        if valid_size < sum(len(line) for line in lines):
+            os.truncate(path, valid_size)
+
+        return journal
+
+    # =====================
+    # Состояние
+    # =====================
+
+    def state(self, index: int) -> str:
+        """Состояние элемента"""
+        return self._states.get(index, ITEM_PLANNED)
+
+    def reached(self, index: int, state: str) -> bool:
+        """Элемент дошел до состояния state"""
+        return _STATE_ORDER[self.state(index)] >= _STATE_ORDER[state]
+
+    def write_name(self, index: int) -> Optional[str]:
+        """Имя созданной Write ноды элемента"""
+        return self._writes.get(index)
+
+    def index_for_write(self, write_name: str) -> Optional[int]:
+        """Элемент, которому принадлежит Write нода"""
+        return self._index_by_write.get(write_name)
+
+    def chunk_done(self, write_name: str, frames: str) -> bool:
+        """Кусок рендера Write уже завершен"""
+        index = self.index_for_write(write_name)
+        if index is None:
+            return False
+        return self.reached(index, ITEM_RENDER_DONE) or frames in self._chunks_done.get(index, ())
+
+    # =====================
+    # Запись событий
+    # =====================
+
+    def node_created(self, index: int, write_name: str):
+        """Write нода элемента создана"""
+        self._append({'i': index, 's': ITEM_NODE_CREATED, 'w': write_name})
+
+    def render_started(self, write_name: str, frames: str):
+        """Процесс рендера куска запущен"""
+        index = self.index_for_write(write_name)
+        if index is not None:
+            self._append({'i': index, 's': ITEM_RENDER_STARTED, 'f': frames})
+
+    def render_chunk_done(self, write_name: str, frames: str):
+        """Кусок рендера успешно завершен"""
+        index = self.index_for_write(write_name)
+        if index is not None:
+            self._append({'i': index, 's': ITEM_RENDER_DONE, 'f': frames})
+
+    def render_done(self, write_name: str):
+        """Все куски рендера элемента завершены"""
+        index = self.index_for_write(write_name)
+        if index is not None:
+            self._append({'i': index, 's': ITEM_RENDER_DONE})
+
+    def set_meta(self, **values):
+        """Сохранить параметры выполнения (например, размер куска рендера)"""
+        self._append({'m': values})
+
+    def finish(self):
+        """Операция завершена целиком"""
+        self._append({'finished': True})
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _append(self, record: Dict[str, Any]):
+        """Дописать запись с fsync и применить ее"""
+        payload = _encode(record)
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]):
+        """Применить запись к состоянию"""
+        if 'm' in record:
+            self.meta.update(record['m'])
+            return
+        if record.get('finished'):
+            self.finished = True
+            return
+
+        index = int(record['i'])
+        state = record['s']
+        if state not in _STATE_ORDER:
+            raise ValueError(f"unknown state {state}")
+
+        if state == ITEM_NODE_CREATED:
+            self._writes[index] = record['w']
+            self._index_by_write[record['w']] = index
+
+        if 'f' in record:
+            # События кусков двигают элемент не дальше render_started
+            if state == ITEM_RENDER_DONE:
+                self._chunks_done.setdefault(index, set()).add(record['f'])
+            state = ITEM_RENDER_STARTED
+
+        if _STATE_ORDER[state] > _STATE_ORDER[self.state(index)]:
+            self._states[index] = state
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def checkpoint_directory() -> Path:
+    """Директория журналов текущего проекта (.atrain/checkpoints)"""
+    from ..storage.file_storage import resolve_storage_directory
+    return Path(resolve_storage_directory()) / 'checkpoints'
+
+
+def new_checkpoint_path(operation_type: str) -> Path:
+    """Путь нового журнала"""
+    stamp = time.strftime('%Y%m%d_%H%M%S')
+    return checkpoint_directory() / f"{stamp}_{operation_type}_{os.getpid()}{CHECKPOINT_SUFFIX}"
+
+
+def list_checkpoints(include_finished: bool = False) -> List[Path]:
+    """
+    Журналы текущего проекта, новые первыми
+
+    Args:
+        include_finished: Включать журналы завершенных операций
+    """
+    directory = checkpoint_directory()
+    try:
+        paths = sorted(directory.glob(f'*{CHECKPOINT_SUFFIX}'), reverse=True)
+    except OSError:
+        return []
+
+    if include_finished:
+        return paths
+
+    unfinished = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                # Признак завершения - последняя запись
+                f.seek(max(0, os.fstat(f.fileno()).st_size - 64))
+                if b'"finished":true' in f.read():
+                    continue
+        except OSError:
+            continue
+        unfinished.append(path)
+    return unfinished
@@ -0,0 +1,171 @@
+# atrain/core/batch/collision_index.py
+"""
+Индекс выходных путей для поиска конфликтов между Write нодами и планом
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+# Разрешение конфликтов выходных путей
+COLLISION_POLICY_FAIL = 'fail'         # элемент получает ошибку
+COLLISION_POLICY_SUFFIX = 'suffix'     # к имени файла добавляется _2, _3...
+COLLISION_POLICY_VERSION = 'version'   # версия поднимается до свободной
+
+COLLISION_POLICIES = (COLLISION_POLICY_FAIL, COLLISION_POLICY_SUFFIX, COLLISION_POLICY_VERSION)
+
+DEFAULT_COLLISION_POLICY = COLLISION_POLICY_FAIL
+
+# Опция операции с политикой
+COLLISION_POLICY_OPTION = 'collision_policy'
+
+# Сколько вариантов пробовать до отказа
+DEFAULT_MAX_ATTEMPTS = 100
+
+# Имя файла: основа, затем необязательные шаблон кадров и расширение
+_NAME_PARTS = re.compile(r'^(?P<stem>.*?)(?P<tail>(?:[._](?:%0?\d*d|#+))?(?:\.[^.]*)?)$')
+
+
+@dataclass
+class CollisionResolution:
+    """Результат добавления пути в индекс"""
+    path: Optional[str]             # итоговый путь (исходный или измененный)
+    conflict: Optional[Any] = None  # владелец занятого пути, None - конфликта не было
+
+    @property
+    def resolved(self) -> bool:
+        """Путь в индексе: конфликта не было или он разрешен"""
+        return self.path is not None
+
+
+class CollisionIndex:
+    """
+    Индекс занятых выходных путей
+
+    Пути приводятся к нормальной форме (normalize_output_path) и хранятся в
+    словаре нормальная форма -> владелец, поэтому проверка и добавление стоят
+    O(1), а индекс по всем Write нодам скрипта и элементам плана строится за
+    один проход без попарного сравнения.
+    """
+
+    def __init__(self):
+        self._owners: Dict[str, Any] = {}
+
+    @classmethod
+    def from_paths(cls, owned_paths: Iterable[Tuple[Any, str]]) -> 'CollisionIndex':
+        """
+        Индекс из пар (владелец, путь)
+
+        При повторе пути владельцем остается первый.
+        """
+        index = cls()
+        for owner, path in owned_paths:
+            if path:
+                index.add(path, owner)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def __contains__(self, path: str) -> bool:
+        return normalize_output_path(path) in self._owners
+
+    def owner(self, path: str) -> Optional[Any]:
+        """Владелец пути или None"""
+        return self._owners.get(normalize_output_path(path))
+
+    def add(self, path: str, owner: Any) -> Optional[Any]:
+        """
+        Занять путь
+
+        Повторное добавление тем же владельцем конфликтом не считается,
+        поэтому владелец должен быть уникален для каждого претендента
+        (например, позиция элемента плана, а не имя его источника).
+
+        Returns:
+            Владелец, если путь уже занят (индекс не меняется), иначе None
+        """
+        existing = self._owners.setdefault(normalize_output_path(path), owner)
+        return None if existing == owner else existing
+
+    def resolve(self, path: str, owner: Any, policy: str = DEFAULT_COLLISION_POLICY,
+                next_version: Optional[Callable[[str], str]] = None,
+                max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> CollisionResolution:
+        """
+        Занять путь, разрешив конфликт по политике
+
+        Args:
+            path: Выходной путь
+            owner: Владелец пути
+            policy: COLLISION_POLICY_*
+            next_version: Следующая версия пути для COLLISION_POLICY_VERSION
+                (по умолчанию increment_version; при резервировании -
+                резерв следующей версии)
+            max_attempts: Сколько вариантов пробовать
+
+        Returns:
+            CollisionResolution; при конфликте, который не удалось разрешить
+            (или политике fail), path равен None
+        """
+        conflict = self.add(path, owner)
+        if conflict is None:
+            return CollisionResolution(path)
+
+        if policy == COLLISION_POLICY_SUFFIX:
+            candidates = (_with_suffix(path, number) for number in range(2, max_attempts + 2))
+        elif policy == COLLISION_POLICY_VERSION:
+            candidates = _bumped_versions(path, next_version, max_attempts)
+        else:
+            return CollisionResolution(None, conflict)
+
+        for candidate in candidates:
+            if self.add(candidate, owner) is None:
+                return CollisionResolution(candidate, conflict)
+
+        return CollisionResolution(None, conflict)
+
+
+def resolve_policy(value: Optional[str]) -> str:
+    """Проверенная политика (неизвестная заменяется политикой по умолчанию)"""
+    if not value:
+        return DEFAULT_COLLISION_POLICY
+    if value not in COLLISION_POLICIES:
+        print(f"CollisionIndex: Unknown collision policy {value!r}, using {DEFAULT_COLLISION_POLICY}")
+        return DEFAULT_COLLISION_POLICY
+    return value
+
+
+def normalize_output_path(path: str) -> str:
+    """Путь для сравнения: #### и %4d приводятся к %04d"""
+    path = re.sub(r'#+', lambda m: _frame_token(len(m.group(0))), path)
+    path = re.sub(r'%(\d+)d', lambda m: _frame_token(int(m.group(1))), path)
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _frame_token(padding: int) -> str:
+    return f"%0{padding}d" if padding > 1 else '%d'
+
+
+def _with_suffix(path: str, number: int) -> str:
+    """plate_v01.%04d.exr -> plate_v01_2.%04d.exr"""
+    directory, name = os.path.split(path)
+    parts = _NAME_PARTS.match(name)
+    return os.path.join(directory, f"{parts.group('stem')}_{number}{parts.group('tail')}")
+
+
+def _bumped_versions(path: str, next_version: Optional[Callable[[str], str]],
+                     max_attempts: int):
+    """Последовательные версии пути"""
+    if next_version is None:
+        from ..utils.version import increment_version
+        next_version = increment_version
+
+    candidate = path
+    for _attempt in range(max_attempts):
+        bumped = next_version(candidate)
+        if not bumped or bumped == candidate:
+            return
+        candidate = bumped
+        yield candidate
@@ -0,0 +1,245 @@
+# atrain/core/batch/directory_stage.py
+"""
+Подготовка выходных директорий batch операции до создания нод и рендера
+"""
+
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from ..utils.scanner import ParallelScanner, get_scanner
+
+
+# Минимум свободного места на разделе (МБ); переменная окружения и опция
+MIN_FREE_SPACE_ENV = 'ATRAIN_MIN_FREE_SPACE_MB'
+MIN_FREE_SPACE_OPTION = 'min_free_space_mb'
+
+DEFAULT_MIN_FREE_SPACE_MB = 1024
+
+_MB = 1024 * 1024
+
+
+@dataclass
+class DirectoryStatus:
+    """Состояние одной выходной директории"""
+    path: str
+    created: bool = False
+    mount: str = ''
+    error: str = ''
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+@dataclass
+class MountStatus:
+    """Свободное место на разделе"""
+    mount: str
+    free_bytes: Optional[int] = None
+    error: str = ''
+
+
+@dataclass
+class DirectoryReport:
+    """Результат подготовки директорий"""
+    directories: Dict[str, DirectoryStatus] = field(default_factory=dict)
+    mounts: Dict[str, MountStatus] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def created(self) -> List[str]:
+        """Созданные директории"""
+        return [path for path, status in self.directories.items() if status.created]
+
+    @property
+    def failed(self) -> Dict[str, str]:
+        """Директория -> ошибка"""
+        return {path: status.error for path, status in self.directories.items() if status.error}
+
+    def error_for(self, output_path: Optional[str]) -> str:
+        """Ошибка директории выходного пути (пустая строка если все в порядке)"""
+        if not output_path:
+            return ''
+        status = self.directories.get(_directory_key(output_path))
+        if status is None or status.ok:
+            return ''
+        return f"Output directory {status.path}: {status.error}"
+
+
+class DirectoryStage:
+    """
+    Этап подготовки выходных директорий
+
+    Собирает уникальные директории выходных путей всей операции, создает
+    недостающие одним параллельным проходом (os.makedirs через общий
+    ParallelScanner), проверяет право записи и свободное место - по одному
+    запросу на раздел, а не на директорию. Ошибки возвращаются по
+    директориям, чтобы процессор отметил элементы до создания нод и рендера.
+    """
+
+    def __init__(self, create: bool = True, min_free_bytes: Optional[int] = None,
+                 scanner: Optional[ParallelScanner] = None):
+        """
+        Args:
+            create: Создавать недостающие директории (иначе это ошибка)
+            min_free_bytes: Минимум свободного места на разделе
+                (по умолчанию ATRAIN_MIN_FREE_SPACE_MB или 1 ГБ, 0 - не проверять)
+            scanner: Пул для файловых операций (по умолчанию глобальный)
+        """
+        self.create = create
+        if min_free_bytes is None:
+            min_free_bytes = _env_free_space_mb() * _MB
+        self.min_free_bytes = max(0, int(min_free_bytes))
+        self.scanner = scanner or get_scanner()
+
+        self._mount_cache: Dict[str, str] = {}
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def from_options(cls, options: dict, create: bool = True) -> 'DirectoryStage':
+        """Этап с настройками из options операции (min_free_space_mb)"""
+        value = options.get(MIN_FREE_SPACE_OPTION)
+        min_free_bytes = None
+        if value is not None:
+            try:
+                min_free_bytes = float(value) * _MB
+            except (TypeError, ValueError):
+                print(f"DirectoryStage: Ignoring invalid {MIN_FREE_SPACE_OPTION}={value!r}")
+        return cls(create=create, min_free_bytes=min_free_bytes)
+
+    def run(self, output_paths: Iterable[Optional[str]]) -> DirectoryReport:
+        """
+        Подготовить директории выходных путей
+
+        Args:
+            output_paths: Выходные пути элементов (пустые пропускаются)
+
+        Returns:
+            DirectoryReport
+        """
+        started = time.monotonic()
+        report = DirectoryReport()
+
+        directories = {}
+        for path in output_paths:
+            if path:
+                directory = os.path.dirname(path)
+                if directory:
+                    directories.setdefault(_directory_key(path), directory)
+
+        if not directories:
+            return report
+
+        # Создание и проверка записи - параллельно по директориям
+        scan = self.scanner.map(self._prepare, directories.values())
+        for key, directory in directories.items():
+            status = scan.results.get(directory)
+            if status is None:
+                error = scan.errors.get(directory) or "Timed out preparing directory"
+                status = DirectoryStatus(directory, error=error)
+            report.directories[key] = status
+
+        self._check_free_space(report)
+
+        report.elapsed = time.monotonic() - started
+        return report
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _prepare(self, directory: str) -> DirectoryStatus:
+        """Создать директорию при необходимости и проверить запись"""
+        status = DirectoryStatus(directory)
+
+        if not os.path.isdir(directory):
+            if not self.create:
+                status.error = "does not exist"
+                return status
+            try:
+                os.makedirs(directory, exist_ok=True)
+                status.created = True
+            except OSError as e:
+                status.error = f"cannot be created: {e.strerror or e}"
+                return status
+
+        if not os.access(directory, os.W_OK | os.X_OK):
+            status.error = "is not writable"
+            return status
+
+        status.mount = self._mount_point(directory)
+        return status
+
+    def _check_free_space(self, report: DirectoryReport):
+        """Проверить свободное место один раз на раздел"""
+        if not self.min_free_bytes:
+            return
+
+        mounts = sorted({status.mount for status in report.directories.values()
+                         if status.ok and status.mount})
+        usage = self.scanner.map(shutil.disk_usage, mounts)
+
+        for mount in mounts:
+            mount_status = MountStatus(mount)
+            if mount in usage.results:
+                mount_status.free_bytes = usage.results[mount].free
+            else:
+                # Размер раздела неизвестен - не блокируем операцию
+                mount_status.error = usage.errors.get(mount, "Timed out")
+                print(f"DirectoryStage: Cannot check free space on {mount}: {mount_status.error}")
+            report.mounts[mount] = mount_status
+
+        for status in report.directories.values():
+            mount_status = report.mounts.get(status.mount)
+            if not status.ok or mount_status is None or mount_status.free_bytes is None:
+                continue
+            if mount_status.free_bytes < self.min_free_bytes:
+                status.error = (
+                    f"not enough free space on {status.mount} "
+                    f"({mount_status.free_bytes // _MB} MB free, "
+                    f"{self.min_free_bytes // _MB} MB required)"
+                )
+
+    def _mount_point(self, directory: str) -> str:
+        """Точка монтирования директории (с кешем по пройденным родителям)"""
+        path = os.path.realpath(directory)
+        visited = []
+
+        while True:
+            with self._cache_lock:
+                cached = self._mount_cache.get(path)
+            if cached is not None:
+                mount = cached
+                break
+            visited.append(path)
+            parent = os.path.dirname(path)
+            if parent == path or os.path.ismount(path):
+                mount = path
+                break
+            path = parent
+
+        with self._cache_lock:
+            for visited_path in visited:
+                self._mount_cache[visited_path] = mount
+        return mount
+
+
+def _directory_key(output_path: str) -> str:
+    """Ключ директории выходного пути для сравнения"""
+    return os.path.normcase(os.path.normpath(os.path.dirname(output_path)))
+
+
+def _env_free_space_mb() -> float:
+    """Минимум свободного места из переменной окружения"""
+    value = os.environ.get(MIN_FREE_SPACE_ENV)
+    if not value:
+        return DEFAULT_MIN_FREE_SPACE_MB
+    try:
+        return float(value)
+    except ValueError:
+        print(f"DirectoryStage: Ignoring invalid {MIN_FREE_SPACE_ENV}={value!r}")
+        return DEFAULT_MIN_FREE_SPACE_MB
@@ -0,0 +1,87 @@
+# atrain/core/batch/fake_render.py
+"""
+Заменитель nuke -x для проверки рендера без Nuke
+
+Принимает те же аргументы, что и команда рендера по умолчанию, печатает
+строки в духе Nuke и (если передан --output) создает пустые файлы кадров:
+
+    RenderExecutor(command=[sys.executable, fake_render.__file__, '-x',
+                            '-F', '{frames}', '-X', '{write}',
+                            '--output', '{output}', '{script}'])
+
+Переменные окружения:
+    ATRAIN_FAKE_RENDER_DELAY - секунд на кадр (по умолчанию 0)
+    ATRAIN_FAKE_RENDER_FAIL  - имена Write через запятую, рендер которых падает
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from typing import List, Optional
+
+
+def parse_frames(frames: str) -> List[int]:
+    """Разобрать 1001-1100 или 1001-1100x10"""
+    match = re.match(r'^(-?\d+)(?:-(-?\d+))?(?:x(\d+))?$', frames)
+    if not match:
+        raise ValueError(f"Invalid frame range: {frames}")
+    first = int(match.group(1))
+    last = int(match.group(2)) if match.group(2) else first
+    step = int(match.group(3)) if match.group(3) else 1
+    return list(range(first, last + 1, step))
+
+
+def frame_path(pattern: str, frame: int) -> str:
+    """Путь кадра для шаблона с %04d или ####"""
+    match = re.search(r'%0?(\d*)d', pattern)
+    if match:
+        return pattern[:match.start()] + f"{frame:0{match.group(1) or 1}d}" + pattern[match.end():]
+    match = re.search(r'#+', pattern)
+    if match:
+        return pattern[:match.start()] + f"{frame:0{len(match.group(0))}d}" + pattern[match.end():]
+    return pattern
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Fake Nuke render process')
+    parser.add_argument('-x', action='store_true')
+    parser.add_argument('-m', dest='threads')
+    parser.add_argument('-F', dest='frames', required=True)
+    parser.add_argument('-X', dest='write', required=True)
+    parser.add_argument('--output', default='')
+    parser.add_argument('script', nargs='?', default='')
+    args, _unknown = parser.parse_known_args(argv)
+
+    delay = float(os.environ.get('ATRAIN_FAKE_RENDER_DELAY', '0') or 0)
+    failing = {name for name in os.environ.get('ATRAIN_FAKE_RENDER_FAIL', '').split(',') if name}
+
+    try:
+        frames = parse_frames(args.frames)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    for frame in frames:
+        if args.write in failing:
+            print(f"ERROR: {args.write}: simulated render failure on frame {frame}", file=sys.stderr)
+            return 1
+
+        if delay:
+            time.sleep(delay)
+
+        if args.output:
+            path = frame_path(args.output, frame)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            open(path, 'wb').close()
+
+        print(f"Writing {frame_path(args.output, frame) if args.output else args.write} "
+              f"frame {frame}", flush=True)
+
+    print(f"Total render time: {len(frames) * delay:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# atrain/core/batch/progress.py
+"""
+Отмена batch операций и прогресс с ограничением частоты
+"""
+
+import time
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+# Не больше стольких обновлений прогресса в секунду
+DEFAULT_MAX_RATE = 20.0
+
+# Ошибка элементов, не выполненных из-за отмены
+CANCELLED_ERROR = "Cancelled"
+
+
+class CancellationToken:
+    """
+    Флаг отмены операции
+
+    UI вызывает cancel(), процессор проверяет флаг между элементами и
+    кусками рендера: уже начатый элемент доводится до конца, остальные
+    получают ошибку CANCELLED_ERROR. Потокобезопасен.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ''
+
+    def cancel(self, reason: str = ''):
+        """Запросить отмену"""
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Отмена запрошена"""
+        return self._event.is_set()
+
+
+def is_cancelled(token: Optional[CancellationToken]) -> bool:
+    """Проверка, допускающая отсутствие токена"""
+    return token is not None and token.cancelled
+
+
+@dataclass
+class ProgressUpdate:
+    """Состояние прогресса для UI"""
+    current: int
+    total: int
+    message: str = ''
+    elapsed: float = 0.0              # секунд с начала этапа
+    throughput: float = 0.0           # элементов в секунду
+    eta: Optional[float] = None       # секунд до конца, None - неизвестно
+
+    @property
+    def percent(self) -> float:
+        if self.total <= 0:
+            return 0.0
+        return min(100.0, self.current * 100.0 / self.total)
+
+    @property
+    def finished(self) -> bool:
+        return self.total > 0 and self.current >= self.total
+
+    def format_eta(self) -> str:
+        """ETA в виде 1:05:30 / 05:30 или пустая строка"""
+        if self.eta is None:
+            return ''
+        seconds = int(round(self.eta))
+        hours, rest = divmod(seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        if hours:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes:02d}:{seconds:02d}"
+
+
+class ProgressReporter:
+    """
+    Обертка над progress_callback с ограничением частоты
+
+    Вызывается так же, как обычный callback: reporter(current, total, message).
+    Обновления чаще max_rate в секунду отбрасываются (кроме первого и
+    последнего), поэтому перерисовка диалога не зависит от числа элементов.
+    К каждому обновлению добавляются скорость и ETA: callback с
+    detailed=True получает ProgressUpdate, иначе - (current, total, message).
+    Смена total или откат current начинает новый этап (например, рендер
+    после создания нод) со своим временем и скоростью.
+    """
+
+    def __init__(self, callback: Optional[Callable], max_rate: float = DEFAULT_MAX_RATE,
+                 detailed: bool = False, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            callback: Получатель обновлений
+            max_rate: Максимум обновлений в секунду (0 - без ограничения)
+            detailed: Передавать ProgressUpdate вместо (current, total, message)
+            clock: Источник времени (для тестов)
+        """
+        self.callback = callback
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.detailed = detailed
+        self.clock = clock
+
+        self.last_update: Optional[ProgressUpdate] = None
+        self.delivered = 0
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._phase_start: Optional[float] = None
+        self._phase_total: Optional[int] = None
+        self._last_current = 0
+        self._last_delivery: Optional[float] = None
+        self._pending = False
+
+    @classmethod
+    def wrap(cls, callback: Optional[Callable], **kwargs) -> Optional['ProgressReporter']:
+        """Обернуть callback (уже обернутый возвращается как есть)"""
+        if callback is None or isinstance(callback, cls):
+            return callback
+        return cls(callback, **kwargs)
+
+    def __call__(self, current: int, total: int, message: str = ''):
+        now = self.clock()
+
+        with self._lock:
+            if self._phase_total != total or current < self._last_current:
+                self._phase_start = now
+                self._phase_total = total
+                self._last_delivery = None
+            self._last_current = current
+
+            update = self._make_update(current, total, message, now)
+            self.last_update = update
+
+            due = (
+                self._last_delivery is None or
+                update.finished or
+                now - self._last_delivery >= self.min_interval
+            )
+            if not due:
+                self.dropped += 1
+                self._pending = True
+                return
+
+            self._last_delivery = now
+            self._pending = False
+            self.delivered += 1
+
+        self._deliver(update)
+
+    def flush(self):
+        """Доставить последнее отброшенное обновление"""
+        with self._lock:
+            if not self._pending or self.last_update is None:
+                return
+            self._pending = False
+            self._last_delivery = self.clock()
+            self.delivered += 1
+            update = self.last_update
+
+        self._deliver(update)
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _make_update(self, current: int, total: int, message: str, now: float) -> ProgressUpdate:
+        """Обновление со скоростью и ETA текущего этапа"""
+        elapsed = now - self._phase_start
+        throughput = current / elapsed if elapsed > 0 and current > 0 else 0.0
+        eta = None
+        if throughput > 0 and total >= current:
+            eta = (total - current) / throughput
+        return ProgressUpdate(current, total, message, elapsed, throughput, eta)
+
+    def _deliver(self, update: ProgressUpdate):
+        """Передать обновление получателю (вне блокировки)"""
+        if self.callback is None:
+            return
+        try:
+            if self.detailed:
+                self.callback(update)
+            else:
+                self.callback(update.current, update.total, update.message)
+        except Exception as e:
+            print(f"ProgressReporter: Error in progress callback: {e}")
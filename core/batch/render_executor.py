@@ -0,0 +1,283 @@
+# atrain/core/batch/render_executor.py
+"""
+Параллельный рендер Write нод во внешних процессах Nuke
+"""
+
+import os
+import shlex
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .progress import CANCELLED_ERROR, is_cancelled
+
+
+# Переменные окружения с настройками по умолчанию
+RENDER_COMMAND_ENV = 'ATRAIN_RENDER_COMMAND'
+RENDER_WORKERS_ENV = 'ATRAIN_RENDER_WORKERS'
+NUKE_EXECUTABLE_ENV = 'ATRAIN_NUKE_EXECUTABLE'
+
+# Команда рендера. Подстановки: {nuke} {script} {write} {frames} {first}
+# {last} {step} {threads} {output}
+DEFAULT_RENDER_COMMAND = ['{nuke}', '-x', '-m', '{threads}', '-F', '{frames}',
+                          '-X', '{write}', '{script}']
+
+# Режимы рендера в BatchProcessor (operation.options['render_mode'])
+RENDER_MODE_SUBPROCESS = 'subprocess'  # внешние процессы через RenderExecutor
+RENDER_MODE_LOCAL = 'local'            # execute_node в текущей сессии
+
+# Проходы рендера
+RENDER_PASS_PROXY = 'proxy'  # кадры с шагом для быстрого просмотра
+RENDER_PASS_FULL = 'full'    # все кадры
+
+
+@dataclass
+class RenderTask:
+    """Один вызов рендера: Write нода и диапазон кадров"""
+    write: str
+    script: str
+    first: int
+    last: int
+    step: int = 1
+    output_path: str = ''
+    key: Any = None  # к какому результату относится задача (по умолчанию write)
+    render_pass: str = RENDER_PASS_FULL
+    chunk: int = 0   # номер куска диапазона Write
+
+    def __post_init__(self):
+        if self.key is None:
+            self.key = self.write
+
+    @property
+    def frames(self) -> str:
+        """Диапазон в формате командной строки Nuke: 1001-1100 или 1001-1100x10"""
+        frames = f"{self.first}-{self.last}"
+        if self.step > 1:
+            frames += f"x{self.step}"
+        return frames
+
+    @property
+    def frame_count(self) -> int:
+        """Количество кадров задачи"""
+        return len(range(self.first, self.last + 1, self.step))
+
+
+@dataclass
+class RenderOutcome:
+    """Результат одного процесса рендера"""
+    task: RenderTask
+    command: List[str]
+    returncode: Optional[int] = None  # None - процесс не запустился или прерван
+    stdout: str = ''
+    stderr: str = ''
+    elapsed: float = 0.0
+    error: str = ''
+    skipped: bool = False  # кадры уже отрендерены, процесс не запускался
+
+    @property
+    def success(self) -> bool:
+        """Процесс завершился с кодом 0"""
+        return self.returncode == 0 and not self.error
+
+    def describe_failure(self) -> str:
+        """Короткое описание ошибки для BatchResult"""
+        if self.error:
+            return self.error
+        last_line = ''
+        for line in reversed((self.stderr or self.stdout).splitlines()):
+            if line.strip():
+                last_line = line.strip()
+                break
+        message = f"Render of {self.task.write} ({self.task.frames}) exited with code {self.returncode}"
+        return f"{message}: {last_line}" if last_line else message
+
+
+class RenderExecutor:
+    """
+    Пул процессов рендера
+
+    Каждая задача запускается отдельным процессом (nuke -x или любой
+    совместимой командой), одновременно работает не больше workers
+    процессов. Вывод и код возврата каждого процесса сохраняются. Для
+    тестов вместо Nuke можно указать любую команду, например
+    [sys.executable, '-m', 'atrain.core.batch.fake_render', ...].
+    """
+
+    def __init__(self, command: Optional[Union[str, List[str]]] = None,
+                 workers: Optional[int] = None,
+                 executable: Optional[str] = None,
+                 timeout: Optional[float] = None,
+                 env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            command: Шаблон команды (строка или список аргументов);
+                по умолчанию ATRAIN_RENDER_COMMAND или DEFAULT_RENDER_COMMAND
+            workers: Количество одновременных процессов;
+                по умолчанию ATRAIN_RENDER_WORKERS или число ядер
+            executable: Исполняемый файл Nuke для {nuke}
+            timeout: Ограничение времени одного процесса (секунды)
+            env: Дополнительные переменные окружения процессов
+        """
+        command = command or os.environ.get(RENDER_COMMAND_ENV) or DEFAULT_RENDER_COMMAND
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+
+        if workers is None:
+            try:
+                workers = int(os.environ.get(RENDER_WORKERS_ENV, '0'))
+            except ValueError:
+                workers = 0
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+        self.executable = executable or self._default_executable()
+        self.timeout = timeout
+        self.env = env or {}
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any]) -> 'RenderExecutor':
+        """Создать из operation.options (render_command, render_workers, ...)"""
+        return cls(
+            command=options.get('render_command'),
+            workers=options.get('render_workers'),
+            executable=options.get('nuke_executable'),
+            timeout=options.get('render_timeout'),
+            env=options.get('render_env')
+        )
+
+    @property
+    def threads_per_process(self) -> int:
+        """Потоков на процесс, чтобы все процессы вместе заняли все ядра"""
+        return max(1, (os.cpu_count() or 1) // self.workers)
+
+    def build_command(self, task: RenderTask) -> List[str]:
+        """Подставить параметры задачи в шаблон команды"""
+        values = {
+            'nuke': self.executable,
+            'script': task.script,
+            'write': task.write,
+            'frames': task.frames,
+            'first': task.first,
+            'last': task.last,
+            'step': task.step,
+            'threads': self.threads_per_process,
+            'output': task.output_path
+        }
+        return [arg.format(**values) for arg in self.command]
+
+    def run(self, tasks: List[RenderTask],
+            progress_callback: Optional[Callable] = None,
+            started_callback: Optional[Callable[[RenderTask], Any]] = None,
+            finished_callback: Optional[Callable[[RenderOutcome], Any]] = None,
+            cancel_token: Optional[Any] = None) -> List[RenderOutcome]:
+        """
+        Выполнить задачи
+
+        Args:
+            tasks: Задачи в порядке запуска
+            progress_callback: Callback прогресса (current, total, message),
+                вызывается в потоке вызывающего
+            started_callback: Вызывается перед запуском процесса задачи
+                (в рабочем потоке)
+            finished_callback: Вызывается с результатом каждой задачи по мере
+                завершения (в потоке вызывающего)
+            cancel_token: CancellationToken; после отмены новые процессы не
+                запускаются (запущенные дорабатывают свой кусок), остальные
+                задачи получают ошибку CANCELLED_ERROR
+
+        Returns:
+            Результаты в порядке задач
+        """
+        outcomes: List[Optional[RenderOutcome]] = [None] * len(tasks)
+        total = len(tasks)
+        if not tasks:
+            return []
+
+        workers = min(self.workers, total)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ATrainRender') as pool:
+            futures = {
+                pool.submit(self._run_started, task, started_callback, cancel_token): i
+                for i, task in enumerate(tasks)
+            }
+
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                outcomes[i] = future.result()
+
+                if finished_callback:
+                    finished_callback(outcomes[i])
+
+                if progress_callback:
+                    outcome = outcomes[i]
+                    if outcome.error == CANCELLED_ERROR:
+                        status = "Cancelled"
+                    else:
+                        status = "Rendered" if outcome.success else "Failed"
+                    progress_callback(done, total, f"{status}: {outcome.task.write} "
+                                                   f"({outcome.task.frames})")
+
+        return outcomes
+
+    def _run_started(self, task: RenderTask,
+                     started_callback: Optional[Callable[[RenderTask], Any]],
+                     cancel_token: Optional[Any] = None) -> RenderOutcome:
+        """Сообщить о запуске и выполнить задачу"""
+        if is_cancelled(cancel_token):
+            return RenderOutcome(task=task, command=self.build_command(task),
+                                 error=CANCELLED_ERROR)
+        if started_callback:
+            started_callback(task)
+        return self.run_task(task)
+
+    def run_task(self, task: RenderTask) -> RenderOutcome:
+        """Выполнить одну задачу в отдельном процессе"""
+        command = self.build_command(task)
+        outcome = RenderOutcome(task=task, command=command)
+        started = time.monotonic()
+
+        env = dict(os.environ)
+        env.update(self.env)
+
+        try:
+            completed = subprocess.run(
+                command, capture_output=True, text=True, errors='replace',
+                timeout=self.timeout, env=env
+            )
+            outcome.returncode = completed.returncode
+            outcome.stdout = completed.stdout
+            outcome.stderr = completed.stderr
+        except subprocess.TimeoutExpired as e:
+            outcome.stdout = _decode(e.stdout)
+            outcome.stderr = _decode(e.stderr)
+            outcome.error = f"Render of {task.write} ({task.frames}) timed out after {self.timeout}s"
+        except OSError as e:
+            outcome.error = f"Cannot start render process {command[0]}: {e}"
+
+        outcome.elapsed = time.monotonic() - started
+        return outcome
+
+    @staticmethod
+    def _default_executable() -> str:
+        """Исполняемый файл Nuke: переменная окружения, текущий Nuke или 'nuke'"""
+        executable = os.environ.get(NUKE_EXECUTABLE_ENV)
+        if executable:
+            return executable
+
+        try:
+            from ..nuke import nuke_bridge
+            bridge = nuke_bridge()
+            if bridge.available and getattr(bridge.nuke, 'EXE_PATH', None):
+                return bridge.nuke.EXE_PATH
+        except Exception:
+            pass
+
+        return 'nuke'
+
+
+def _decode(output: Union[bytes, str, None]) -> str:
+    """Вывод прерванного процесса (может прийти байтами)"""
+    if output is None:
+        return ''
+    if isinstance(output, bytes):
+        return output.decode('utf-8', errors='replace')
+    return output
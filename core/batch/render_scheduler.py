@@ -0,0 +1,241 @@
+# atrain/core/batch/render_scheduler.py
+"""
+Разбиение диапазонов кадров на куски и порядок их рендера
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .render_executor import (
+    RenderExecutor, RenderOutcome, RenderTask, RENDER_PASS_PROXY, RENDER_PASS_FULL
+)
+from ..models import BatchResult
+
+# Минимальный размер куска при автоматическом выборе
+DEFAULT_MIN_CHUNK = 10
+
+
+@dataclass
+class WriteRender:
+    """Что нужно отрендерить для одной Write ноды"""
+    write: str
+    script: str
+    first: int
+    last: int
+    output_path: str = ''
+
+    @property
+    def frame_count(self) -> int:
+        return self.last - self.first + 1
+
+
+def split_frame_range(first: int, last: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Разбить диапазон на куски не длиннее chunk_size
+
+    Куски выравниваются по длине: 1001-1100 при chunk_size 40 дает три куска
+    по 34/33/33 кадра, а не 40/40/20.
+    """
+    total = last - first + 1
+    if total <= 0:
+        return []
+    if chunk_size <= 0 or total <= chunk_size:
+        return [(first, last)]
+
+    count = math.ceil(total / chunk_size)
+    base, extra = divmod(total, count)
+
+    chunks = []
+    start = first
+    for i in range(count):
+        length = base + (1 if i < extra else 0)
+        chunks.append((start, start + length - 1))
+        start += length
+    return chunks
+
+
+class RenderScheduler:
+    """
+    Планировщик кусков рендера
+
+    Длинные Write делятся на куски, все куски всех Write сортируются от
+    длинных к коротким (LPT) - так самые долгие задачи стартуют первыми и
+    воркеры заканчивают примерно одновременно. Необязательный проход с шагом
+    кадров (proxy_step) рендерится целиком до основного, чтобы быстро
+    получить материал для просмотра и не писать одни и те же кадры двумя
+    процессами одновременно.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, proxy_step: Optional[int] = None,
+                 min_chunk: int = DEFAULT_MIN_CHUNK):
+        """
+        Args:
+            chunk_size: Кадров в куске (None - подобрать по числу воркеров)
+            proxy_step: Шаг кадров прохода для просмотра (None - без него)
+            min_chunk: Минимальный размер куска при автоматическом выборе
+        """
+        self.chunk_size = chunk_size
+        self.proxy_step = proxy_step if proxy_step and proxy_step > 1 else None
+        self.min_chunk = max(1, min_chunk)
+
+    def auto_chunk_size(self, writes: List[WriteRender], workers: int) -> int:
+        """
+        Размер куска по умолчанию
+
+        Около четырех кусков на воркер: достаточно для балансировки,
+        но без лишних запусков Nuke.
+        """
+        total = sum(write.frame_count for write in writes)
+        if not total:
+            return self.min_chunk
+        return max(self.min_chunk, math.ceil(total / (max(1, workers) * 4)))
+
+    def resolve_chunk_size(self, writes: List[WriteRender], workers: int) -> int:
+        """Заданный или автоматический размер куска"""
+        return self.chunk_size or self.auto_chunk_size(writes, workers)
+
+    def plan(self, writes: List[WriteRender],
+             workers: int = 1) -> Tuple[List[RenderTask], List[RenderTask]]:
+        """
+        Составить задачи
+
+        Returns:
+            (задачи прохода для просмотра, задачи основного прохода) -
+            каждая группа отсортирована от длинных к коротким
+        """
+        chunk_size = self.resolve_chunk_size(writes, workers)
+
+        proxy_tasks = []
+        if self.proxy_step:
+            for write in writes:
+                proxy_tasks.append(RenderTask(
+                    write=write.write, script=write.script,
+                    first=write.first, last=write.last, step=self.proxy_step,
+                    output_path=write.output_path, render_pass=RENDER_PASS_PROXY
+                ))
+
+        full_tasks = []
+        for write in writes:
+            for chunk_index, (first, last) in enumerate(
+                    split_frame_range(write.first, write.last, chunk_size)):
+                full_tasks.append(RenderTask(
+                    write=write.write, script=write.script,
+                    first=first, last=last, output_path=write.output_path,
+                    chunk=chunk_index
+                ))
+
+        # Сортировка устойчивая: при равной длине сохраняется порядок Write
+        proxy_tasks.sort(key=lambda task: -task.frame_count)
+        full_tasks.sort(key=lambda task: -task.frame_count)
+        return proxy_tasks, full_tasks
+
+    def run(self, executor: RenderExecutor, writes: List[WriteRender],
+            progress_callback: Optional[Callable] = None,
+            skip: Optional[Callable[[RenderTask], bool]] = None,
+            started_callback: Optional[Callable[[RenderTask], Any]] = None,
+            finished_callback: Optional[Callable[[RenderOutcome], Any]] = None,
+            cancel_token: Optional[Any] = None) -> Dict[str, List[RenderOutcome]]:
+        """
+        Отрендерить Write кусками
+
+        Args:
+            executor: Пул процессов рендера
+            writes: Write ноды с диапазонами
+            progress_callback: Callback прогресса (current, total, message)
+                по всем задачам обоих проходов
+            skip: Возвращает True для уже готовых кусков - они не
+                рендерятся и получают результат с skipped=True
+            started_callback: См. RenderExecutor.run
+            finished_callback: См. RenderExecutor.run
+            cancel_token: См. RenderExecutor.run
+
+        Returns:
+            Имя Write -> результаты всех ее кусков
+        """
+        outcomes: Dict[str, List[RenderOutcome]] = {write.write: [] for write in writes}
+
+        phases = []
+        for tasks in self.plan(writes, executor.workers):
+            pending = []
+            for task in tasks:
+                if skip and skip(task):
+                    outcomes[task.key].append(
+                        RenderOutcome(task=task, command=[], returncode=0, skipped=True)
+                    )
+                else:
+                    pending.append(task)
+            phases.append(pending)
+
+        total = sum(len(tasks) for tasks in phases)
+        done = 0
+
+        for tasks in phases:
+            if not tasks:
+                continue
+
+            offset = done
+
+            def phase_progress(current, _total, message, offset=offset):
+                if progress_callback:
+                    progress_callback(offset + current, total, message)
+
+            for outcome in executor.run(tasks, phase_progress, started_callback,
+                                        finished_callback, cancel_token):
+                outcomes[outcome.task.key].append(outcome)
+            done += len(tasks)
+
+        return outcomes
+
+
+def merge_chunk_outcomes(batch_result: BatchResult, outcomes: List[RenderOutcome]):
+    """
+    Свести результаты кусков одной Write в ее BatchResult
+
+    Write успешна, если успешны все куски основного прохода. Ошибки
+    прохода для просмотра становятся предупреждениями.
+    """
+    outcomes = sorted(outcomes, key=lambda o: (o.task.render_pass != RENDER_PASS_PROXY,
+                                               o.task.first))
+    full = [o for o in outcomes if o.task.render_pass == RENDER_PASS_FULL]
+
+    batch_result.operation_time = sum(o.elapsed for o in outcomes)
+    batch_result.metadata['chunks'] = [
+        {
+            'pass': o.task.render_pass,
+            'frames': o.task.frames,
+            'command': o.command,
+            'returncode': o.returncode,
+            'stdout': o.stdout,
+            'stderr': o.stderr,
+            'elapsed': o.elapsed,
+            'skipped': o.skipped
+        }
+        for o in outcomes
+    ]
+
+    if len(full) == 1 and not full[0].skipped:
+        # Один кусок - те же поля, что и без разбиения
+        batch_result.metadata.update({
+            'command': full[0].command,
+            'returncode': full[0].returncode,
+            'stdout': full[0].stdout,
+            'stderr': full[0].stderr
+        })
+
+    for outcome in outcomes:
+        if outcome.success:
+            continue
+        if outcome.task.render_pass == RENDER_PASS_PROXY:
+            batch_result.add_warning(f"Proxy pass: {outcome.describe_failure()}")
+        else:
+            batch_result.add_error(outcome.describe_failure())
+
+    if full and all(o.success for o in full):
+        batch_result.success = True
+        batch_result.metadata['frames_rendered'] = sum(
+            o.task.frame_count for o in full if not o.skipped
+        )
+        batch_result.metadata['frames_skipped'] = sum(
+            o.task.frame_count for o in full if o.skipped
+        )
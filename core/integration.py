@@ -7,12 +7,14 @@
 import os
 from typing import Dict, List, Any, Optional, Tuple
 
-from .storage import StorageManager
+from .storage import StorageManager, get_storage_manager
 from .path_builder import PathBuilder
-from .models import PathContext, PresetData, TagData, TagType
+from .models import PathContext, PresetData
 from .batch import BatchOperations, get_batch_operations
 from .nuke import nuke_bridge, NodeUtils
-from .utils import event_bus, get_next_available_version
+from .utils import (
+    event_bus, get_version_index, get_version_reservations, get_version_prefetcher
+)
 
 
 class ATrainCore:
@@ -21,7 +23,6 @@ class ATrainCore:
     """
     
     def __init__(self):
-        self.storage = StorageManager()
         self.bridge = nuke_bridge()
         self.batch_ops = get_batch_operations()
         self.event_bus = event_bus()
@@ -29,6 +30,11 @@ class ATrainCore:
         
         print("ATrainCore: Initialized")
     
+    @property
+    def storage(self) -> StorageManager:
+        """Общий StorageManager текущего проекта"""
+        return get_storage_manager()
+    
     # =====================
     # Работа с путями
     # =====================
@@ -42,9 +48,9 @@ class ATrainCore:
             (success, path, issues)
         """
         try:
-            # Получаем пресет
-            preset = self.storage.get_preset(preset_name)
-            if not preset:
+            # Получаем пресет с готовой цепочкой тегов
+            resolved = self.storage.resolve_preset(preset_name)
+            if not resolved:
                 return False, "", [f"Preset '{preset_name}' not found"]
             
             # Создаем PathBuilder
@@ -54,30 +60,16 @@ class ATrainCore:
             if context:
                 builder.set_context(context)
             
-            # Добавляем теги из пресета
-            all_tags = self.storage.get_all_tags()
-            tags_dict = {tag.name: tag for tag in all_tags}
-            
-            for tag_name in preset.tags:
-                if tag_name in tags_dict:
-                    builder.add_tag(tags_dict[tag_name])
-                else:
-                    print(f"ATrainCore: Warning - tag '{tag_name}' not found")
-            
-            # Добавляем format тег
-            format_tag = TagData(
-                name='format',
-                type=TagType.FORMAT,
-                format=preset.format,
-                padding='%04d'
-            )
-            builder.add_tag(format_tag)
+            builder.set_tags(resolved.tags)
             
             # Строим путь
             path = builder.build_path()
             
             # Валидируем
             is_valid, issues = builder.validate_path(path)
+            issues.extend(f"Tag '{name}' not found" for name in resolved.missing_tags)
+            if resolved.missing_tags:
+                is_valid = False
             
             return is_valid, path, issues
             
@@ -112,14 +104,27 @@ class ATrainCore:
                     # Дефолтный путь
                     path = self._get_default_path(format_type)
             
-            # Автоинкремент
+            # Автоинкремент: версия резервируется атомарно, чтобы параллельные
+            # сессии и задачи фермы не получили ту же самую
+            claim = None
             if auto_increment:
-                path = get_next_available_version(path)
+                # Прогноз из предпросмотра (если есть) - готовый кандидат
+                predicted = get_version_prefetcher().result(path)
+                claim = get_version_reservations().reserve(predicted or path)
+                path = claim.path
             
             # Создаем Write ноду
             write_node = self.node_utils.create_write_node(path)
             
+            if not write_node and claim:
+                claim.release()
+            
             if write_node:
+                # Версия занята - следующий запрос получит более новую
+                get_version_index().record(path)
+                if claim:
+                    claim.settle()
+                
                 # Добавляем метку
                 note = "A-Train"
                 if preset_name:
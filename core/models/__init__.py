@@ -4,17 +4,20 @@
 """
 
 from .tag_models import TagData, TagType
-from .preset_models import PresetData, PresetInfo
+from .preset_models import PresetData, PresetInfo, ResolvedPreset
 from .path_models import PathContext, PathResult
-from .batch_models import BatchOperation, BatchResult
+from .batch_models import BatchOperationType, BatchOperation, BatchResult, BatchOperationResult
 
 __all__ = [
     'TagData',
     'TagType', 
     'PresetData',
     'PresetInfo',
+    'ResolvedPreset',
     'PathContext',
     'PathResult',
+    'BatchOperationType',
     'BatchOperation',
-    'BatchResult'
+    'BatchResult',
+    'BatchOperationResult'
 ]
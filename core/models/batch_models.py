@@ -31,10 +31,13 @@ class BatchOperation:
     
     # Для рендера
     frame_range: Optional[tuple[int, int]] = None
+    chunk_size: Optional[int] = None   # кадров в куске (None - автоматически)
+    proxy_step: Optional[int] = None   # шаг прохода для просмотра перед основным
     
     # Дополнительные параметры
     custom_path: Optional[str] = None
     options: dict = field(default_factory=dict)
+    cancel_token: Optional[Any] = None  # CancellationToken для отмены из UI
     
     def __post_init__(self):
         """Преобразование типа если строка"""
@@ -98,6 +101,12 @@ class BatchOperationResult:
     start_time: Optional[str] = None
     end_time: Optional[str] = None
     
+    # Журнал для продолжения после сбоя (если велся)
+    checkpoint_path: Optional[str] = None
+    
+    # Операция остановлена через CancellationToken
+    cancelled: bool = False
+    
     @property
     def total_count(self) -> int:
         """Общее количество операций"""
@@ -4,9 +4,11 @@
 """
 
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 
+from .tag_models import TagData
+
 
 @dataclass
 class PresetData:
@@ -34,7 +36,7 @@ class PresetData:
     def to_dict(self) -> Dict[str, Any]:
         """Конвертация в словарь"""
         return {
-            'tags': self.tags,
+            'tags': list(self.tags),
             'format': self.format,
             'category': self.category,
             'source': self.source,
@@ -101,3 +103,32 @@ class PresetInfo:
             is_valid=is_valid,
             validation_errors=errors
         )
+
+
+@dataclass(frozen=True)
+class ResolvedPreset:
+    """
+    Пресет с привязанной цепочкой тегов, готовой к построению пути
+    
+    Неизменяем: экземпляр общий для всех, кто разрешил пресет в том же
+    поколении хранилища.
+    """
+    preset: PresetData
+    tags: Tuple[TagData, ...] = ()
+    format: str = "exr"
+    
+    # Диагностика, вычисленная при разрешении
+    missing_tags: Tuple[str, ...] = ()
+    
+    # Поколения хранилища, для которых цепочка актуальна
+    generation: tuple = ()
+    
+    @property
+    def name(self) -> str:
+        """Имя пресета"""
+        return self.preset.name
+    
+    @property
+    def is_complete(self) -> bool:
+        """Все теги пресета найдены"""
+        return not self.missing_tags
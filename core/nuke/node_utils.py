@@ -72,19 +72,22 @@ class NodeUtils:
         try:
             basename = os.path.splitext(os.path.basename(file_path))[0]
             
+            # Убираем шаблон кадров Nuke (%04d, ####)
+            basename = re.sub(r'[._]?(%0?\d*d|#+)$', '', basename)
+            
             # Убираем номера кадров
-            clean_name = re.sub(r'[._]\d{3,}, '', basename)
-            clean_name = re.sub(r'[._], '', clean_name)
+            clean_name = re.sub(r'[._]\d{3,}$', '', basename)
+            clean_name = re.sub(r'[._]$', '', clean_name)
             
-            # Убираем версии
-            from ..utils.version import extract_version
-            version = extract_version(clean_name)
-            if version:
-                clean_name = clean_name.replace(version, '').rstrip('_')
+            # Убираем версию (вырезаем найденное вхождение как есть)
+            from ..utils.version import find_version
+            span = find_version(clean_name)
+            if span:
+                clean_name = span.splice(clean_name, '').rstrip('_')
             
             # Убираем паттерны кадров
-            clean_name = re.sub(r'[._]\d+, '', clean_name)
-            clean_name = re.sub(r'[._], '', clean_name)
+            clean_name = re.sub(r'[._]\d+$', '', clean_name)
+            clean_name = re.sub(r'[._]$', '', clean_name)
             
             return clean_name if clean_name else basename
             
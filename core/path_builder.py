@@ -38,6 +38,11 @@ class PathBuilder:
         event_bus().publish('tag_added', tag_data)
         return len(self.tags) - 1
     
+    def set_tags(self, tags: List[TagData]):
+        """Заменить цепочку тегов целиком (например, из ResolvedPreset)"""
+        self.tags = list(tags)
+        event_bus().publish('path_tags_set', self.tags)
+    
     def remove_tag(self, index: int) -> bool:
         """Удалить тег по индексу"""
         if 0 <= index < len(self.tags):
@@ -3,7 +3,9 @@
 Адаптер для совместимости старого PresetManager с новой архитектурой
 """
 
-from .storage import StorageManager
+from types import MappingProxyType
+
+from .storage import StorageManager, get_storage_manager
 from .models import TagData, PresetData
 
 
@@ -14,38 +16,60 @@ class PresetManager:
     """
     
     def __init__(self):
-        self._storage = StorageManager()
-        
         # Для совместимости
         self.cache = type('obj', (object,), {
             'invalidate': lambda: None,
             'get': lambda key, func: func()
         })()
     
+    @property
+    def _storage(self) -> StorageManager:
+        """Общий StorageManager текущего проекта"""
+        return get_storage_manager()
+    
     def get_all_presets(self):
         """Получить все пресеты в старом формате"""
-        presets = {}
-        for name, preset in self._storage.get_all_presets().items():
-            presets[name] = preset.to_dict()
-        return presets
+        return self._storage.cached_view(
+            'legacy_presets', ('presets',),
+            lambda: MappingProxyType({name: preset.to_dict()
+                                      for name, preset in self._storage.get_all_presets().items()})
+        )
     
     def get_all_tags(self):
         """Получить все теги в старом формате"""
-        return [tag.to_dict() for tag in self._storage.get_all_tags()]
+        return self._storage.cached_view(
+            'legacy_tags', ('tags',),
+            lambda: tuple(tag.to_dict() for tag in self._storage.get_all_tags())
+        )
     
     def get_all_tags_grouped(self):
         """Получить теги сгруппированные по категориям"""
+        return self._storage.cached_view(
+            'legacy_tags_grouped', ('tags', 'categories'), self._build_tags_grouped
+        )
+    
+    def _build_tags_grouped(self):
+        """Сгруппировать теги в старом формате"""
         grouped = self._storage.get_all_tags_grouped()
         # Конвертируем TagData обратно в словари для совместимости
-        result = {}
-        for category, tags in grouped.items():
-            result[category] = [tag.to_dict() for tag in tags]
-        return result
+        return MappingProxyType({
+            category: tuple(tag.to_dict() for tag in tags)
+            for category, tags in grouped.items()
+        })
     
     def get_all_presets_grouped(self):
         """Получить пресеты сгруппированные по категориям"""
         return self._storage.get_all_presets_grouped()
     
+    def get_tag_group_entries(self, name):
+        """Группы и теги (в старом формате) с указанным именем"""
+        return [(group, tag.to_dict())
+                for group, tag in self._storage.get_tag_group_entries(name)]
+    
+    def get_preset_group_entries(self, name):
+        """Группа и описание пресета с указанным именем"""
+        return self._storage.get_preset_group_entries(name)
+    
     def get_tag_categories(self):
         """Получить категории тегов"""
         return self._storage.get_tag_categories()
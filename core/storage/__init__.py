@@ -3,16 +3,27 @@
 Система хранения данных A-Train
 """
 
-from .file_storage import FileStorage
+from .file_storage import FileStorage, resolve_storage_directory, clear_storage_directory_cache
 from .preset_storage import PresetStorage
 from .tag_storage import TagStorage
+from .backup_store import BackupStore
+from .layers import LayeredSettings, SettingsLayer
 from .category_storage import CategoryStorage
-from .storage_manager import StorageManager
+from .storage_manager import StorageManager, get_storage_manager, clear_storage_managers
+from .watcher import StorageWatcher
 
 __all__ = [
     'FileStorage',
+    'resolve_storage_directory',
+    'clear_storage_directory_cache',
     'PresetStorage',
     'TagStorage',
+    'BackupStore',
+    'LayeredSettings',
+    'SettingsLayer',
     'CategoryStorage',
-    'StorageManager'
+    'StorageManager',
+    'get_storage_manager',
+    'clear_storage_managers',
+    'StorageWatcher'
 ]
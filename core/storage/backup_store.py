@@ -0,0 +1,308 @@
+# atrain/core/storage/backup_store.py
+"""
+Контентно-адресуемое хранилище резервных копий настроек
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .journal import process_file_lock
+
+
+# Общая блокировка потоков процесса; между процессами - файл store.lock
+_store_lock = threading.Lock()
+
+
+class BackupStore:
+    """
+    Резервные копии в виде блобов и манифестов
+
+    Каждое уникальное содержимое файла хранится один раз в blobs/ под своим
+    sha256 (сжатое zlib). Снимок - маленький JSON манифест в snapshots/,
+    ссылающийся на блобы по хешу. Для файлов, сигнатура которых не
+    изменилась с прошлого снимка, хеш берется из индекса без чтения файла.
+
+    Хранилище общее для всех сессий проекта: запись блобов, индекса и
+    манифеста и сборка мусора идут под межпроцессной блокировкой
+    store.lock, временные файлы уникальны для каждой записи.
+    """
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root: Корневая директория хранилища (обычно .atrain/backups)
+        """
+        self.root = Path(root)
+        self.blobs_dir = self.root / 'blobs'
+        self.snapshots_dir = self.root / 'snapshots'
+        self.index_path = self.root / 'index.json'
+        self.lock_path = self.root / 'store.lock'
+
+    # =====================
+    # Снимки
+    # =====================
+
+    def snapshot(self, storages: List[Any], label: str = 'settings') -> Optional[Path]:
+        """
+        Создать снимок набора хранилищ
+
+        Args:
+            storages: Объекты с filename, change_signature() и backup_content()
+            label: Метка снимка (попадает в имя манифеста)
+
+        Returns:
+            Путь к манифесту или None если сохранять нечего
+        """
+        # Содержимое читается до блокировки: в режиме журнала чтение берет
+        # блокировку журнала, а сворачивание журнала делает бэкап под ней.
+        # Если под блокировкой индекс уже другой, читаем все файлы заново.
+        read_all = False
+        while True:
+            pending = self._pending_files(storages, read_all)
+            if not pending:
+                return None
+
+            with self._locked():
+                index = self._load_index()
+                files = {}
+
+                for filename, (signature, content) in pending.items():
+                    known = index.get(filename)
+                    if content is None:
+                        if not (known and known['signature'] == signature and
+                                self._has_blob(known['hash'])):
+                            break
+                        entry = {'hash': known['hash'], 'size': known['size']}
+                    else:
+                        entry = {'hash': self.put_blob(content), 'size': len(content)}
+                        index[filename] = dict(entry, signature=signature)
+
+                    files[filename] = entry
+                else:
+                    self._save_index(index)
+                    return self._write_manifest(label, files)
+
+            read_all = True
+
+    def _pending_files(self, storages: List[Any], read_all: bool) -> Dict[str, tuple]:
+        """
+        Сигнатуры и содержимое файлов для снимка
+
+        Returns:
+            filename -> (сигнатура, содержимое или None если файл
+            не изменился с прошлого снимка по индексу)
+        """
+        index = self._load_index()
+        pending = {}
+
+        for storage in storages:
+            signature = storage.change_signature()
+            if signature is None:
+                continue
+
+            # JSON превращает кортежи в списки - сравниваем в одном виде
+            signature = json.loads(json.dumps(signature))
+            known = index.get(storage.filename)
+
+            if not read_all and known and known['signature'] == signature:
+                pending[storage.filename] = (signature, None)
+            else:
+                pending[storage.filename] = (signature, storage.backup_content())
+
+        return pending
+
+    def _write_manifest(self, label: str, files: Dict[str, Any]) -> Path:
+        """Записать манифест снимка (под блокировкой хранилища)"""
+        created = datetime.now()
+        manifest = {
+            'label': label,
+            'created': created.isoformat(),
+            'files': files
+        }
+
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        # pid в имени: снимки разных процессов в одну микросекунду не совпадают
+        manifest_path = self.snapshots_dir / (
+            f"{created.strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}_{label}.json"
+        )
+        self._write_atomic(manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+        return manifest_path
+
+    def list_snapshots(self, label: Optional[str] = None) -> List[Path]:
+        """Манифесты снимков, новые первыми"""
+        if not self.snapshots_dir.exists():
+            return []
+
+        pattern = f"*_{label}.json" if label else '*.json'
+        # Имена начинаются с метки времени - сортировка по имени хронологическая
+        return sorted(self.snapshots_dir.glob(pattern), key=lambda p: p.name, reverse=True)
+
+    @staticmethod
+    def is_manifest(path: Path) -> bool:
+        """Является ли путь манифестом снимка"""
+        path = Path(path)
+        return path.suffix == '.json' and path.parent.name == 'snapshots'
+
+    @staticmethod
+    def read_manifest(manifest_path: Path) -> Dict[str, Any]:
+        """Прочитать манифест"""
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def read_file(self, manifest_path: Path, filename: str) -> Optional[bytes]:
+        """
+        Получить содержимое файла из снимка
+
+        Returns:
+            Содержимое или None если файла в снимке нет
+        """
+        entry = self.read_manifest(manifest_path).get('files', {}).get(filename)
+        if entry is None:
+            return None
+        return self.get_blob(entry['hash'])
+
+    # =====================
+    # Блобы
+    # =====================
+
+    def put_blob(self, content: bytes) -> str:
+        """Сохранить содержимое (если такого еще нет) и вернуть его хеш"""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(path, zlib.compress(content))
+
+        return digest
+
+    def get_blob(self, digest: str) -> bytes:
+        """Прочитать содержимое по хешу с проверкой целостности"""
+        with open(self._blob_path(digest), 'rb') as f:
+            content = zlib.decompress(f.read())
+
+        if hashlib.sha256(content).hexdigest() != digest:
+            raise ValueError(f"Backup blob {digest[:12]} is corrupt")
+
+        return content
+
+    def _has_blob(self, digest: str) -> bool:
+        """Есть ли блоб"""
+        return self._blob_path(digest).exists()
+
+    def _blob_path(self, digest: str) -> Path:
+        """Путь к блобу (двухсимвольный префикс как поддиректория)"""
+        return self.blobs_dir / digest[:2] / digest[2:]
+
+    # =====================
+    # Очистка
+    # =====================
+
+    def prune(self, label: Optional[str] = None, keep: int = 50, slack: int = 0) -> int:
+        """
+        Удалить старые снимки и блобы, на которые больше никто не ссылается
+
+        Args:
+            label: Чистить только снимки с этой меткой
+            keep: Сколько последних снимков оставить
+            slack: Не чистить, пока снимков не больше keep + slack
+
+        Returns:
+            Количество удаленных снимков
+        """
+        with self._locked():
+            snapshots = self.list_snapshots(label)
+            if len(snapshots) <= keep + slack:
+                return 0
+
+            removed = 0
+            for manifest_path in snapshots[keep:]:
+                try:
+                    manifest_path.unlink()
+                    removed += 1
+                except OSError as e:
+                    print(f"BackupStore: Cannot remove snapshot {manifest_path.name}: {e}")
+
+            if removed:
+                self._collect_garbage()
+
+            return removed
+
+    def _collect_garbage(self):
+        """
+        Удалить блобы без ссылок из манифестов и индекса
+
+        Вызывается под блокировкой хранилища: другой процесс не может
+        сослаться на блоб между проверкой ссылок и удалением.
+        """
+        referenced = set()
+        for manifest_path in self.list_snapshots():
+            try:
+                manifest = self.read_manifest(manifest_path)
+            except (OSError, ValueError):
+                # Нечитаемый манифест - не рискуем удалять блобы
+                return
+            referenced.update(entry['hash'] for entry in manifest.get('files', {}).values())
+
+        referenced.update(entry['hash'] for entry in self._load_index().values())
+
+        if not self.blobs_dir.exists():
+            return
+
+        for prefix_dir in self.blobs_dir.iterdir():
+            if not prefix_dir.is_dir():
+                continue
+            for blob in prefix_dir.iterdir():
+                if prefix_dir.name + blob.name not in referenced:
+                    try:
+                        blob.unlink()
+                    except OSError:
+                        pass
+
+    # =====================
+    # Служебное
+    # =====================
+
+    @contextmanager
+    def _locked(self):
+        """Блокировка хранилища для потоков процесса и для других процессов"""
+        with _store_lock, process_file_lock(self.lock_path):
+            yield
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Индекс: имя файла -> сигнатура и хеш последнего снимка"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]):
+        """Сохранить индекс"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(self.index_path, json.dumps(index).encode('utf-8'))
+
+    @staticmethod
+    def _write_atomic(path: Path, content: bytes):
+        """Записать файл через уникальный временный файл"""
+        fd, temp_name = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, path)
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except OSError:
+                pass
+            raise
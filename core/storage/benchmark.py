@@ -0,0 +1,385 @@
+# atrain/core/storage/benchmark.py
+"""
+Микро-бенчмарки хранилища настроек
+
+Запуск без Nuke во временной директории:
+
+    python -m atrain.core.storage.benchmark --sizes 100,1000,10000 --modes local,nfs
+
+Результат выводится в JSON (или пишется в файл через --output), чтобы
+сравнивать задержки между коммитами.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import builtins
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+
+from .tag_storage import TagStorage
+from .preset_storage import PresetStorage
+from .category_storage import CategoryStorage
+from .storage_manager import StorageManager
+from ..models import TagData, TagType, PresetData
+
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_MODES = ('local', 'nfs')
+
+# Задержка одной файловой операции в режиме nfs (секунды)
+DEFAULT_NFS_LATENCY = 0.002
+
+
+class LatencyInjector:
+    """
+    Добавляет задержку к файловым операциям, имитируя сетевой диск
+
+    Подменяет open и функции os, через которые работают pathlib и хранилища
+    (stat, scandir, replace, fsync...). Используется как контекстный менеджер.
+    """
+
+    PATCHED = (
+        (builtins, 'open'),
+        (os, 'open'),
+        (os, 'stat'),
+        (os, 'lstat'),
+        (os, 'scandir'),
+        (os, 'listdir'),
+        (os, 'replace'),
+        (os, 'rename'),
+        (os, 'unlink'),
+        (os, 'mkdir'),
+        (os, 'fsync'),
+    )
+
+    def __init__(self, latency: float = DEFAULT_NFS_LATENCY):
+        """
+        Args:
+            latency: Задержка одной операции (секунды)
+        """
+        self.latency = latency
+        self.calls = 0
+        self._originals = []
+
+    def __enter__(self):
+        for module, name in self.PATCHED:
+            original = getattr(module, name)
+            self._originals.append((module, name, original))
+            setattr(module, name, self._wrap(original))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for module, name, original in reversed(self._originals):
+            setattr(module, name, original)
+        self._originals = []
+        return False
+
+    def _wrap(self, func: Callable) -> Callable:
+        """Обернуть функцию задержкой"""
+        def delayed(*args, **kwargs):
+            self.calls += 1
+            time.sleep(self.latency)
+            return func(*args, **kwargs)
+        delayed.__name__ = getattr(func, '__name__', 'delayed')
+        return delayed
+
+
+# =====================
+# Синтетические данные
+# =====================
+
+def build_library(size: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Сгенерировать библиотеку тегов, пресетов и категорий
+
+    Args:
+        size: Количество тегов и пресетов
+        seed: Зерно генератора для воспроизводимости
+
+    Returns:
+        Документы для файлов тегов, пресетов и категорий
+    """
+    rng = random.Random(seed)
+    category_count = max(10, size // 100)
+    tag_categories = [f'TagCategory{i}' for i in range(category_count)]
+    preset_categories = [f'PresetCategory{i}' for i in range(category_count)]
+    tag_types = [TagType.TEXT, TagType.DYNAMIC, TagType.SEPARATOR, TagType.EXPRESSION]
+
+    tags = []
+    for i in range(size):
+        tag_type = tag_types[i % len(tag_types)]
+        tag = TagData(
+            name=f'tag_{i:05d}',
+            type=tag_type,
+            category=tag_categories[i % category_count],
+            source='custom'
+        )
+        if tag_type == TagType.SEPARATOR:
+            tag.value = rng.choice(['/', '_', '.'])
+        elif tag_type == TagType.EXPRESSION:
+            tag.expression = f'[value root.name]_{i}'
+        else:
+            tag.default = f'value_{rng.randrange(size)}'
+        tags.append(tag.to_dict())
+
+    presets = {}
+    for i in range(size):
+        preset = PresetData(
+            name=f'preset_{i:05d}',
+            tags=[f'tag_{rng.randrange(size):05d}' for _ in range(6)],
+            format=rng.choice(['exr', 'dpx', 'jpeg', 'mov']),
+            category=preset_categories[i % category_count],
+            source='custom',
+            author='benchmark'
+        )
+        presets[preset.name] = preset.to_dict()
+
+    return {
+        'tags': {'version': '1.5', 'tags': tags},
+        'presets': {'version': '1.5', 'presets': presets},
+        'categories': {
+            'version': '1.5',
+            'tag_categories': tag_categories,
+            'preset_categories': preset_categories
+        }
+    }
+
+
+def write_library(storage_dir: Path, library: Dict[str, Any]):
+    """Записать библиотеку в файлы хранилища"""
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    for filename, document in (('atrain_tags.json', library['tags']),
+                               ('atrain_presets.json', library['presets']),
+                               ('atrain_categories.json', library['categories'])):
+        with open(storage_dir / filename, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+
+
+# =====================
+# Измерения
+# =====================
+
+def measure(func: Callable[[], Any], repeat: int,
+            setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    Измерить время выполнения
+
+    Args:
+        func: Измеряемая функция (получает результат setup если он задан)
+        repeat: Количество повторов
+        setup: Подготовка перед каждым повтором (не входит в замер)
+
+    Returns:
+        Статистика в миллисекундах
+    """
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        func(argument) if setup is not None else func()
+        timings.append((time.perf_counter() - start) * 1000.0)
+
+    return {
+        'runs': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3)
+    }
+
+
+def run_case(size: int, mode: str, repeat: int, latency: float,
+             work_dir: Path) -> Dict[str, Any]:
+    """
+    Прогнать все замеры для одного размера библиотеки и режима диска
+
+    Returns:
+        Результаты по операциям
+    """
+    storage_dir = work_dir / f'{mode}_{size}'
+    library = build_library(size)
+    write_library(storage_dir, library)
+
+    import_path = work_dir / f'import_{size}.jsonl'
+    StorageManager(storage_dir).export_settings_stream(import_path)
+
+    lookup_tag = f'tag_{size // 2:05d}'
+    lookup_preset = f'preset_{size // 2:05d}'
+    counter = iter(range(10 ** 9))
+
+    def new_tag(_storage=None):
+        return TagData(name=f'bench_tag_{next(counter)}', type=TagType.TEXT,
+                       default='bench', source='custom')
+
+    def new_preset(_storage=None):
+        return PresetData(name=f'bench_preset_{next(counter)}', tags=['user'],
+                          source='custom')
+
+    results: Dict[str, Any] = {}
+    injector = LatencyInjector(latency) if mode == 'nfs' else None
+
+    if injector is not None:
+        injector.__enter__()
+
+    try:
+        warm_tags = TagStorage(storage_dir)
+        warm_presets = PresetStorage(storage_dir)
+        warm_categories = CategoryStorage(storage_dir)
+        manager = StorageManager(storage_dir)
+
+        warm_tags.get_all_tags()
+        warm_presets.get_all_presets()
+
+        results['tags'] = {
+            'load_cold': measure(lambda s: s.get_all_tags(), repeat,
+                                 setup=lambda: TagStorage(storage_dir)),
+            'load_warm': measure(warm_tags.get_all_tags, repeat),
+            'lookup': measure(lambda: warm_tags.get_tag(lookup_tag), repeat),
+            'save': measure(lambda: warm_tags.save_tag(new_tag()), repeat)
+        }
+
+        results['presets'] = {
+            'load_cold': measure(lambda s: s.get_all_presets(), repeat,
+                                 setup=lambda: PresetStorage(storage_dir)),
+            'load_warm': measure(warm_presets.get_all_presets, repeat),
+            'lookup': measure(lambda: warm_presets.get_preset(lookup_preset), repeat),
+            'save': measure(lambda: warm_presets.save_preset(new_preset()), repeat)
+        }
+
+        results['categories'] = {
+            'load': measure(warm_categories.get_tag_categories, repeat),
+            'save': measure(
+                lambda: warm_categories.add_tag_category(f'BenchCategory{next(counter)}'),
+                repeat
+            )
+        }
+
+        results['manager'] = {
+            'tags_grouped_cold': measure(lambda m: m.get_all_tags_grouped(), repeat,
+                                         setup=lambda: StorageManager(storage_dir)),
+            'tags_grouped_warm': measure(manager.get_all_tags_grouped, repeat),
+            'presets_grouped_cold': measure(lambda m: m.get_all_presets_grouped(), repeat,
+                                            setup=lambda: StorageManager(storage_dir)),
+            'presets_grouped_warm': measure(manager.get_all_presets_grouped, repeat),
+            'resolve_preset': measure(lambda: manager.resolve_preset(lookup_preset), repeat),
+            'import_stream': measure(
+                lambda m: m.import_settings_stream(import_path, merge=False),
+                repeat,
+                setup=lambda: _fresh_manager(work_dir / f'{mode}_{size}_import')
+            )
+        }
+
+    finally:
+        if injector is not None:
+            injector.__exit__(None, None, None)
+
+    if injector is not None:
+        results['file_operations'] = injector.calls
+
+    return results
+
+
+def _fresh_manager(storage_dir: Path) -> StorageManager:
+    """Пустое хранилище для замера импорта"""
+    shutil.rmtree(storage_dir, ignore_errors=True)
+    return StorageManager(storage_dir)
+
+
+def _git_revision() -> Optional[str]:
+    """Текущий коммит пакета (если доступен git)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, modes=DEFAULT_MODES, repeat: int = 5,
+                   latency: float = DEFAULT_NFS_LATENCY) -> Dict[str, Any]:
+    """
+    Прогнать бенчмарки во временной директории
+
+    Args:
+        sizes: Размеры синтетических библиотек
+        modes: Режимы диска ('local', 'nfs')
+        repeat: Количество повторов каждого замера
+        latency: Задержка файловой операции в режиме nfs (секунды)
+
+    Returns:
+        Отчет для сериализации в JSON
+    """
+    report = {
+        'created': datetime.now().isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'nfs_latency_ms': latency * 1000.0,
+        'results': []
+    }
+
+    work_dir = Path(tempfile.mkdtemp(prefix='atrain_storage_bench_'))
+    try:
+        for mode in modes:
+            for size in sizes:
+                print(f"StorageBenchmark: {mode} / {size} items", file=sys.stderr)
+                report['results'].append({
+                    'mode': mode,
+                    'size': size,
+                    'operations': run_case(size, mode, repeat, latency, work_dir)
+                })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='A-Train storage micro-benchmarks')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Library sizes, comma separated')
+    parser.add_argument('--modes', default=','.join(DEFAULT_MODES),
+                        help='Disk modes: local, nfs')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+    parser.add_argument('--latency-ms', type=float, default=DEFAULT_NFS_LATENCY * 1000.0,
+                        help='Injected latency per file operation in nfs mode')
+    parser.add_argument('--output', help='Write JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in DEFAULT_MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+
+    report = run_benchmarks(
+        sizes=[int(size) for size in args.sizes.split(',') if size.strip()],
+        modes=modes,
+        repeat=args.repeat,
+        latency=args.latency_ms / 1000.0
+    )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
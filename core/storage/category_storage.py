@@ -3,8 +3,9 @@
 Хранилище категорий
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
+from pathlib import Path
 
 from .file_storage import FileStorage
 from ..utils import event_bus
@@ -13,8 +14,8 @@ from ..utils import event_bus
 class CategoryStorage(FileStorage):
     """Управление категориями для тегов и пресетов"""
     
-    def __init__(self):
-        super().__init__('atrain_categories.json')
+    def __init__(self, storage_dir: Optional[Path] = None):
+        super().__init__('atrain_categories.json', storage_dir)
         self._ensure_defaults()
     
     def _ensure_defaults(self):
@@ -6,24 +6,158 @@
 import os
 import json
 import shutil
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
+from .journal import StorageJournal
+from .backup_store import BackupStore
 from ..nuke import nuke_bridge
 
 
+# Сигнатуры файлов, записанных этим процессом (путь -> (mtime, размер, inode))
+_own_writes: Dict[str, tuple] = {}
+_own_writes_lock = threading.Lock()
+
+
+def _record_own_write(path: Path, signature: Optional[tuple] = None):
+    """Запомнить сигнатуру файла после собственной записи"""
+    if signature is None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _own_writes_lock:
+        _own_writes[str(path)] = signature
+
+
+def is_own_write(path: str, signature: tuple) -> bool:
+    """Проверить что файл с такой сигнатурой записан этим процессом"""
+    with _own_writes_lock:
+        return _own_writes.get(str(path)) == signature
+
+
+# Кеш разрешения директории хранилища на весь процесс
+_resolved_dirs: Dict[str, Path] = {}  # корень проекта -> директория
+_resolved_script: Optional[tuple] = None  # (имя скрипта, директория)
+_resolve_lock = threading.Lock()
+
+
+def _probe_directory(path: Path) -> bool:
+    """Создать директорию и проверить что в нее можно писать"""
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+        # Проверяем что можем писать
+        test_file = path / '.test'
+        test_file.touch()
+        test_file.unlink()
+        return True
+    except (OSError, PermissionError):
+        return False
+
+
+def _current_script_name(bridge) -> str:
+    """Имя текущего скрипта Nuke (пустая строка в standalone режиме)"""
+    if not bridge.available:
+        return ''
+    try:
+        return bridge.nuke.root().name()
+    except Exception:
+        return ''
+
+
+def user_storage_directory() -> Path:
+    """Директория настроек пользователя (домашняя папка/.nuke/atrain)"""
+    return Path.home() / '.nuke' / 'atrain'
+
+
+def _resolve_for_root(project_root: Optional[str]) -> Path:
+    """Полное разрешение директории по приоритетам"""
+    # Приоритеты:
+    # 1. Папка проекта/.atrain
+    # 2. Домашняя папка/.nuke/atrain
+    # 3. Временная папка
+    
+    # Пробуем папку проекта
+    if project_root:
+        project_dir = Path(project_root) / '.atrain'
+        if _probe_directory(project_dir):
+            return project_dir
+    
+    # Пробуем домашнюю папку
+    home_dir = user_storage_directory()
+    if _probe_directory(home_dir):
+        return home_dir
+    
+    # Fallback к временной папке
+    import tempfile
+    temp_dir = Path(tempfile.gettempdir()) / 'atrain_settings'
+    _probe_directory(temp_dir)
+    return temp_dir
+
+
+def resolve_storage_directory() -> Path:
+    """
+    Найти директорию хранилища с кешированием на весь процесс
+    
+    Пока открыт тот же скрипт, возвращается запомненный результат без
+    обращений к файловой системе. При смене скрипта директория ранее
+    разрешенного корня проекта перепроверяется одной пробой записи.
+    """
+    global _resolved_script
+    bridge = nuke_bridge()
+    script_name = _current_script_name(bridge)
+    
+    with _resolve_lock:
+        if _resolved_script is not None and _resolved_script[0] == script_name:
+            return _resolved_script[1]
+        
+        project_root = bridge.find_project_root()
+        root_key = str(project_root or '')
+        
+        directory = _resolved_dirs.get(root_key)
+        if directory is None or not _probe_directory(directory):
+            directory = _resolve_for_root(project_root)
+            _resolved_dirs[root_key] = directory
+        
+        _resolved_script = (script_name, directory)
+        return directory
+
+
+def clear_storage_directory_cache():
+    """Сбросить кеш разрешения директорий хранилища"""
+    global _resolved_script
+    with _resolve_lock:
+        _resolved_dirs.clear()
+        _resolved_script = None
+
+
 class FileStorage:
     """Базовый класс для работы с JSON файлами"""
     
-    def __init__(self, filename: str):
+    # Сколько снимков файла хранить и на сколько можно превысить до очистки
+    BACKUP_KEEP = 10
+    BACKUP_PRUNE_SLACK = 0
+    
+    def __init__(self, filename: str, storage_dir: Optional[Path] = None,
+                 journal: bool = False):
         """
         Args:
             filename: Имя файла (например, 'atrain_presets.json')
+            storage_dir: Директория хранилища (если None - определяется автоматически)
+            journal: Писать изменения в append-only журнал вместо перезаписи файла
+                (межпроцессная блокировка требует файловой системы с flock;
+                без нее журналом может пользоваться только один процесс)
         """
         self.filename = filename
+        self._requested_dir = Path(storage_dir) if storage_dir is not None else None
         self._storage_dir = None
         self._file_path = None
+        self.journal_mode = journal
+        self._journal = None
+        self._backup_store = None
         
     @property
     def storage_dir(self) -> Path:
@@ -41,50 +175,48 @@ class FileStorage:
     
     def _find_storage_directory(self) -> Path:
         """Найти или создать директорию для хранения настроек"""
-        bridge = nuke_bridge()
-        
-        # Приоритеты:
-        # 1. Папка проекта/.atrain
-        # 2. Домашняя папка/.nuke/atrain
-        # 3. Временная папка
-        
-        # Пробуем папку проекта
-        project_root = bridge.find_project_root()
-        if project_root:
-            project_dir = Path(project_root) / '.atrain'
-            if self._try_create_directory(project_dir):
-                return project_dir
-        
-        # Пробуем домашнюю папку
-        home_dir = Path.home() / '.nuke' / 'atrain'
-        if self._try_create_directory(home_dir):
-            return home_dir
-        
-        # Fallback к временной папке
-        import tempfile
-        temp_dir = Path(tempfile.gettempdir()) / 'atrain_settings'
-        self._try_create_directory(temp_dir)
-        return temp_dir
+        if self._requested_dir is not None:
+            self._requested_dir.mkdir(parents=True, exist_ok=True)
+            return self._requested_dir
+        return resolve_storage_directory()
     
     def _try_create_directory(self, path: Path) -> bool:
         """Попытаться создать директорию"""
+        return _probe_directory(path)
+    
+    @property
+    def journal(self) -> Optional[StorageJournal]:
+        """Журнал изменений (только в режиме журнала)"""
+        if self.journal_mode and self._journal is None:
+            self._journal = StorageJournal(self.file_path, on_compact=self._on_journal_compact)
+        return self._journal
+    
+    def _on_journal_compact(self):
+        """Бэкап старого снимка перед сворачиванием журнала"""
+        self._create_backup()
+    
+    def change_signature(self) -> Optional[tuple]:
+        """Сигнатура состояния файлов хранилища (None если данных нет)"""
+        if self.journal_mode:
+            return self.journal.signature()
         try:
-            path.mkdir(parents=True, exist_ok=True)
-            # Проверяем что можем писать
-            test_file = path / '.test'
-            test_file.touch()
-            test_file.unlink()
-            return True
-        except (OSError, PermissionError):
-            return False
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
     
     def exists(self) -> bool:
         """Проверить существование файла"""
+        if self.journal_mode:
+            return self.journal.exists()
         return self.file_path.exists()
     
     def load(self) -> Dict[str, Any]:
         """Загрузить данные из файла"""
         try:
+            if self.journal_mode:
+                return self.journal.read()
+            
             if self.exists():
                 with open(self.file_path, 'r', encoding='utf-8') as f:
                     return json.load(f)
@@ -93,11 +225,20 @@ class FileStorage:
         
         return {}
     
-    def save(self, data: Dict[str, Any]) -> bool:
-        """Сохранить данные в файл"""
+    def save(self, data: Dict[str, Any], backup: bool = True) -> bool:
+        """
+        Сохранить данные в файл
+        
+        Args:
+            data: Документ
+            backup: Создать резервную копию предыдущей версии файла
+        """
+        if self.journal_mode:
+            return self._save_to_journal(data)
+        
         try:
             # Создаем резервную копию если файл существует
-            if self.exists():
+            if backup and self.exists():
                 self._create_backup()
             
             # Сохраняем во временный файл
@@ -107,6 +248,7 @@ class FileStorage:
             
             # Атомарная замена
             temp_file.replace(self.file_path)
+            _record_own_write(self.file_path)
             
             return True
             
@@ -114,60 +256,106 @@ class FileStorage:
             print(f"FileStorage: Error saving {self.filename}: {e}")
             return False
     
+    def _save_to_journal(self, data: Dict[str, Any]) -> bool:
+        """Дописать изменения в журнал"""
+        try:
+            self.journal.write(data)
+            _record_own_write(self.file_path, self.change_signature())
+            return True
+        except Exception as e:
+            print(f"FileStorage: Error writing journal for {self.filename}: {e}")
+            return False
+    
+    @property
+    def backup_store(self) -> BackupStore:
+        """Хранилище резервных копий директории"""
+        if self._backup_store is None:
+            self._backup_store = BackupStore(self.storage_dir / 'backups')
+        return self._backup_store
+    
+    def backup_content(self) -> bytes:
+        """Содержимое для резервной копии (в режиме журнала - собранный документ)"""
+        if self.journal_mode:
+            return json.dumps(self.load(), indent=2, ensure_ascii=False).encode('utf-8')
+        with open(self.file_path, 'rb') as f:
+            return f.read()
+    
     def _create_backup(self) -> Optional[Path]:
-        """Создать резервную копию файла"""
+        """Создать резервную копию файла (снимок в хранилище бэкапов)"""
         try:
-            backup_dir = self.storage_dir / 'backups'
-            backup_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_name = f"{self.file_path.stem}_{timestamp}{self.file_path.suffix}"
-            backup_path = backup_dir / backup_name
-            
-            shutil.copy2(self.file_path, backup_path)
+            store = self.backup_store
+            label = self.file_path.stem
+            manifest_path = store.snapshot([self], label)
             
-            # Удаляем старые бэкапы (оставляем последние 10)
-            self._cleanup_old_backups(backup_dir, keep=10)
+            # Блобы без ссылок удаляются пачкой, а не после каждой записи
+            store.prune(label, keep=self.BACKUP_KEEP, slack=self.BACKUP_PRUNE_SLACK)
             
-            return backup_path
+            return manifest_path
             
         except Exception as e:
             print(f"FileStorage: Error creating backup: {e}")
             return None
     
-    def _cleanup_old_backups(self, backup_dir: Path, keep: int = 10):
-        """Удалить старые резервные копии"""
-        try:
-            pattern = f"{self.file_path.stem}_*{self.file_path.suffix}"
-            backups = sorted(backup_dir.glob(pattern), key=lambda p: p.stat().st_mtime)
-            
-            if len(backups) > keep:
-                for backup in backups[:-keep]:
-                    backup.unlink()
-                    
-        except Exception as e:
-            print(f"FileStorage: Error cleaning backups: {e}")
-    
     def get_backup_list(self) -> List[Path]:
-        """Получить список резервных копий"""
+        """Получить список резервных копий (манифесты снимков и старые копии)"""
         backup_dir = self.storage_dir / 'backups'
         if not backup_dir.exists():
             return []
         
+        backups = [
+            manifest for manifest in self.backup_store.list_snapshots()
+            if self.filename in self._manifest_files(manifest)
+        ]
+        
+        # Полные копии, созданные до перехода на снимки
         pattern = f"{self.file_path.stem}_*{self.file_path.suffix}"
-        return sorted(backup_dir.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
+        backups.extend(backup_dir.glob(pattern))
+        
+        return sorted(backups, key=lambda p: p.stat().st_mtime, reverse=True)
     
     def restore_from_backup(self, backup_path: Path) -> bool:
-        """Восстановить из резервной копии"""
+        """Восстановить из резервной копии (манифест снимка или копия файла)"""
+        backup_path = Path(backup_path)
         try:
-            if backup_path.exists():
+            if BackupStore.is_manifest(backup_path):
+                content = BackupStore(backup_path.parent.parent).read_file(backup_path, self.filename)
+                if content is None:
+                    return False
+                
+                if self.journal_mode:
+                    # Лог относится к старому снимку
+                    self.journal.replace_snapshot(content)
+                    return True
+                
+                temp_file = self.file_path.with_suffix('.tmp')
+                with open(temp_file, 'wb') as f:
+                    f.write(content)
+                temp_file.replace(self.file_path)
+            
+            elif backup_path.exists():
+                if self.journal_mode:
+                    self.journal.replace_snapshot(backup_path.read_bytes())
+                    return True
                 shutil.copy2(backup_path, self.file_path)
-                return True
+            
+            else:
+                return False
+            
+            return True
+            
         except Exception as e:
             print(f"FileStorage: Error restoring from backup: {e}")
         
         return False
     
+    @staticmethod
+    def _manifest_files(manifest_path: Path) -> Dict[str, Any]:
+        """Файлы, входящие в снимок"""
+        try:
+            return BackupStore.read_manifest(manifest_path).get('files', {})
+        except (OSError, ValueError):
+            return {}
+    
     def merge_data(self, new_data: Dict[str, Any], 
                    strategy: str = 'update') -> Dict[str, Any]:
         """
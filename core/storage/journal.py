@@ -0,0 +1,506 @@
+# atrain/core/storage/journal.py
+"""
+Журнал изменений для FileStorage: снимок + append-only лог операций
+"""
+
+import os
+import json
+import uuid
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def process_file_lock(lock_path: Path):
+    """
+    Эксклюзивная межпроцессная блокировка через файл lock_path
+
+    Не реентерабельна: повторный вход из того же процесса на новом
+    дескрипторе заблокирует сам процесс.
+    """
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def shallow_copy_document(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Копия документа на два уровня вглубь
+
+    Хранилища заменяют записи коллекций целиком и не изменяют их на месте,
+    поэтому копировать сами записи не требуется.
+    """
+    result = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            value = dict(value)
+        elif isinstance(value, list):
+            value = list(value)
+        result[key] = value
+    return result
+
+
+class JournalDocument(dict):
+    """
+    Документ, выданный StorageJournal.read()
+
+    Помнит журнал и состояние, от которого его меняет вызывающий: write()
+    сравнивает с ним, а не с тем, что журнал прочитал последним.
+    """
+
+    __slots__ = ('journal', 'base')
+
+
+def _named_items(value: Any) -> bool:
+    """Список словарей с уникальным полем name"""
+    if not isinstance(value, list):
+        return False
+    names = set()
+    for item in value:
+        if not isinstance(item, dict) or 'name' not in item or item['name'] in names:
+            return False
+        names.add(item['name'])
+    return True
+
+
+def diff_documents(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Построить список операций, превращающих old в new
+
+    Словари сравниваются по ключам, списки именованных записей (теги) -
+    по полю name. Остальные значения заменяются целиком.
+    """
+    ops = []
+
+    for key in old:
+        if key not in new:
+            ops.append({'op': 'del', 'path': [key]})
+
+    for key, value in new.items():
+        old_value = old.get(key)
+        if key in old and old_value == value:
+            continue
+
+        if isinstance(old_value, dict) and isinstance(value, dict):
+            for sub_key in old_value:
+                if sub_key not in value:
+                    ops.append({'op': 'del', 'path': [key, sub_key]})
+            for sub_key, sub_value in value.items():
+                if sub_key not in old_value or old_value[sub_key] != sub_value:
+                    ops.append({'op': 'set', 'path': [key, sub_key], 'value': sub_value})
+            continue
+
+        if _named_items(old_value) and _named_items(value):
+            item_ops = []
+            new_names = {item['name'] for item in value}
+            for item in old_value:
+                if item['name'] not in new_names:
+                    item_ops.append({'op': 'remove', 'path': [key], 'name': item['name']})
+            old_items = {item['name']: item for item in old_value}
+            for item in value:
+                if old_items.get(item['name']) != item:
+                    item_ops.append({'op': 'upsert', 'path': [key], 'value': item})
+
+            # Порядок элементов операции не сохраняют - проверяем результат
+            replayed = list(old_value)
+            for op in item_ops:
+                replayed = _apply_to_list(replayed, op)
+            if replayed == value:
+                ops.extend(item_ops)
+                continue
+
+        ops.append({'op': 'set', 'path': [key], 'value': value})
+
+    return ops
+
+
+def _apply_to_list(items: List[Dict[str, Any]], op: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Применить операцию над списком именованных записей"""
+    if op['op'] == 'remove':
+        return [item for item in items if item.get('name') != op['name']]
+
+    value = op['value']
+    for i, item in enumerate(items):
+        if item.get('name') == value.get('name'):
+            items[i] = value
+            return items
+    items.append(value)
+    return items
+
+
+def apply_operation(data: Dict[str, Any], op: Dict[str, Any]):
+    """Применить операцию к документу (операции идемпотентны)"""
+    path = op['path']
+    container = data
+    for key in path[:-1]:
+        if not isinstance(container.get(key), dict):
+            container[key] = {}
+        container = container[key]
+    last = path[-1]
+
+    if op['op'] == 'set':
+        container[last] = op['value']
+    elif op['op'] == 'del':
+        container.pop(last, None)
+    elif op['op'] in ('upsert', 'remove'):
+        items = container.get(last)
+        if not isinstance(items, list):
+            items = []
+        container[last] = _apply_to_list(list(items), op)
+
+
+class StorageJournal:
+    """
+    Снимок JSON + лог операций в формате JSON Lines
+
+    Каждое изменение дописывается в лог компактной строкой с fsync,
+    поэтому стоимость записи пропорциональна размеру изменения. Когда лог
+    превышает порог, он в фоне сворачивается в новый снимок.
+
+    Несколько процессов могут работать с одним журналом: дозапись, чтение
+    и замена снимка идут под межпроцессной блокировкой файла <снимок>.lock.
+    Блокировка рассчитана на локальные диски и NFS с поддержкой lockd;
+    на файловых системах без блокировок журнал безопасен только для
+    одного пишущего процесса, поэтому режим по умолчанию выключен.
+
+    Документ, возвращенный read(), несет базу для write(): запись
+    сравнивается с тем состоянием, которое прочитал этот вызывающий, даже
+    если между чтением и записью журнал читали другие потоки.
+    """
+
+    def __init__(self, snapshot_path: Path, compact_threshold: int = 256 * 1024,
+                 on_compact: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            snapshot_path: Путь к файлу снимка (обычный JSON файл хранилища)
+            compact_threshold: Размер лога (байты), после которого запускается сворачивание
+            on_compact: Вызывается перед заменой снимка (например, для бэкапа)
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = self.snapshot_path.with_suffix(self.snapshot_path.suffix + '.log')
+        self.lock_path = self.snapshot_path.with_suffix(self.snapshot_path.suffix + '.lock')
+        self.compact_threshold = compact_threshold
+        self.on_compact = on_compact
+
+        self._lock = threading.RLock()
+        self._process_lock_depth = 0
+        self._document: Optional[Dict[str, Any]] = None
+        self._snapshot_signature = None
+        self._log_inode = None
+        self._log_offset = 0
+        self._compacting = False
+
+    # =====================
+    # Чтение
+    # =====================
+
+    def read(self) -> JournalDocument:
+        """
+        Получить актуальный документ (копию)
+
+        Измененный документ передается в write() тем же объектом: тогда
+        записываются только изменения относительно этого чтения.
+        """
+        with self._lock, self._process_lock():
+            self._refresh()
+            document = JournalDocument(shallow_copy_document(self._document))
+            document.journal = self
+            document.base = shallow_copy_document(self._document)
+            return document
+
+    def _base_for(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """База для записи data: состояние при его чтении или текущий документ"""
+        if isinstance(data, JournalDocument) and getattr(data, 'journal', None) is self:
+            return data.base
+        # Документ не из read() - записывается как новое состояние целиком
+        return self._document
+
+    def _refresh(self):
+        """Догнать изменения снимка и лога с диска"""
+        snapshot_signature = self._stat_signature(self.snapshot_path)
+        log_stat = self._stat(self.log_path)
+
+        full_reload = (
+            self._document is None or
+            snapshot_signature != self._snapshot_signature or
+            (log_stat is not None and log_stat.st_ino != self._log_inode) or
+            (log_stat is not None and log_stat.st_size < self._log_offset) or
+            (log_stat is None and self._log_offset > 0)
+        )
+
+        if full_reload:
+            self._document = self._load_snapshot()
+            self._snapshot_signature = snapshot_signature
+            self._log_inode = log_stat.st_ino if log_stat else None
+            self._log_offset = 0
+
+        if log_stat is not None and log_stat.st_size > self._log_offset:
+            self._replay_log_tail()
+
+    def _load_snapshot(self) -> Dict[str, Any]:
+        """Загрузить снимок"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _replay_log_tail(self):
+        """Применить записи лога после последней прочитанной позиции"""
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            for line in f:
+                # Недописанная строка (сбой во время записи) - останавливаемся
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    apply_operation(self._document, json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"StorageJournal: Skipping corrupt record in {self.log_path.name}: {e}")
+                self._log_offset += len(line)
+
+    # =====================
+    # Запись
+    # =====================
+
+    def write(self, data: Dict[str, Any]) -> int:
+        """
+        Записать новое состояние документа как набор операций
+
+        Операции строятся относительно состояния data при его чтении через
+        read() (или при прошлой записи того же объекта) и применяются поверх
+        актуального состояния: изменения других процессов и потоков в других
+        ключах сохраняются. Чтения из других потоков между read() и write()
+        базу не сдвигают.
+
+        Returns:
+            Количество записанных операций
+        """
+        with self._lock, self._process_lock():
+            # Под блокировкой лог дописываем только мы - догоняем чужие записи
+            self._refresh()
+            ops = diff_documents(self._base_for(data), data)
+            if isinstance(data, JournalDocument):
+                data.journal = self
+                data.base = shallow_copy_document(data)
+            if not ops:
+                return 0
+
+            payload = b''.join(
+                json.dumps(op, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+                for op in ops
+            )
+
+            # Недописанный хвост (сбой другого процесса) не трогаем, а закрываем
+            # переводом строки: при чтении он будет пропущен как испорченный
+            log_stat = self._stat(self.log_path)
+            if log_stat is not None and log_stat.st_size > self._log_offset:
+                payload = b'\n' + payload
+
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload)
+                os.fsync(fd)
+                log_stat = os.fstat(fd)
+            finally:
+                os.close(fd)
+
+            for op in ops:
+                apply_operation(self._document, op)
+
+            self._log_inode = log_stat.st_ino
+            self._log_offset = log_stat.st_size
+
+            if log_stat.st_size > self.compact_threshold:
+                self._schedule_compaction()
+
+            return len(ops)
+
+    def reset(self):
+        """Удалить лог (например, после восстановления снимка из бэкапа)"""
+        with self._lock, self._process_lock():
+            try:
+                self.log_path.unlink()
+            except FileNotFoundError:
+                pass
+            self._document = None
+
+    def replace_snapshot(self, content: bytes):
+        """Заменить снимок готовым содержимым и удалить лог (восстановление из бэкапа)"""
+        temp_file = self._unique_temp(self.snapshot_path)
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock, self._process_lock():
+                temp_file.replace(self.snapshot_path)
+                self.reset()
+        finally:
+            self._discard(temp_file)
+
+    # =====================
+    # Сворачивание
+    # =====================
+
+    def _schedule_compaction(self):
+        """Запустить сворачивание в фоновом потоке"""
+        if self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(
+            target=self.compact, name='ATrainJournalCompaction', daemon=True
+        ).start()
+
+    def compact(self) -> bool:
+        """Свернуть лог в новый снимок"""
+        temp_file = self._unique_temp(self.snapshot_path)
+        try:
+            with self._lock, self._process_lock():
+                self._refresh()
+                document = shallow_copy_document(self._document)
+                offset = self._log_offset
+                base = (self._snapshot_signature, self._log_inode)
+
+            # Тяжелая запись снимка идет без блокировки
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock, self._process_lock():
+                # Пока писали снимок, журнал мог свернуть другой процесс
+                log_stat = self._stat(self.log_path)
+                current = (self._stat_signature(self.snapshot_path),
+                           log_stat.st_ino if log_stat else None)
+                if current != base:
+                    return False
+
+                if self.on_compact is not None and self.snapshot_path.exists():
+                    self.on_compact()
+
+                # Под блокировкой лог не растет - хвост переносим целиком
+                tail = b''
+                if log_stat is not None:
+                    with open(self.log_path, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read()
+
+                temp_file.replace(self.snapshot_path)
+
+                # Сбой между заменой снимка и лога безопасен: операции идемпотентны
+                new_log = self._unique_temp(self.log_path)
+                try:
+                    with open(new_log, 'wb') as f:
+                        f.write(tail)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    new_log.replace(self.log_path)
+                finally:
+                    self._discard(new_log)
+
+                self._document = None
+                self._refresh()
+
+            return True
+
+        except Exception as e:
+            print(f"StorageJournal: Error compacting {self.snapshot_path.name}: {e}")
+            return False
+
+        finally:
+            self._discard(temp_file)
+            self._compacting = False
+
+    # =====================
+    # Служебное
+    # =====================
+
+    def exists(self) -> bool:
+        """Есть ли снимок или лог"""
+        return self.snapshot_path.exists() or self.log_path.exists()
+
+    def signature(self) -> Optional[tuple]:
+        """Сигнатура состояния снимка и лога"""
+        snapshot = self._stat_signature(self.snapshot_path)
+        log = self._stat_signature(self.log_path)
+        if snapshot is None and log is None:
+            return None
+        return (snapshot, log)
+
+    @contextmanager
+    def _process_lock(self):
+        """
+        Межпроцессная блокировка журнала (вызывается под self._lock)
+
+        Повторный вход (например, бэкап при сворачивании читает документ)
+        не берет блокировку заново: flock на новом дескрипторе заблокировал бы
+        сам процесс.
+        """
+        if self._process_lock_depth:
+            self._process_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._process_lock_depth -= 1
+            return
+
+        with process_file_lock(self.lock_path):
+            self._process_lock_depth = 1
+            try:
+                yield
+            finally:
+                self._process_lock_depth = 0
+
+    @staticmethod
+    def _unique_temp(path: Path) -> Path:
+        """Временный файл рядом с path, уникальный для процесса и вызова"""
+        return path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+
+    @staticmethod
+    def _discard(path: Path):
+        """Удалить временный файл, если он остался"""
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _stat(path: Path):
+        """os.stat или None если файла нет"""
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    @classmethod
+    def _stat_signature(cls, path: Path) -> Optional[tuple]:
+        """Сигнатура файла (mtime, размер, inode)"""
+        stat = cls._stat(path)
+        if stat is None:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
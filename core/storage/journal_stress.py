@@ -0,0 +1,181 @@
+# atrain/core/storage/journal_stress.py
+"""
+Проверка журнала при чтениях между load() и save()
+
+Наблюдатель, слои и бэкап при сворачивании читают журнал из своих
+потоков, пока вызывающий держит загруженный документ. Запись не должна
+откатывать изменения, сделанные другими процессами за это время.
+
+Сначала выполняется детерминированный сценарий в одном процессе, затем
+нагрузочный: несколько процессов дописывают свои ключи, а в каждом
+процессе фоновый поток непрерывно читает тот же журнал:
+
+    python -m atrain.core.storage.journal_stress --processes 4 --writes 100
+
+Отчет выводится в JSON; код возврата 1, если проверка не прошла.
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .journal import StorageJournal
+
+
+DEFAULT_PROCESSES = 4
+DEFAULT_WRITES = 100
+
+# Маленький порог, чтобы сворачивание шло и во время проверки
+STRESS_COMPACT_THRESHOLD = 4096
+
+
+def check_interleaved_read(directory: Path) -> Dict[str, Any]:
+    """
+    Чтение из другого потока между load() и save() этого вызывающего
+
+    Returns:
+        Отчет сценария
+    """
+    snapshot = directory / 'interleaved.json'
+    snapshot.write_text(json.dumps({'items': {}}), encoding='utf-8')
+
+    ours = StorageJournal(snapshot)
+    other_process = StorageJournal(snapshot)
+
+    document = ours.read()
+
+    # Другой процесс добавляет свой ключ
+    theirs = other_process.read()
+    theirs['items']['theirs'] = 1
+    other_process.write(theirs)
+
+    # Поток наблюдателя читает тот же экземпляр журнала
+    reader = threading.Thread(target=ours.read)
+    reader.start()
+    reader.join()
+
+    document['items']['ours'] = 1
+    ours.write(document)
+
+    items = StorageJournal(snapshot).read().get('items', {})
+    return {
+        'items': sorted(items),
+        'passed': items == {'theirs': 1, 'ours': 1}
+    }
+
+
+def _worker(snapshot: str, worker_id: int, writes: int, start: Any, queue: Any):
+    """Процесс: дописывать свои ключи, пока фоновый поток читает журнал"""
+    journal = StorageJournal(Path(snapshot), compact_threshold=STRESS_COMPACT_THRESHOLD)
+    stop = threading.Event()
+    reads = [0]
+    errors = []
+
+    def read_continuously():
+        while not stop.is_set():
+            journal.read()
+            reads[0] += 1
+
+    reader = threading.Thread(target=read_continuously, daemon=True)
+    start.wait()
+    reader.start()
+
+    try:
+        for i in range(writes):
+            document = journal.read()
+            items = dict(document.get('items', {}))
+            items[f'{worker_id}-{i}'] = i
+            document['items'] = items
+            # Окно, в которое фоновый поток успевает прочитать журнал
+            time.sleep(0.001)
+            journal.write(document)
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        stop.set()
+        reader.join()
+
+    queue.put({'worker': worker_id, 'reads': reads[0], 'errors': errors})
+
+
+def run_stress(processes: int = DEFAULT_PROCESSES,
+               writes: int = DEFAULT_WRITES) -> Dict[str, Any]:
+    """
+    Запустить проверку
+
+    Args:
+        processes: Количество одновременных процессов
+        writes: Записей на процесс
+
+    Returns:
+        Отчет: сценарий с чтением между load/save, потерянные ключи, ошибки
+    """
+    directory = Path(tempfile.mkdtemp(prefix='atrain_journal_stress_'))
+    try:
+        interleaved = check_interleaved_read(directory)
+
+        snapshot = directory / 'stress.json'
+        snapshot.write_text(json.dumps({'items': {}}), encoding='utf-8')
+
+        context = multiprocessing.get_context('spawn')
+        start = context.Event()
+        queue = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(str(snapshot), worker_id, writes, start, queue))
+            for worker_id in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        started = time.monotonic()
+        start.set()
+        reports = [queue.get() for _worker_process in workers]
+        elapsed = time.monotonic() - started
+
+        for worker in workers:
+            worker.join()
+
+        items = StorageJournal(snapshot).read().get('items', {})
+        expected = {f'{worker_id}-{i}' for worker_id in range(processes) for i in range(writes)}
+        lost = sorted(expected - set(items))
+        errors = [error for report in reports for error in report['errors']]
+
+        return {
+            'processes': processes,
+            'writes_per_process': writes,
+            'elapsed': round(elapsed, 3),
+            'interleaved_read': interleaved,
+            'background_reads': sum(report['reads'] for report in reports),
+            'items': len(items),
+            'lost': lost[:20],
+            'lost_count': len(lost),
+            'errors': errors,
+            'passed': interleaved['passed'] and not lost and not errors
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='A-Train storage journal stress test')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help='Concurrent processes')
+    parser.add_argument('--writes', type=int, default=DEFAULT_WRITES,
+                        help='Load/save cycles per process')
+    args = parser.parse_args(argv)
+
+    report = run_stress(args.processes, args.writes)
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+# atrain/core/storage/layers.py
+"""
+Слоистое наложение настроек: default / studio / show / sequence / shot / user
+"""
+
+import os
+import copy
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set
+
+from .file_storage import FileStorage, _current_script_name, user_storage_directory
+from ..models import PresetData, TagData
+from ..nuke import nuke_bridge
+
+
+# Переменная окружения с директорией студийных настроек
+STUDIO_DIR_ENV = 'ATRAIN_STUDIO_DIR'
+
+
+class SettingsLayer:
+    """
+    Один слой настроек
+
+    Пишущие слои (дефолты и пользовательский файл) читаются через свой
+    FileStorage, остальные - только читаются напрямую, без создания директорий.
+    """
+
+    def __init__(self, name: str, path: Path, source: str,
+                 storage: Optional[FileStorage] = None):
+        """
+        Args:
+            name: Имя слоя (default, studio, show, sequence, shot, user, custom)
+            path: Путь к файлу слоя
+            source: Значение source для моделей из этого слоя
+            storage: FileStorage если слой доступен для записи
+        """
+        self.name = name
+        self.path = Path(path)
+        self.source = source
+        self.storage = storage
+
+        self.signature: Optional[tuple] = None
+        self.loaded = False
+        self.raw: Dict[str, Any] = {}     # ключ -> исходный словарь
+        self.items: Dict[str, Any] = {}   # ключ -> модель
+
+    @property
+    def writable(self) -> bool:
+        """Можно ли писать в слой"""
+        return self.storage is not None
+
+    def current_signature(self) -> Optional[tuple]:
+        """Сигнатура файла слоя (None если файла нет)"""
+        if self.storage is not None:
+            return self.storage.change_signature()
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def read(self) -> Dict[str, Any]:
+        """Прочитать документ слоя"""
+        if self.storage is not None:
+            return self.storage.load()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"LayeredSettings: Error loading layer '{self.name}' ({self.path}): {e}")
+            return {}
+
+
+def discover_layers(filename: str, defaults: FileStorage,
+                    custom: FileStorage) -> List[SettingsLayer]:
+    """
+    Найти слои настроек по правилам разрешения директории хранилища
+
+    Пользовательский (записываемый) файл всегда верхний слой: иначе слои
+    sequence, shot или user над ним молча перекрывали бы то, что только что
+    сохранил пользователь. Если директория хранилища совпадает с директорией
+    одного из слоев (обычно show - папка проекта/.atrain), этот слой
+    переносится наверх под своим именем. Явно заданная посторонняя
+    директория используется без слоев проекта и пользователя.
+
+    Args:
+        filename: Имя файла настроек в каждом слое
+        defaults: Хранилище дефолтов
+        custom: Пользовательское (записываемое) хранилище
+
+    Returns:
+        Слои снизу вверх
+    """
+    layers = [SettingsLayer('default', defaults.file_path, 'default', defaults)]
+
+    studio_dir = os.environ.get(STUDIO_DIR_ENV)
+    if studio_dir:
+        layers.append(SettingsLayer('studio', Path(studio_dir) / filename, 'studio'))
+
+    bridge = nuke_bridge()
+    project_root = bridge.find_project_root()
+
+    candidates = []
+    if project_root:
+        root = Path(project_root)
+        candidates.append(('show', root / '.atrain'))
+        candidates.extend(_find_shot_directories(root, bridge.get_script_path()))
+    candidates.append(('user', user_storage_directory()))
+
+    # Явно заданная посторонняя директория (например, временная) изолирована
+    if (custom._requested_dir is not None and
+            all(directory != custom.storage_dir for _name, directory in candidates)):
+        candidates = []
+
+    custom_name = 'custom'
+    for name, directory in candidates:
+        if directory == custom.storage_dir:
+            custom_name = name
+        else:
+            layers.append(SettingsLayer(name, directory / filename, name))
+
+    layers.append(SettingsLayer(custom_name, custom.file_path, 'custom', custom))
+    return layers
+
+
+def _find_shot_directories(project_root: Path, script_path: Optional[str]) -> List[tuple]:
+    """
+    Директории .atrain между корнем проекта и папкой скрипта
+
+    Ближайшая к скрипту - слой shot, все выше нее - слои sequence.
+    """
+    if not script_path:
+        return []
+
+    script_dir = Path(script_path)
+    if script_dir.suffix:
+        script_dir = script_dir.parent
+
+    try:
+        script_dir.relative_to(project_root)
+    except ValueError:
+        return []
+
+    found = []
+    directory = script_dir
+    while directory != project_root:
+        if (directory / '.atrain').is_dir():
+            found.append(directory / '.atrain')
+        directory = directory.parent
+
+    found.reverse()
+    return [
+        ('shot' if i == len(found) - 1 else 'sequence', directory)
+        for i, directory in enumerate(found)
+    ]
+
+
+def _detached_copy(item: Any) -> Any:
+    """
+    Копия модели без общих изменяемых полей
+
+    Поля моделей - строки, перечисления и списки строк; копируются только
+    контейнеры, это заметно дешевле copy.deepcopy для тысяч элементов.
+    Вложенные контейнеры копируются глубоко.
+    """
+    clone = copy.copy(item)
+    for name, value in vars(clone).items():
+        if isinstance(value, (list, dict, set)):
+            elements = value.values() if isinstance(value, dict) else value
+            if any(isinstance(element, (list, dict, set)) for element in elements):
+                value = copy.deepcopy(value)
+            else:
+                value = value.copy()
+            setattr(clone, name, value)
+    return clone
+
+
+class LayeredSettings:
+    """
+    Материализованное слияние слоев одной коллекции (пресеты или теги)
+
+    Результат слияния хранится между вызовами. Каждый слой проверяется по
+    своей сигнатуре файла: при изменении слоя перечитывается только он, а
+    победитель пересчитывается только для ключей, изменившихся в этом слое.
+
+    Без перекрытия (shadow=False) items() возвращает записи всех слоев,
+    в том числе с одинаковыми ключами; get() по-прежнему берет верхний слой.
+    """
+
+    def __init__(self, kind: str, defaults: FileStorage, custom: FileStorage,
+                 check_interval: float = 1.0, shadow: bool = True):
+        """
+        Args:
+            kind: 'presets' или 'tags'
+            defaults: Хранилище дефолтов
+            custom: Пользовательское хранилище
+            check_interval: Минимальный интервал между проверками слоев (секунды)
+            shadow: Верхний слой скрывает записи с тем же ключом в нижних
+        """
+        self.kind = kind
+        self.defaults = defaults
+        self.custom = custom
+        self.check_interval = check_interval
+        self.shadow = shadow
+
+        self._lock = threading.RLock()
+        self._layers: Optional[List[SettingsLayer]] = None
+        self._script: Optional[str] = None
+        self._winners: Dict[str, int] = {}  # ключ -> индекс слоя-победителя
+        self._materialized: Optional[List[Any]] = None
+        self._last_check = 0.0
+        self._dirty = True
+
+        # Увеличивается при каждом изменении результата слияния
+        self.revision = 0
+
+    @property
+    def layers(self) -> List[SettingsLayer]:
+        """Текущие слои снизу вверх"""
+        with self._lock:
+            self.refresh()
+            return list(self._layers)
+
+    def invalidate(self):
+        """Проверить слои при следующем обращении (после своей записи)"""
+        self._dirty = True
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Проверить сигнатуры слоев и пересобрать изменившиеся
+
+        Args:
+            force: Игнорировать интервал проверки
+
+        Returns:
+            True если результат слияния изменился
+        """
+        with self._lock:
+            script = _current_script_name(nuke_bridge())
+            if self._layers is None or script != self._script:
+                self._rebuild_layers(script)
+                return True
+
+            now = time.monotonic()
+            if not (force or self._dirty or now - self._last_check >= self.check_interval):
+                return False
+
+            self._dirty = False
+            self._last_check = now
+
+            changed = False
+            for layer in self._layers:
+                signature = layer.current_signature()
+                if layer.loaded and signature == layer.signature:
+                    continue
+
+                keys = self._reload_layer(layer, signature)
+                if keys:
+                    self._merge_keys(keys)
+                    changed = True
+
+            if changed:
+                self._materialized = None
+                self.revision += 1
+
+            return changed
+
+    def items(self) -> List[Any]:
+        """Все элементы результата слияния (глубокие копии моделей)"""
+        with self._lock:
+            self.refresh()
+            if self._materialized is None:
+                self._materialized = self._materialize()
+            return [_detached_copy(item) for item in self._materialized]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Элемент по ключу (глубокая копия модели)"""
+        with self._lock:
+            self.refresh()
+            index = self._winners.get(key)
+            if index is None:
+                return None
+            return _detached_copy(self._layers[index].items[key])
+
+    def layer_of(self, key: str) -> Optional[str]:
+        """Имя слоя, из которого взят элемент"""
+        with self._lock:
+            self.refresh()
+            index = self._winners.get(key)
+            return self._layers[index].name if index is not None else None
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _rebuild_layers(self, script: str):
+        """Заново найти слои (первое обращение или смена скрипта)"""
+        filename = self.custom.filename
+        self._layers = discover_layers(filename, self.defaults, self.custom)
+        self._script = script
+        self._winners = {}
+
+        keys: Set[str] = set()
+        for layer in self._layers:
+            keys |= self._reload_layer(layer, layer.current_signature())
+        self._merge_keys(keys)
+
+        self._dirty = False
+        self._last_check = time.monotonic()
+        self._materialized = None
+        self.revision += 1
+
+    def _reload_layer(self, layer: SettingsLayer, signature: Optional[tuple]) -> Set[str]:
+        """
+        Перечитать слой
+
+        Returns:
+            Ключи, значения которых в слое изменились
+        """
+        new_raw = self._extract(layer.read()) if signature is not None else {}
+        old_raw = layer.raw
+
+        changed = {
+            key for key in set(old_raw) | set(new_raw)
+            if old_raw.get(key) != new_raw.get(key)
+        }
+
+        for key in changed:
+            layer.items.pop(key, None)
+            if key not in new_raw:
+                continue
+            try:
+                item = self._parse(key, new_raw[key])
+                item.source = layer.source
+                layer.items[key] = item
+            except Exception as e:
+                print(f"LayeredSettings: Skipping invalid {self.kind} entry '{key}' "
+                      f"in layer '{layer.name}': {e}")
+
+        # Порядок ключей в слое определяет порядок в результате
+        if list(new_raw) != list(old_raw):
+            layer.items = {key: layer.items[key] for key in new_raw if key in layer.items}
+            changed = changed or set(new_raw)
+
+        layer.raw = new_raw
+        layer.signature = signature
+        layer.loaded = True
+        return changed
+
+    def _merge_keys(self, keys: Set[str]):
+        """Пересчитать слой-победитель для указанных ключей"""
+        for key in keys:
+            for index in range(len(self._layers) - 1, -1, -1):
+                if key in self._layers[index].items:
+                    self._winners[key] = index
+                    break
+            else:
+                self._winners.pop(key, None)
+
+    def _materialize(self) -> List[Any]:
+        """Собрать результат в порядке слоев и ключей внутри слоя"""
+        result = []
+        for index, layer in enumerate(self._layers):
+            for key, item in layer.items.items():
+                if not self.shadow or self._winners.get(key) == index:
+                    result.append(item)
+        return result
+
+    def _extract(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Извлечь записи коллекции из документа слоя"""
+        if self.kind == 'presets':
+            return dict(data.get('presets', {}))
+
+        entries = {}
+        for tag_dict in data.get('tags', []):
+            if isinstance(tag_dict, dict) and tag_dict.get('name'):
+                entries[tag_dict['name']] = tag_dict
+        return entries
+
+    def _parse(self, key: str, raw: Any):
+        """Создать модель из записи"""
+        if self.kind == 'presets':
+            return PresetData.from_dict(key, raw)
+        return TagData.from_dict(raw)
@@ -5,9 +5,11 @@
 
 from typing import Dict, List, Optional
 from datetime import datetime
+from pathlib import Path
 import getpass
 
 from .file_storage import FileStorage
+from .layers import LayeredSettings
 from ..models import PresetData
 from ..utils import event_bus
 
@@ -15,10 +17,23 @@ from ..utils import event_bus
 class PresetStorage(FileStorage):
     """Управление хранением пресетов"""
     
-    def __init__(self):
-        super().__init__('atrain_presets.json')
-        self._defaults_storage = FileStorage('atrain_defaults.json')
+    def __init__(self, storage_dir: Optional[Path] = None, journal: bool = False):
+        super().__init__('atrain_presets.json', storage_dir, journal)
+        self._defaults_storage = FileStorage('atrain_defaults.json', storage_dir)
         self._ensure_defaults()
+        self.layers = LayeredSettings('presets', self._defaults_storage, self)
+    
+    def save(self, data: Dict, backup: bool = True) -> bool:
+        """Сохранить файл и пометить слои для перепроверки"""
+        success = super().save(data, backup)
+        self.layers.invalidate()
+        return success
+    
+    def restore_from_backup(self, backup_path: Path) -> bool:
+        """Восстановить из резервной копии и пометить слои для перепроверки"""
+        success = super().restore_from_backup(backup_path)
+        self.layers.invalidate()
+        return success
     
     def _ensure_defaults(self):
         """Создать файл с дефолтными пресетами если не существует"""
@@ -57,29 +72,12 @@ class PresetStorage(FileStorage):
             self._defaults_storage.save(defaults)
     
     def get_all_presets(self) -> Dict[str, PresetData]:
-        """Получить все пресеты (дефолтные + пользовательские)"""
-        presets = {}
-        
-        # Загружаем дефолтные
-        defaults_data = self._defaults_storage.load()
-        for name, data in defaults_data.get('presets', {}).items():
-            preset = PresetData.from_dict(name, data)
-            preset.source = 'default'
-            presets[name] = preset
-        
-        # Загружаем пользовательские
-        custom_data = self.load()
-        for name, data in custom_data.get('presets', {}).items():
-            preset = PresetData.from_dict(name, data)
-            preset.source = 'custom'
-            presets[name] = preset
-        
-        return presets
+        """Получить все пресеты (слияние слоев от дефолтных до пользовательских)"""
+        return {preset.name: preset for preset in self.layers.items()}
     
     def get_preset(self, name: str) -> Optional[PresetData]:
         """Получить конкретный пресет"""
-        all_presets = self.get_all_presets()
-        return all_presets.get(name)
+        return self.layers.get(name)
     
     def save_preset(self, preset: PresetData) -> bool:
         """Сохранить пользовательский пресет"""
@@ -115,14 +113,76 @@ class PresetStorage(FileStorage):
             print(f"PresetStorage: Error saving preset '{preset.name}': {e}")
             return False
     
+    def save_presets(self, presets: List[PresetData], backup: bool = True) -> int:
+        """
+        Сохранить пачку пользовательских пресетов одной записью файла
+        
+        Args:
+            presets: Пресеты для сохранения (существующие с тем же именем заменяются)
+            backup: Создать резервную копию перед записью
+            
+        Returns:
+            Количество сохраненных пресетов
+        """
+        try:
+            data = self.load()
+            return self.save_merged(data, self.merge_presets(data, presets), backup)
+        except Exception as e:
+            print(f"PresetStorage: Error saving {len(presets)} presets: {e}")
+            return 0
+    
+    def merge_presets(self, data: Dict, presets: List[PresetData]) -> int:
+        """
+        Добавить или заменить пресеты в загруженном документе без записи файла
+        
+        Returns:
+            Количество примененных пресетов
+        """
+        if 'presets' not in data:
+            data['presets'] = {}
+        
+        now = datetime.now().isoformat()
+        author = getpass.getuser()
+        count = 0
+        
+        for preset in presets:
+            if preset.source == 'default':
+                continue
+            
+            preset.modified = now
+            preset.author = preset.author or author
+            data['presets'][preset.name] = preset.to_dict()
+            count += 1
+        
+        return count
+    
+    def save_merged(self, data: Dict, count: int, backup: bool = True) -> int:
+        """
+        Записать документ после merge_presets
+        
+        Returns:
+            Количество сохраненных пресетов (0 при ошибке)
+        """
+        if not count:
+            return 0
+        
+        data['version'] = "1.5"
+        data['last_modified'] = datetime.now().isoformat()
+        
+        if not self.save(data, backup):
+            return 0
+        
+        event_bus().publish('presets_imported', count)
+        return count
+    
     def delete_preset(self, name: str) -> bool:
         """Удалить пользовательский пресет"""
         preset = self.get_preset(name)
         if not preset:
             return False
         
-        if preset.source == 'default':
-            print("PresetStorage: Cannot delete default presets")
+        if preset.source != 'custom':
+            print(f"PresetStorage: Cannot delete {preset.source} presets")
             return False
         
         try:
@@ -170,7 +230,7 @@ class PresetStorage(FileStorage):
             return True
         
         preset = self.get_preset(old_name)
-        if not preset or preset.source == 'default':
+        if not preset or preset.source != 'custom':
             return False
         
         # Проверяем что новое имя не занято
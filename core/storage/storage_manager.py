@@ -3,57 +3,231 @@
 Централизованный менеджер хранилищ
 """
 
+import os
+import json
+import itertools
+import threading
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from datetime import datetime
-import shutil
 import zipfile
 
 from .preset_storage import PresetStorage
 from .tag_storage import TagStorage
 from .category_storage import CategoryStorage
-from ..models import PresetData, TagData
+from .file_storage import resolve_storage_directory
+from .backup_store import BackupStore
+from ..models import PresetData, TagData, TagType, ResolvedPreset
 from ..utils import event_bus
 
 
+# Версия формата файлов настроек
+SETTINGS_VERSION = '1.5'
+
+# Идентификатор потокового формата экспорта (JSON Lines)
+STREAM_FORMAT = 'atrain-settings-stream'
+
+# Размер пачки записей при импорте
+IMPORT_CHUNK_SIZE = 2000
+
+
 class StorageManager:
     """Фасад для работы со всеми хранилищами"""
     
-    def __init__(self):
-        self.presets = PresetStorage()
-        self.tags = TagStorage()
-        self.categories = CategoryStorage()
+    COLLECTIONS = ('presets', 'tags', 'categories')
+    
+    # События, после которых коллекция считается измененной
+    INVALIDATION_EVENTS = {
+        'presets': ('preset_saved', 'preset_deleted', 'preset_renamed', 'presets_imported'),
+        'tags': ('tag_saved', 'tag_deleted', 'tags_imported'),
+        'categories': (
+            'tag_category_added', 'tag_category_removed', 'tag_category_renamed',
+            'preset_category_added', 'preset_category_removed', 'preset_category_renamed',
+            'tag_categories_updated', 'preset_categories_updated'
+        )
+    }
+    
+    def __init__(self, storage_dir: Optional[Path] = None, journal: bool = False):
+        """
+        Args:
+            storage_dir: Директория хранилища (если None - определяется автоматически)
+            journal: Хранить пользовательские пресеты и теги в режиме журнала
+        """
+        self.presets = PresetStorage(storage_dir, journal)
+        self.tags = TagStorage(storage_dir, journal)
+        self.categories = CategoryStorage(storage_dir)
+        
+        # Поколения коллекций: увеличиваются при каждом изменении
+        self._generations = {collection: 0 for collection in self.COLLECTIONS}
         
-        # Кеш для оптимизации
-        self._cache_valid = False
-        self._preset_cache = {}
-        self._tag_cache = []
+        # Кеши: ключ -> (поколения на момент построения, значение)
+        self._views: Dict[str, tuple] = {}
+        
+        # Наблюдатель за внешними изменениями (создается по запросу)
+        self._watcher = None
         
         # Подписываемся на события изменения данных
-        event_bus().subscribe('preset_saved', self._invalidate_cache)
-        event_bus().subscribe('preset_deleted', self._invalidate_cache)
-        event_bus().subscribe('tag_saved', self._invalidate_cache)
-        event_bus().subscribe('tag_deleted', self._invalidate_cache)
+        for collection, event_types in self.INVALIDATION_EVENTS.items():
+            handler = getattr(self, f'_on_{collection}_changed')
+            for event_type in event_types:
+                event_bus().subscribe(event_type, handler)
+        
+        for event_type in ('settings_restored', 'settings_imported'):
+            event_bus().subscribe(event_type, self._invalidate_cache)
+    
+    def _on_presets_changed(self, data=None):
+        """Пресеты изменились"""
+        self.presets.layers.invalidate()
+        self._generations['presets'] += 1
+    
+    def _on_tags_changed(self, data=None):
+        """Теги изменились"""
+        self.tags.layers.invalidate()
+        self._generations['tags'] += 1
+    
+    def _on_categories_changed(self, data=None):
+        """Категории изменились"""
+        self._generations['categories'] += 1
     
     def _invalidate_cache(self, data=None):
-        """Инвалидировать кеш"""
-        self._cache_valid = False
+        """Инвалидировать кеш всех коллекций"""
+        self.presets.layers.invalidate()
+        self.tags.layers.invalidate()
+        for collection in self.COLLECTIONS:
+            self._generations[collection] += 1
+    
+    def get_generation(self, *collections: str) -> tuple:
+        """Получить поколения указанных коллекций (по умолчанию всех)"""
+        collections = collections or self.COLLECTIONS
+        self._sync_layers(collections)
+        return tuple(self._generations[c] for c in collections)
+    
+    def _sync_layers(self, collections: tuple):
+        """Учесть изменения файлов слоев, сделанные в обход событий"""
+        if 'presets' in collections and self.presets.layers.refresh():
+            self._generations['presets'] += 1
+        if 'tags' in collections and self.tags.layers.refresh():
+            self._generations['tags'] += 1
+    
+    def cached_view(self, key: str, collections: tuple, builder):
+        """
+        Получить производное представление, закешированное по поколениям
+        
+        Значение общее для всех вызовов и отдается без копирования, поэтому
+        builder должен строить его только для чтения (кортежи,
+        MappingProxyType). Элементы внутри - общие модели: вызывающий,
+        которому нужно их менять, копирует их сам.
+        
+        Args:
+            key: Ключ представления
+            collections: Коллекции, от которых зависит представление
+            builder: Функция построения значения
+        """
+        # Поколения фиксируем до построения: изменение во время
+        # построения не должно попасть в кеш как актуальное
+        stamp = self.get_generation(*collections)
+        cached = self._views.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        value = builder()
+        self._views[key] = (stamp, value)
+        return value
+    
+    # =====================
+    # Внешние изменения
+    # =====================
+    
+    def start_watching(self, interval: float = 2.0):
+        """
+        Запустить отслеживание внешних изменений файлов настроек
+        
+        Args:
+            interval: Интервал опроса (секунды)
+        """
+        if self._watcher is None:
+            from .watcher import StorageWatcher
+            self._watcher = StorageWatcher(self, interval)
+        self._watcher.start()
+    
+    def stop_watching(self):
+        """Остановить отслеживание внешних изменений"""
+        if self._watcher is not None:
+            self._watcher.stop()
     
     # =====================
     # Пресеты
     # =====================
     
-    def get_all_presets(self) -> Dict[str, PresetData]:
-        """Получить все пресеты с кешированием"""
-        if not self._cache_valid:
-            self._preset_cache = self.presets.get_all_presets()
-            self._cache_valid = True
-        return self._preset_cache
+    def get_all_presets(self) -> Mapping[str, PresetData]:
+        """Получить все пресеты с кешированием (только для чтения)"""
+        return self.cached_view(
+            'presets', ('presets',),
+            lambda: MappingProxyType(self.presets.get_all_presets())
+        )
     
     def get_preset(self, name: str) -> Optional[PresetData]:
-        """Получить конкретный пресет"""
+        """Получить конкретный пресет (общая модель, только для чтения)"""
         return self.get_all_presets().get(name)
     
+    def resolve_preset(self, name: str,
+                       format_type: Optional[str] = None) -> Optional[ResolvedPreset]:
+        """
+        Получить пресет с привязанной цепочкой тегов
+        
+        Результат кешируется по имени, формату и поколениям пресетов и тегов,
+        поэтому повторные вызовы не трогают хранилище. ResolvedPreset
+        неизменяем, цепочка тегов - кортеж.
+        
+        Args:
+            name: Имя пресета
+            format_type: Формат вывода (если None - формат пресета)
+        """
+        return self.cached_view(
+            f'resolved_preset:{name}:{format_type}', ('presets', 'tags'),
+            lambda: self._build_resolved_preset(name, format_type)
+        )
+    
+    def _build_resolved_preset(self, name: str,
+                               format_type: Optional[str]) -> Optional[ResolvedPreset]:
+        """Разрешить теги пресета"""
+        preset = self.get_preset(name)
+        if not preset:
+            return None
+        
+        tags_by_name = self.get_tags_by_name()
+        output_format = format_type or preset.format
+        tags = []
+        missing_tags = []
+        
+        for tag_name in preset.tags:
+            tag = tags_by_name.get(tag_name)
+            if tag is not None:
+                tags.append(tag)
+            else:
+                missing_tags.append(tag_name)
+        
+        # Format тег замыкает цепочку
+        tags.append(TagData(
+            name='format',
+            type=TagType.FORMAT,
+            format=output_format,
+            padding='%04d'
+        ))
+        
+        if missing_tags:
+            print(f"StorageManager: Preset '{name}' references missing tags: "
+                  f"{', '.join(missing_tags)}")
+        
+        return ResolvedPreset(
+            preset=preset,
+            tags=tuple(tags),
+            format=output_format,
+            missing_tags=tuple(missing_tags),
+            generation=self.get_generation('presets', 'tags')
+        )
+    
     def save_custom_preset(self, name: str, tags: List[str], 
                           format_type: str = "exr", 
                           category: str = "General") -> bool:
@@ -73,7 +247,9 @@ class StorageManager:
     
     def get_preset_categories(self) -> List[str]:
         """Получить категории пресетов"""
-        return self.categories.get_preset_categories()
+        return list(self.cached_view(
+            'preset_categories', ('categories',), self.categories.get_preset_categories
+        ))
     
     def save_preset_categories(self, categories: List[str]) -> bool:
         """Сохранить категории пресетов"""
@@ -83,19 +259,20 @@ class StorageManager:
     # Теги
     # =====================
     
-    def get_all_tags(self) -> List[TagData]:
-        """Получить все теги с кешированием"""
-        if not self._cache_valid:
-            self._tag_cache = self.tags.get_all_tags()
-            self._cache_valid = True
-        return self._tag_cache
+    def get_all_tags(self) -> Tuple[TagData, ...]:
+        """Получить все теги с кешированием (только для чтения)"""
+        return self.cached_view('tags', ('tags',), lambda: tuple(self.tags.get_all_tags()))
+    
+    def get_tags_by_name(self) -> Mapping[str, TagData]:
+        """Получить индекс тегов по имени (последний тег с именем побеждает)"""
+        return self.cached_view(
+            'tags_by_name', ('tags',),
+            lambda: MappingProxyType({tag.name: tag for tag in self.get_all_tags()})
+        )
     
     def get_tag(self, name: str) -> Optional[TagData]:
-        """Получить конкретный тег"""
-        for tag in self.get_all_tags():
-            if tag.name == name:
-                return tag
-        return None
+        """Получить конкретный тег из верхнего слоя (общая модель, только для чтения)"""
+        return self.get_tags_by_name().get(name)
     
     def add_custom_tag(self, tag_data: Dict[str, Any]) -> bool:
         """Добавить пользовательский тег"""
@@ -109,7 +286,9 @@ class StorageManager:
     
     def get_tag_categories(self) -> List[str]:
         """Получить категории тегов"""
-        return self.categories.get_tag_categories()
+        return list(self.cached_view(
+            'tag_categories', ('categories',), self.categories.get_tag_categories
+        ))
     
     def save_tag_categories(self, categories: List[str]) -> bool:
         """Сохранить категории тегов"""
@@ -119,8 +298,14 @@ class StorageManager:
     # Группированные данные
     # =====================
     
-    def get_all_tags_grouped(self) -> Dict[str, List[TagData]]:
-        """Получить теги, сгруппированные по категориям"""
+    def get_all_tags_grouped(self) -> Mapping[str, Tuple[TagData, ...]]:
+        """Получить теги, сгруппированные по категориям (только для чтения)"""
+        return self.cached_view(
+            'tags_grouped', ('tags', 'categories'), self._build_tags_grouped
+        )
+    
+    def _build_tags_grouped(self) -> Mapping[str, Tuple[TagData, ...]]:
+        """Построить группировку тегов"""
         all_tags = self.get_all_tags()
         categories = self.get_tag_categories()
         
@@ -130,16 +315,33 @@ class StorageManager:
                 grouped[category] = []
         
         for tag in all_tags:
-            if tag.source == 'default':
-                grouped['System'].append(tag)
-            else:
-                category = tag.category if tag.category in categories else 'General'
-                grouped[category].append(tag)
+            grouped.setdefault(self._item_group(tag, categories), []).append(tag)
+        
+        return MappingProxyType({group: tuple(tags) for group, tags in grouped.items()})
+    
+    def get_tag_group_entries(self, name: str) -> List[Tuple[str, TagData]]:
+        """
+        Группы и теги с указанным именем для точечного обновления списков
+        
+        Имя может встречаться и у системного, и у пользовательского тега.
         
-        return grouped
+        Returns:
+            Список (группа, тег); пустой если тегов с таким именем нет
+        """
+        categories = self.get_tag_categories()
+        return [
+            (self._item_group(tag, categories), tag)
+            for tag in self.get_all_tags() if tag.name == name
+        ]
     
-    def get_all_presets_grouped(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Получить пресеты, сгруппированные по категориям"""
+    def get_all_presets_grouped(self) -> Mapping[str, Tuple[Mapping[str, Any], ...]]:
+        """Получить пресеты, сгруппированные по категориям (только для чтения)"""
+        return self.cached_view(
+            'presets_grouped', ('presets', 'categories'), self._build_presets_grouped
+        )
+    
+    def _build_presets_grouped(self) -> Mapping[str, Tuple[Mapping[str, Any], ...]]:
+        """Построить группировку пресетов"""
         all_presets = self.get_all_presets()
         categories = self.get_preset_categories()
         
@@ -149,22 +351,44 @@ class StorageManager:
                 grouped[category] = []
         
         for name, preset in all_presets.items():
-            preset_info = {
-                'name': name,
-                'source': preset.source,
-                'category': preset.category,
-                'format': preset.format,
-                'tags_count': len(preset.tags),
-                'data': preset
-            }
-            
-            if preset.source == 'default':
-                grouped['System'].append(preset_info)
-            else:
-                category = preset.category if preset.category in categories else 'General'
-                grouped[category].append(preset_info)
+            grouped.setdefault(self._item_group(preset, categories), []).append(
+                self._preset_info(name, preset)
+            )
         
-        return grouped
+        return MappingProxyType({group: tuple(entries) for group, entries in grouped.items()})
+    
+    def get_preset_group_entries(self, name: str) -> List[Tuple[str, Mapping[str, Any]]]:
+        """
+        Группа и описание пресета для точечного обновления списков
+        
+        Returns:
+            Список (группа, описание как в get_all_presets_grouped);
+            пустой если пресета нет
+        """
+        preset = self.get_preset(name)
+        if preset is None:
+            return []
+        return [(self._item_group(preset, self.get_preset_categories()),
+                 self._preset_info(name, preset))]
+    
+    @staticmethod
+    def _item_group(item, categories: List[str]) -> str:
+        """Группа тега или пресета в списках"""
+        if item.source == 'default':
+            return 'System'
+        return item.category if item.category in categories else 'General'
+    
+    @staticmethod
+    def _preset_info(name: str, preset: PresetData) -> Mapping[str, Any]:
+        """Описание пресета для списков (только для чтения)"""
+        return MappingProxyType({
+            'name': name,
+            'source': preset.source,
+            'category': preset.category,
+            'format': preset.format,
+            'tags_count': len(preset.tags),
+            'data': preset
+        })
     
     # =====================
     # Перемещение между категориями
@@ -194,42 +418,45 @@ class StorageManager:
         """
         Создать резервную копию всех настроек
         
+        Снимок записывается в контентно-адресуемое хранилище: неизменившиеся
+        с прошлого снимка файлы не читаются и не копируются повторно.
+        
+        Args:
+            backup_dir: Корень хранилища бэкапов (по умолчанию .atrain/backups)
+            
         Returns:
-            Список созданных файлов бэкапа
+            Список созданных файлов бэкапа (манифест снимка)
         """
-        if backup_dir is None:
-            backup_dir = self.presets.storage_dir / 'backups' / datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        backup_dir = Path(backup_dir)
-        backup_dir.mkdir(parents=True, exist_ok=True)
-        
-        backup_files = []
-        
-        # Копируем все файлы настроек
-        for storage in [self.presets, self.tags, self.categories]:
-            if storage.exists():
-                dest = backup_dir / storage.filename
-                shutil.copy2(storage.file_path, dest)
-                backup_files.append(dest)
-        
-        # Создаем также zip архив
-        zip_path = backup_dir.parent / f"{backup_dir.name}.zip"
-        with zipfile.ZipFile(zip_path, 'w') as zf:
-            for file in backup_files:
-                zf.write(file, file.name)
+        store = BackupStore(backup_dir) if backup_dir is not None else self.presets.backup_store
         
-        backup_files.append(zip_path)
+        manifest_path = store.snapshot([self.presets, self.tags, self.categories], 'settings')
+        if manifest_path is None:
+            return []
         
-        event_bus().publish('settings_backed_up', str(backup_dir))
+        event_bus().publish('settings_backed_up', str(manifest_path))
         
-        return backup_files
+        return [manifest_path]
+    
+    def list_backups(self) -> List[Path]:
+        """Снимки всех настроек, новые первыми"""
+        return self.presets.backup_store.list_snapshots('settings')
     
     def restore_from_backup(self, backup_path: Path) -> bool:
-        """Восстановить настройки из резервной копии"""
+        """Восстановить настройки из резервной копии (манифест, zip или папка)"""
         backup_path = Path(backup_path)
         
         try:
-            if backup_path.is_file() and backup_path.suffix == '.zip':
+            if BackupStore.is_manifest(backup_path):
+                # Восстановление из снимка
+                restored = [
+                    storage.restore_from_backup(backup_path)
+                    for storage in [self.presets, self.tags, self.categories]
+                ]
+                if not any(restored):
+                    print(f"StorageManager: Snapshot has no settings files: {backup_path}")
+                    return False
+            
+            elif backup_path.is_file() and backup_path.suffix == '.zip':
                 # Восстановление из zip архива
                 import tempfile
                 with tempfile.TemporaryDirectory() as temp_dir:
@@ -240,14 +467,14 @@ class StorageManager:
                     for storage in [self.presets, self.tags, self.categories]:
                         temp_file = Path(temp_dir) / storage.filename
                         if temp_file.exists():
-                            shutil.copy2(temp_file, storage.file_path)
+                            storage.restore_from_backup(temp_file)
             
             elif backup_path.is_dir():
                 # Восстановление из папки
                 for storage in [self.presets, self.tags, self.categories]:
                     backup_file = backup_path / storage.filename
                     if backup_file.exists():
-                        shutil.copy2(backup_file, storage.file_path)
+                        storage.restore_from_backup(backup_file)
             
             else:
                 print(f"StorageManager: Invalid backup path: {backup_path}")
@@ -265,17 +492,21 @@ class StorageManager:
             return False
     
     def export_settings(self, export_path: Path) -> bool:
-        """Экспортировать все настройки в один файл"""
+        """
+        Экспортировать все настройки в один файл
+        
+        Для файлов .jsonl используется потоковый формат (export_settings_stream).
+        """
+        if Path(export_path).suffix == '.jsonl':
+            return self.export_settings_stream(export_path)
+        
         try:
             export_data = {
-                'version': '1.5',
+                'version': SETTINGS_VERSION,
                 'exported': datetime.now().isoformat(),
                 'presets': {},
                 'tags': [],
-                'categories': {
-                    'tag_categories': self.get_tag_categories(),
-                    'preset_categories': self.get_preset_categories()
-                }
+                'categories': self._export_categories()
             }
             
             # Экспортируем пресеты
@@ -290,7 +521,6 @@ class StorageManager:
             
             # Сохраняем
             with open(export_path, 'w', encoding='utf-8') as f:
-                import json
                 json.dump(export_data, f, indent=2, ensure_ascii=False)
             
             return True
@@ -299,54 +529,67 @@ class StorageManager:
             print(f"StorageManager: Error exporting settings: {e}")
             return False
     
-    def import_settings(self, import_path: Path, merge: bool = True) -> bool:
+    def export_settings_stream(self, export_path: Path) -> bool:
+        """
+        Экспортировать настройки в формате JSON Lines
+        
+        Первая строка - заголовок с версией и категориями, далее по одной
+        записи на тег или пресет. Документ целиком в памяти не строится.
+        """
+        try:
+            with open(export_path, 'w', encoding='utf-8') as f:
+                self._write_record(f, {
+                    'type': 'header',
+                    'format': STREAM_FORMAT,
+                    'version': SETTINGS_VERSION,
+                    'exported': datetime.now().isoformat(),
+                    'categories': self._export_categories()
+                })
+                
+                for tag in self.get_all_tags():
+                    if tag.source == 'custom':
+                        self._write_record(f, {'type': 'tag', 'data': tag.to_dict()})
+                
+                for name, preset in self.get_all_presets().items():
+                    if preset.source == 'custom':
+                        self._write_record(f, {
+                            'type': 'preset', 'name': name, 'data': preset.to_dict()
+                        })
+            
+            return True
+            
+        except Exception as e:
+            print(f"StorageManager: Error exporting settings stream: {e}")
+            return False
+    
+    def import_settings(self, import_path: Path, merge: bool = True,
+                        chunk_size: int = IMPORT_CHUNK_SIZE) -> bool:
         """
         Импортировать настройки из файла
         
+        Для файлов .jsonl используется потоковый формат (import_settings_stream).
+        
         Args:
             import_path: Путь к файлу импорта
             merge: True - объединить с существующими, False - заменить
+            chunk_size: Размер пачки записей, сохраняемой за одну запись файла
         """
+        if Path(import_path).suffix == '.jsonl':
+            return self.import_settings_stream(import_path, merge, chunk_size)
+        
         try:
             with open(import_path, 'r', encoding='utf-8') as f:
-                import json
                 import_data = json.load(f)
             
-            success = True
+            success = self._import_categories(import_data.get('categories', {}), merge)
             
-            # Импортируем категории
-            if 'categories' in import_data:
-                if 'tag_categories' in import_data['categories']:
-                    categories = import_data['categories']['tag_categories']
-                    if merge:
-                        existing = self.get_tag_categories()
-                        categories = list(set(existing + categories))
-                    success &= self.save_tag_categories(categories)
-                
-                if 'preset_categories' in import_data['categories']:
-                    categories = import_data['categories']['preset_categories']
-                    if merge:
-                        existing = self.get_preset_categories()
-                        categories = list(set(existing + categories))
-                    success &= self.save_preset_categories(categories)
-            
-            # Импортируем теги
-            if 'tags' in import_data:
-                for tag_dict in import_data['tags']:
-                    tag = TagData.from_dict(tag_dict)
-                    tag.source = 'custom'
-                    
-                    if not merge or not self.get_tag(tag.name):
-                        success &= self.tags.save_tag(tag)
-            
-            # Импортируем пресеты
-            if 'presets' in import_data:
-                for name, preset_dict in import_data['presets'].items():
-                    preset = PresetData.from_dict(name, preset_dict)
-                    preset.source = 'custom'
-                    
-                    if not merge or not self.get_preset(name):
-                        success &= self.presets.save_preset(preset)
+            records = itertools.chain(
+                ({'type': 'tag', 'data': tag_dict}
+                 for tag_dict in import_data.get('tags', [])),
+                ({'type': 'preset', 'name': name, 'data': preset_dict}
+                 for name, preset_dict in import_data.get('presets', {}).items())
+            )
+            success &= self._import_records(records, merge, chunk_size)
             
             # Инвалидируем кеш
             self._invalidate_cache()
@@ -359,6 +602,158 @@ class StorageManager:
             print(f"StorageManager: Error importing settings: {e}")
             return False
     
+    def import_settings_stream(self, import_path: Path, merge: bool = True,
+                               chunk_size: int = IMPORT_CHUNK_SIZE) -> bool:
+        """
+        Импортировать настройки из файла JSON Lines
+        
+        Файл читается построчно, записи применяются пачками по chunk_size,
+        поэтому в памяти одновременно находится не больше одной пачки.
+        
+        Args:
+            import_path: Путь к файлу импорта
+            merge: True - существующие элементы не перезаписываются
+            chunk_size: Размер пачки записей
+        """
+        try:
+            with open(import_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('type') != 'header' or header.get('format') != STREAM_FORMAT:
+                    print(f"StorageManager: {import_path} is not an A-Train settings stream")
+                    return False
+                
+                if header.get('version') != SETTINGS_VERSION:
+                    print(f"StorageManager: Importing settings stream version "
+                          f"{header.get('version')} (current {SETTINGS_VERSION})")
+                
+                success = self._import_categories(header.get('categories', {}), merge)
+                success &= self._import_records(
+                    self._read_records(f, import_path), merge, chunk_size
+                )
+            
+            self._invalidate_cache()
+            
+            event_bus().publish('settings_imported', str(import_path))
+            
+            return success
+            
+        except Exception as e:
+            print(f"StorageManager: Error importing settings stream: {e}")
+            return False
+    
+    def _export_categories(self) -> Dict[str, List[str]]:
+        """Категории для экспорта"""
+        return {
+            'tag_categories': self.get_tag_categories(),
+            'preset_categories': self.get_preset_categories()
+        }
+    
+    def _import_categories(self, categories: Dict[str, List[str]], merge: bool) -> bool:
+        """Импортировать категории"""
+        success = True
+        
+        if 'tag_categories' in categories:
+            tag_categories = categories['tag_categories']
+            if merge:
+                tag_categories = list(set(self.get_tag_categories() + tag_categories))
+            success &= self.save_tag_categories(tag_categories)
+        
+        if 'preset_categories' in categories:
+            preset_categories = categories['preset_categories']
+            if merge:
+                preset_categories = list(set(self.get_preset_categories() + preset_categories))
+            success &= self.save_preset_categories(preset_categories)
+        
+        return success
+    
+    def _import_records(self, records, merge: bool, chunk_size: int) -> bool:
+        """
+        Применить записи тегов и пресетов пачками
+        
+        Записи разбираются пачками по chunk_size и сразу вливаются в
+        загруженный документ хранилища, поэтому одновременно в памяти
+        находятся только документ и одна пачка моделей. Файл каждой
+        коллекции записывается один раз в конце. Существующие имена
+        собираются один раз, дальше проверка - по множеству.
+        """
+        existing_tags = set(self.get_tags_by_name()) if merge else set()
+        existing_presets = set(self.get_all_presets()) if merge else set()
+        
+        tags_data = self.tags.load()
+        presets_data = self.presets.load()
+        counts = {'tags': 0, 'presets': 0}
+        
+        tag_batch: List[TagData] = []
+        preset_batch: List[PresetData] = []
+        success = True
+        
+        def flush_tags():
+            counts['tags'] += self.tags.merge_tags(tags_data, tag_batch)
+            tag_batch.clear()
+        
+        def flush_presets():
+            counts['presets'] += self.presets.merge_presets(presets_data, preset_batch)
+            preset_batch.clear()
+        
+        for record in records:
+            try:
+                record_type = record.get('type')
+                
+                if record_type == 'tag':
+                    tag = TagData.from_dict(record['data'])
+                    tag.source = 'custom'
+                    if merge and tag.name in existing_tags:
+                        continue
+                    existing_tags.add(tag.name)
+                    tag_batch.append(tag)
+                    if len(tag_batch) >= chunk_size:
+                        flush_tags()
+                
+                elif record_type == 'preset':
+                    preset = PresetData.from_dict(record['name'], record['data'])
+                    preset.source = 'custom'
+                    if merge and preset.name in existing_presets:
+                        continue
+                    existing_presets.add(preset.name)
+                    preset_batch.append(preset)
+                    if len(preset_batch) >= chunk_size:
+                        flush_presets()
+                
+                else:
+                    print(f"StorageManager: Skipping unknown record type '{record_type}'")
+                    
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                print(f"StorageManager: Skipping invalid import record: {e}")
+                success = False
+        
+        flush_tags()
+        flush_presets()
+        
+        if counts['tags']:
+            success &= self.tags.save_merged(tags_data, counts['tags']) == counts['tags']
+        if counts['presets']:
+            success &= self.presets.save_merged(presets_data, counts['presets']) == counts['presets']
+        
+        return success
+    
+    @staticmethod
+    def _read_records(f, import_path: Path):
+        """Построчно читать записи потока (после заголовка)"""
+        for line_number, line in enumerate(f, start=2):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"StorageManager: Skipping corrupt line {line_number} in {import_path}: {e}")
+    
+    @staticmethod
+    def _write_record(f, record: Dict[str, Any]):
+        """Записать одну запись потока"""
+        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        f.write('\n')
+    
     # =====================
     # Информация о проекте
     # =====================
@@ -381,6 +776,10 @@ class StorageManager:
                 'categories': self.categories.exists()
             },
             'directory_writable': storage_dir.exists() and os.access(storage_dir, os.W_OK),
+            'layers': [
+                {'name': layer.name, 'path': str(layer.path), 'exists': layer.signature is not None}
+                for layer in self.presets.layers.layers
+            ],
             'statistics': {
                 'total_presets': len(self.get_all_presets()),
                 'custom_presets': sum(1 for p in self.get_all_presets().values() if p.source == 'custom'),
@@ -422,3 +821,39 @@ class StorageManager:
                 results['valid'] = False
         
         return results
+
+
+# Реестр менеджеров по директории хранилища
+_storage_managers: Dict[str, StorageManager] = {}
+_storage_managers_lock = threading.Lock()
+
+def get_storage_manager() -> StorageManager:
+    """
+    Получить общий StorageManager для текущего проекта
+    
+    Экземпляр выбирается по разрешенной директории хранилища, поэтому
+    при смене корня проекта скрипта автоматически возвращается другой
+    менеджер, а все вызывающие разделяют один прогретый кеш.
+    Режим журнала по умолчанию выключен и включается переменной окружения
+    ATRAIN_STORAGE_JOURNAL=1 (общая директория должна поддерживать flock,
+    иначе журналом может пользоваться только один процесс).
+    """
+    storage_dir = resolve_storage_directory()
+    key = str(storage_dir)
+    
+    with _storage_managers_lock:
+        manager = _storage_managers.get(key)
+        if manager is None:
+            journal = os.environ.get('ATRAIN_STORAGE_JOURNAL', '') == '1'
+            manager = StorageManager(storage_dir, journal)
+            _storage_managers[key] = manager
+    
+    return manager
+
+
+def clear_storage_managers():
+    """Остановить и забыть все менеджеры реестра"""
+    with _storage_managers_lock:
+        for manager in _storage_managers.values():
+            manager.stop_watching()
+        _storage_managers.clear()
@@ -5,9 +5,11 @@
 
 from typing import Dict, List, Optional
 from datetime import datetime
+from pathlib import Path
 import getpass
 
 from .file_storage import FileStorage
+from .layers import LayeredSettings
 from ..models import TagData, TagType
 from ..utils import event_bus
 
@@ -15,10 +17,25 @@ from ..utils import event_bus
 class TagStorage(FileStorage):
     """Управление хранением тегов"""
     
-    def __init__(self):
-        super().__init__('atrain_tags.json')
-        self._defaults_storage = FileStorage('atrain_tag_defaults.json')
+    def __init__(self, storage_dir: Optional[Path] = None, journal: bool = False):
+        super().__init__('atrain_tags.json', storage_dir, journal)
+        self._defaults_storage = FileStorage('atrain_tag_defaults.json', storage_dir)
         self._ensure_defaults()
+        # Теги с одним именем в разных слоях показываются все (системный и
+        # пользовательский рядом), поиск по имени берет верхний слой
+        self.layers = LayeredSettings('tags', self._defaults_storage, self, shadow=False)
+    
+    def save(self, data: Dict, backup: bool = True) -> bool:
+        """Сохранить файл и пометить слои для перепроверки"""
+        success = super().save(data, backup)
+        self.layers.invalidate()
+        return success
+    
+    def restore_from_backup(self, backup_path: Path) -> bool:
+        """Восстановить из резервной копии и пометить слои для перепроверки"""
+        success = super().restore_from_backup(backup_path)
+        self.layers.invalidate()
+        return success
     
     def _ensure_defaults(self):
         """Создать файл с дефолтными тегами если не существует"""
@@ -93,31 +110,12 @@ class TagStorage(FileStorage):
             self._defaults_storage.save(defaults)
     
     def get_all_tags(self) -> List[TagData]:
-        """Получить все теги (дефолтные + пользовательские)"""
-        tags = []
-        
-        # Загружаем дефолтные
-        defaults_data = self._defaults_storage.load()
-        for tag_dict in defaults_data.get('tags', []):
-            tag = TagData.from_dict(tag_dict)
-            tag.source = 'default'
-            tags.append(tag)
-        
-        # Загружаем пользовательские
-        custom_data = self.load()
-        for tag_dict in custom_data.get('tags', []):
-            tag = TagData.from_dict(tag_dict)
-            tag.source = 'custom'
-            tags.append(tag)
-        
-        return tags
+        """Получить все теги всех слоев (от дефолтных до пользовательских)"""
+        return self.layers.items()
     
     def get_tag(self, name: str) -> Optional[TagData]:
-        """Получить конкретный тег по имени"""
-        for tag in self.get_all_tags():
-            if tag.name == name:
-                return tag
-        return None
+        """Получить конкретный тег по имени (из верхнего слоя)"""
+        return self.layers.get(name)
     
     def save_tag(self, tag: TagData) -> bool:
         """Сохранить пользовательский тег"""
@@ -163,14 +161,82 @@ class TagStorage(FileStorage):
             print(f"TagStorage: Error saving tag '{tag.name}': {e}")
             return False
     
+    def save_tags(self, tags: List[TagData], backup: bool = True) -> int:
+        """
+        Сохранить пачку пользовательских тегов одной записью файла
+        
+        Args:
+            tags: Теги для сохранения (существующие с тем же именем заменяются)
+            backup: Создать резервную копию перед записью
+            
+        Returns:
+            Количество сохраненных тегов
+        """
+        try:
+            data = self.load()
+            return self.save_merged(data, self.merge_tags(data, tags), backup)
+        except Exception as e:
+            print(f"TagStorage: Error saving {len(tags)} tags: {e}")
+            return 0
+    
+    def merge_tags(self, data: Dict, tags: List[TagData]) -> int:
+        """
+        Добавить или заменить теги в загруженном документе без записи файла
+        
+        Returns:
+            Количество примененных тегов
+        """
+        if 'tags' not in data:
+            data['tags'] = []
+        
+        index = {tag_dict.get('name'): i for i, tag_dict in enumerate(data['tags'])}
+        author = getpass.getuser()
+        count = 0
+        
+        for tag in tags:
+            if tag.source == 'default':
+                continue
+            
+            tag.author = tag.author or author
+            tag_dict = tag.to_dict()
+            
+            i = index.get(tag.name)
+            if i is None:
+                index[tag.name] = len(data['tags'])
+                data['tags'].append(tag_dict)
+            else:
+                data['tags'][i] = tag_dict
+            count += 1
+        
+        return count
+    
+    def save_merged(self, data: Dict, count: int, backup: bool = True) -> int:
+        """
+        Записать документ после merge_tags
+        
+        Returns:
+            Количество сохраненных тегов (0 при ошибке)
+        """
+        if not count:
+            return 0
+        
+        data['version'] = "1.5"
+        data['last_modified'] = datetime.now().isoformat()
+        
+        if not self.save(data, backup):
+            return 0
+        
+        event_bus().publish('tags_imported', count)
+        return count
+    
     def delete_tag(self, name: str) -> bool:
         """Удалить пользовательский тег"""
         tag = self.get_tag(name)
         if not tag:
             return False
         
-        if tag.source == 'default':
-            print("TagStorage: Cannot delete default tags")
+        if tag.source != 'custom':
+            print(f"TagStorage: Cannot delete {tag.source} tags")
             return False
         
         try:
@@ -227,7 +293,7 @@ class TagStorage(FileStorage):
             return True
         
         tag = self.get_tag(old_name)
-        if not tag or tag.source == 'default':
+        if not tag or tag.source != 'custom':
             return False
         
         # Проверяем что новое имя не занято
@@ -0,0 +1,313 @@
+# atrain/core/storage/watcher.py
+"""
+Отслеживание внешних изменений файлов хранилища
+"""
+
+import os
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from .file_storage import is_own_write
+from .layers import SettingsLayer
+from ..models import PresetData, TagData
+from ..nuke import nuke_bridge
+from ..utils import event_bus
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+    inotify_flags = None
+
+
+class StorageWatcher:
+    """
+    Фоновый наблюдатель за файлами настроек
+
+    Следит за всеми слоями пресетов и тегов (default, studio, show,
+    sequence, shot, user и пользовательский файл) и за категориями.
+    Фоновый поток только сравнивает сигнатуры файлов; перечитывание,
+    сравнение документов по ключам и публикация событий для реально
+    изменившихся элементов идут в главном потоке Nuke.
+    """
+
+    def __init__(self, manager, interval: float = 2.0):
+        """
+        Args:
+            manager: StorageManager, файлы которого отслеживаются
+            interval: Интервал опроса (секунды)
+        """
+        self.manager = manager
+        self.interval = interval
+        self.bridge = nuke_bridge()
+
+        # (слой, тип документа); список заменяется целиком в главном потоке
+        self._targets: List[Tuple[SettingsLayer, str]] = []
+
+        self._signatures: Dict[str, Optional[tuple]] = {}
+        self._documents: Dict[str, Dict[str, Any]] = {}
+
+        # Сигнатуры, которые фоновый поток уже видел и передал на перечитывание
+        self._seen: Dict[str, Optional[tuple]] = {}
+        self._poll_pending = threading.Event()
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._inotify = None
+        self._watched_dirs: set = set()
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли наблюдатель"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Запустить фоновый поток наблюдения (вызывается из главного потока)
+
+        Повторный вызов у работающего наблюдателя только обновляет список
+        слоев - например, после открытия скрипта другого шота.
+        """
+        if self.running:
+            self.retarget()
+            return
+
+        self._stop_event.clear()
+        self._inotify = self._create_inotify()
+        self.retarget()
+        self._snapshot_all()
+
+        self._thread = threading.Thread(
+            target=self._run, name='ATrainStorageWatcher', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Остановить наблюдение"""
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1.0)
+            self._thread = None
+
+        if self._inotify is not None:
+            try:
+                self._inotify.close()
+            except OSError:
+                pass
+            self._inotify = None
+        self._watched_dirs = set()
+
+    def retarget(self):
+        """Собрать отслеживаемые файлы по текущим слоям (главный поток)"""
+        targets = [(layer, 'presets') for layer in self.manager.presets.layers.layers]
+        targets += [(layer, 'tags') for layer in self.manager.tags.layers.layers]
+        categories = self.manager.categories
+        targets.append((SettingsLayer('categories', categories.file_path, 'custom', categories),
+                        'categories'))
+
+        known = {str(layer.path) for layer, _kind in self._targets}
+        self._targets = targets
+        self._watch_directories()
+
+        # Новые слои запоминаем без событий: их содержимое уже учтено слиянием
+        for layer, kind in targets:
+            path = str(layer.path)
+            if path not in known and path not in self._signatures:
+                self._remember(layer, kind)
+
+    def poll(self) -> int:
+        """
+        Перечитать изменившиеся файлы и опубликовать события (главный поток)
+
+        Returns:
+            Количество опубликованных событий
+        """
+        self._poll_pending.clear()
+        self.retarget()
+        published = 0
+
+        for layer, kind in self._targets:
+            path = str(layer.path)
+            signature = layer.current_signature()
+
+            if signature == self._signatures.get(path):
+                continue
+
+            self._signatures[path] = signature
+            self._seen[path] = signature
+            old_index = self._documents.get(path, {})
+            new_index = self._index_document(layer.read() if signature else {}, kind)
+            self._documents[path] = new_index
+
+            # Свои записи уже опубликовали события через хранилища
+            if signature and layer.writable and is_own_write(path, signature):
+                continue
+
+            published += self._publish_diff(kind, layer.source, old_index, new_index)
+
+        return published
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _run(self):
+        """Цикл фонового потока: только сигнатуры файлов"""
+        while not self._stop_event.is_set():
+            if self._inotify is not None:
+                try:
+                    # Блокируемся до события в директории или таймаута
+                    self._inotify.read(timeout=int(self.interval * 1000))
+                except OSError:
+                    self._inotify = None
+            else:
+                self._stop_event.wait(self.interval)
+
+            if self._stop_event.is_set():
+                break
+
+            try:
+                if self._changed_since_seen():
+                    self._request_poll()
+            except Exception as e:
+                print(f"StorageWatcher: Error checking storage: {e}")
+
+    def _changed_since_seen(self) -> bool:
+        """Изменилась ли сигнатура хотя бы одного файла (фоновый поток)"""
+        changed = False
+        for layer, _kind in list(self._targets):
+            path = str(layer.path)
+            signature = layer.current_signature()
+            if signature != self._seen.get(path):
+                self._seen[path] = signature
+                changed = True
+        return changed
+
+    def _request_poll(self):
+        """Перечитать файлы в главном потоке Nuke"""
+        if self._poll_pending.is_set():
+            return
+        self._poll_pending.set()
+
+        if self.bridge.available:
+            try:
+                self.bridge.nuke.executeInMainThread(self._poll_safely)
+                return
+            except Exception as e:
+                print(f"StorageWatcher: Cannot dispatch to main thread: {e}")
+
+        # Без Nuke главного потока нет - перечитываем здесь
+        self._poll_safely()
+
+    def _poll_safely(self):
+        """poll() с перехватом ошибок (вызов из цикла событий)"""
+        try:
+            self.poll()
+        except Exception as e:
+            self._poll_pending.clear()
+            print(f"StorageWatcher: Error polling storage: {e}")
+
+    def _create_inotify(self):
+        """Создать inotify наблюдатель если доступен"""
+        if INotify is None:
+            return None
+
+        try:
+            return INotify()
+        except OSError as e:
+            print(f"StorageWatcher: inotify unavailable, falling back to polling: {e}")
+            return None
+
+    def _watch_directories(self):
+        """Добавить в inotify директории всех текущих слоев"""
+        if self._inotify is None:
+            return
+
+        mask = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO |
+                inotify_flags.CREATE | inotify_flags.DELETE)
+        directories = {str(layer.path.parent) for layer, _kind in self._targets}
+        for directory in sorted(directories - self._watched_dirs):
+            if not os.path.isdir(directory):
+                continue
+            try:
+                self._inotify.add_watch(directory, mask)
+                self._watched_dirs.add(directory)
+            except OSError as e:
+                print(f"StorageWatcher: Cannot watch {directory}: {e}")
+
+    def _snapshot_all(self):
+        """Запомнить текущее состояние всех файлов"""
+        for layer, kind in self._targets:
+            self._remember(layer, kind)
+
+    def _remember(self, layer: SettingsLayer, kind: str):
+        """Запомнить состояние файла слоя без публикации событий"""
+        path = str(layer.path)
+        signature = layer.current_signature()
+        self._signatures[path] = signature
+        self._seen[path] = signature
+        self._documents[path] = self._index_document(
+            layer.read() if signature else {}, kind
+        )
+
+    @staticmethod
+    def _index_document(data: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        """Индексировать документ по ключам"""
+        if kind == 'presets':
+            return dict(data.get('presets', {}))
+
+        if kind == 'tags':
+            return {
+                tag_dict.get('name'): tag_dict
+                for tag_dict in data.get('tags', [])
+                if tag_dict.get('name')
+            }
+
+        return {
+            'tag_categories': data.get('tag_categories'),
+            'preset_categories': data.get('preset_categories')
+        }
+
+    def _publish_diff(self, kind: str, source: str,
+                      old_index: Dict[str, Any], new_index: Dict[str, Any]) -> int:
+        """Опубликовать события для изменившихся ключей"""
+        events = []
+
+        if kind == 'categories':
+            for key in ('tag_categories', 'preset_categories'):
+                if new_index.get(key) != old_index.get(key) and new_index.get(key) is not None:
+                    events.append((f'{key}_updated', new_index[key]))
+        else:
+            for name, raw in new_index.items():
+                if old_index.get(name) == raw:
+                    continue
+                try:
+                    if kind == 'presets':
+                        item = PresetData.from_dict(name, raw)
+                    else:
+                        item = TagData.from_dict(raw)
+                    item.source = source
+                except Exception as e:
+                    print(f"StorageWatcher: Skipping invalid {kind} entry '{name}': {e}")
+                    continue
+                events.append((f'{kind[:-1]}_saved', item))
+
+            for name in old_index:
+                if name not in new_index:
+                    events.append((f'{kind[:-1]}_deleted', name))
+
+        for event_type, data in events:
+            self._dispatch(event_type, data)
+
+        if events:
+            self._dispatch('storage_changed_externally', {
+                'kind': kind,
+                'events': [event_type for event_type, _ in events]
+            })
+
+        return len(events)
+
+    def _dispatch(self, event_type: str, data: Any):
+        """Опубликовать событие (poll() уже идет в главном потоке)"""
+        event_bus().publish(event_type, data)
@@ -4,22 +4,61 @@
 """
 
 from .version import (
+    VersionSpan,
+    parse_versions,
+    find_version,
     extract_version,
     increment_version,
     get_next_available_version,
+    resolve_next_versions,
     validate_version_format,
-    get_version_history
+    get_version_history,
+    get_version_sequences
 )
 
+from .sequences import SequenceRecord, collapse_sequences, scan_sequences
+from .scanner import ParallelScanner, ScanResult, get_scanner, configure_scanner
+from .reservation import (
+    VersionClaim,
+    VersionReservations,
+    get_version_reservations,
+    reserve_next_version
+)
+from .prefetch import VersionPrefetcher, get_version_prefetcher
+
+from .version_index import VersionIndex, get_version_index
+from .scan_cache import ScanCache, get_scan_cache
 from .cache import CacheManager, timed_cache
 from .events import EventBus, event_bus
 
 __all__ = [
+    'VersionSpan',
+    'parse_versions',
+    'find_version',
     'extract_version',
     'increment_version',
     'get_next_available_version',
+    'resolve_next_versions',
     'validate_version_format',
     'get_version_history',
+    'get_version_sequences',
+    'SequenceRecord',
+    'collapse_sequences',
+    'scan_sequences',
+    'ParallelScanner',
+    'ScanResult',
+    'get_scanner',
+    'configure_scanner',
+    'VersionClaim',
+    'VersionReservations',
+    'get_version_reservations',
+    'reserve_next_version',
+    'VersionPrefetcher',
+    'get_version_prefetcher',
+    'VersionIndex',
+    'get_version_index',
+    'ScanCache',
+    'get_scan_cache',
     'CacheManager',
     'timed_cache',
     'EventBus',
@@ -0,0 +1,186 @@
+# atrain/core/utils/prefetch.py
+"""
+Фоновое разрешение следующей версии для предпросмотра пути
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .events import event_bus
+from .version import resolve_next_versions
+
+
+# Событие с результатом: {'path': базовый путь, 'next_path': путь со следующей версией}
+VERSION_PREFETCHED_EVENT = 'version_prefetched'
+
+
+class VersionPrefetcher:
+    """
+    Рабочий поток, заранее разрешающий следующую версию пути
+
+    Путь Write известен, как только выбран пресет, а сканирование директорий
+    на сетевом диске может занять заметное время. Предпросмотр отправляет
+    путь в request() и сразу возвращается; поток сканирует директорию
+    (заодно прогревая индекс версий) и публикует VERSION_PREFETCHED_EVENT.
+    Из очереди берется только последний запрос - промежуточные пути при
+    быстром переключении пресетов не сканируются.
+
+    Результат - только прогноз: при создании ноды версия все равно
+    резервируется атомарно.
+
+    Директория хранилища (для постоянного кеша сканирования) разрешается
+    в request(), то есть в потоке интерфейса, и передается в задание:
+    рабочий поток не обращается к API Nuke.
+    """
+
+    def __init__(self, max_results: int = 64):
+        """
+        Args:
+            max_results: Сколько последних результатов хранить
+        """
+        self.max_results = max_results
+
+        self._condition = threading.Condition()
+        self._requested: Optional[Tuple[str, Optional[Path]]] = None
+        self._in_flight: Optional[str] = None
+        self._results: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def request(self, path: str, storage_dir: Optional[Path] = None):
+        """
+        Запросить фоновое разрешение версии пути (не блокирует)
+
+        Вызывается из потока интерфейса при смене пресета или контекста.
+
+        Args:
+            path: Базовый путь из предпросмотра
+            storage_dir: Директория хранилища (по умолчанию разрешается
+                по текущему скрипту здесь же, в вызывающем потоке)
+        """
+        if not path:
+            return
+
+        if storage_dir is None:
+            from ..storage.file_storage import resolve_storage_directory
+            storage_dir = resolve_storage_directory()
+
+        with self._condition:
+            self._requested = (path, Path(storage_dir))
+            self._stopped = False
+            self._ensure_thread()
+            self._condition.notify_all()
+
+    def result(self, path: str, timeout: float = 0.0,
+               max_age: Optional[float] = 60.0) -> Optional[str]:
+        """
+        Разрешенный путь для базового пути
+
+        Args:
+            path: Базовый путь
+            timeout: Сколько ждать, если путь еще в работе (секунды)
+            max_age: Не возвращать результаты старше (секунды, None - без ограничения)
+
+        Returns:
+            Путь со следующей версией или None если прогноза нет
+        """
+        deadline = time.monotonic() + timeout
+
+        with self._condition:
+            while True:
+                cached = self._results.get(path)
+                if cached is not None:
+                    next_path, resolved_at = cached
+                    if max_age is None or time.monotonic() - resolved_at <= max_age:
+                        return next_path
+
+                requested = self._requested[0] if self._requested else None
+                pending = path in (requested, self._in_flight)
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    return None
+
+                self._condition.wait(remaining)
+
+    def stop(self):
+        """Остановить рабочий поток"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _ensure_thread(self):
+        """Запустить поток при первом запросе"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='ATrainVersionPrefetch', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Цикл рабочего потока"""
+        while True:
+            with self._condition:
+                while self._requested is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                (path, storage_dir), self._requested = self._requested, None
+                self._in_flight = path
+
+            try:
+                next_path = resolve_next_versions([path], storage_dir=storage_dir)[0]
+            except Exception as e:
+                print(f"VersionPrefetcher: Cannot resolve version for {path}: {e}")
+                next_path = None
+
+            with self._condition:
+                self._in_flight = None
+                if next_path:
+                    self._results[path] = (next_path, time.monotonic())
+                    self._results.move_to_end(path)
+                    while len(self._results) > self.max_results:
+                        self._results.popitem(last=False)
+                self._condition.notify_all()
+
+            if next_path:
+                self._dispatch({'path': path, 'next_path': next_path})
+
+    @staticmethod
+    def _dispatch(data: Any):
+        """Опубликовать результат в главном потоке Nuke если возможно"""
+        from ..nuke import nuke_bridge
+
+        bridge = nuke_bridge()
+        if bridge.available:
+            try:
+                bridge.nuke.executeInMainThread(
+                    event_bus().publish, args=(VERSION_PREFETCHED_EVENT, data)
+                )
+                return
+            except Exception as e:
+                print(f"VersionPrefetcher: Cannot dispatch to main thread: {e}")
+
+        event_bus().publish(VERSION_PREFETCHED_EVENT, data)
+
+
+# Глобальный экземпляр
+_version_prefetcher = None
+
+
+def get_version_prefetcher() -> VersionPrefetcher:
+    """Получить глобальный prefetcher версий"""
+    global _version_prefetcher
+    if _version_prefetcher is None:
+        _version_prefetcher = VersionPrefetcher()
+    return _version_prefetcher
@@ -0,0 +1,324 @@
+# atrain/core/utils/reservation.py
+"""
+Атомарное резервирование версий для параллельных записей
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .version import find_version, resolve_next_versions
+
+
+# Суффикс файла-метки занятой версии
+CLAIM_SUFFIX = '.atrain-claim'
+
+# Через сколько секунд метка без файлов версии считается брошенной
+DEFAULT_CLAIM_TTL = 12 * 60 * 60
+
+# Как часто (секунды) резервирование убирает метки в одной директории
+DEFAULT_CLEANUP_INTERVAL = 60.0
+
+# Способы резервирования
+CLAIM_METHOD_AUTO = 'auto'      # mkdir для версии-директории, иначе метка
+CLAIM_METHOD_MARKER = 'marker'  # файл-метка, созданный с O_EXCL
+CLAIM_METHOD_MKDIR = 'mkdir'    # атомарное создание директории версии
+
+
+@dataclass
+class VersionClaim:
+    """Зарезервированная версия"""
+    path: str
+    version: int
+    method: str
+    marker: Optional[str] = None  # файл-метка или созданная директория
+    reserved: bool = True         # False если зарезервировать не удалось
+
+    def release(self):
+        """
+        Снять резерв (например, если нода так и не была создана)
+
+        Созданная директория удаляется только если она пуста.
+        """
+        if not self.reserved or not self.marker:
+            return
+        try:
+            if self.method == CLAIM_METHOD_MKDIR:
+                os.rmdir(self.marker)
+            else:
+                os.remove(self.marker)
+        except OSError:
+            pass
+        self.reserved = False
+
+    def settle(self) -> bool:
+        """
+        Версия использована (создана Write нода): метка больше не нужна,
+        как только на диске появятся файлы версии
+
+        Если файлы уже есть, метка удаляется сразу; иначе ее уберет
+        cleanup() после рендера или по TTL. До появления файлов метка
+        остается - только она защищает версию от других сессий.
+
+        Returns:
+            True если метка удалена
+        """
+        if not self.reserved or not self.marker or self.method == CLAIM_METHOD_MKDIR:
+            return False
+        if not _marker_settled(self.marker):
+            return False
+        try:
+            os.remove(self.marker)
+        except OSError:
+            return False
+        self.reserved = False
+        return True
+
+
+def _marker_settled(marker: str, families: Optional[Dict[str, Dict[int, Any]]] = None) -> bool:
+    """
+    Есть ли на диске файлы версии, занятой меткой
+
+    Args:
+        marker: Путь к метке
+        families: Семейства директории (VersionIndex.directory_families),
+            если уже получены
+    """
+    from .version_index import get_version_index, parse_entry
+
+    directory, name = os.path.split(marker)
+    parsed = parse_entry(name[:-len(CLAIM_SUFFIX)])
+    if parsed is None:
+        return False
+    key, version = parsed
+    if families is None:
+        families = get_version_index().directory_families(directory or '.')
+    return version in families.get(key, {})
+
+
+class VersionReservations:
+    """
+    Резервирование следующей версии без блокировок
+
+    Кандидат берется из индекса версий, затем занимается атомарной операцией
+    файловой системы: O_EXCL создание метки рядом с файлами версии или mkdir
+    директории версии (.../v004/). Кто первым создал метку - тот и владеет
+    версией; остальные получают EEXIST и пробуют следующую. Чужие метки
+    никогда не удаляются при резервировании, поэтому два процесса не могут
+    получить одну версию. Перед резервированием в директории (не чаще
+    cleanup_interval) cleanup() убирает метки версий, файлы которых уже
+    появились, и брошенные метки старше TTL.
+
+    Записи в обход резервирования видны только через сканирование
+    директории, из которого берется кандидат.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CLAIM_TTL, max_attempts: int = 1000,
+                 cleanup_interval: float = DEFAULT_CLEANUP_INTERVAL):
+        """
+        Args:
+            ttl: Время жизни метки (секунды)
+            max_attempts: Сколько версий пробовать, прежде чем сдаться
+            cleanup_interval: Минимальный интервал уборки меток одной директории
+        """
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.cleanup_interval = cleanup_interval
+
+        self._cleaned: Dict[str, float] = {}
+        self._cleaned_lock = threading.Lock()
+
+    # =====================
+    # Резервирование
+    # =====================
+
+    def reserve(self, path: str, method: str = CLAIM_METHOD_AUTO) -> VersionClaim:
+        """
+        Зарезервировать следующую доступную версию пути
+
+        Args:
+            path: Базовый путь (любая версия семейства)
+            method: Способ резервирования (CLAIM_METHOD_*)
+
+        Returns:
+            VersionClaim; при ошибке файловой системы - с reserved=False
+            и путем, разрешенным без резерва
+        """
+        return self.reserve_many([path], method)[0]
+
+    def reserve_many(self, paths: List[str],
+                     method: str = CLAIM_METHOD_AUTO) -> List[VersionClaim]:
+        """
+        Зарезервировать версии для набора путей
+
+        Директории сканируются один раз для всего набора (resolve_next_versions),
+        после чего каждая версия занимается отдельно.
+
+        Returns:
+            Резервы в порядке входного списка
+        """
+        candidates = resolve_next_versions(paths)
+        return [self._claim(candidate, method) for candidate in candidates]
+
+    def cleanup(self, directory: str) -> int:
+        """
+        Удалить ненужные метки в директории
+
+        Удаляются метки версий, файлы которых уже появились на диске, и
+        брошенные метки старше TTL. Метка сначала переименовывается во
+        временное имя и только потом проверяется и удаляется, чтобы не
+        удалить свежую метку, созданную другим процессом на месте старой.
+
+        Returns:
+            Количество удаленных меток
+        """
+        removed = 0
+        now = time.time()
+
+        try:
+            with os.scandir(directory) as it:
+                markers = [entry.path for entry in it if entry.name.endswith(CLAIM_SUFFIX)]
+        except OSError:
+            return 0
+
+        if not markers:
+            return 0
+
+        # Одно сканирование директории на все метки
+        from .version_index import get_version_index
+        families = get_version_index().directory_families(directory)
+
+        for marker in markers:
+            try:
+                settled = _marker_settled(marker, families)
+                if not settled and now - os.stat(marker).st_mtime < self.ttl:
+                    continue
+                grabbed = f"{marker}.{uuid.uuid4().hex}.stale"
+                os.rename(marker, grabbed)
+            except OSError:
+                continue
+
+            try:
+                if not settled and now - os.stat(grabbed).st_mtime < self.ttl:
+                    # Успели подменить свежей меткой - возвращаем на место
+                    try:
+                        os.link(grabbed, marker)
+                    except OSError:
+                        continue
+                else:
+                    removed += 1
+                os.remove(grabbed)
+            except OSError:
+                pass
+
+        return removed
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _claim(self, candidate: str, method: str) -> VersionClaim:
+        """Занять кандидата или следующую свободную версию"""
+        from .version_index import get_version_index
+
+        if not candidate:
+            return VersionClaim(candidate, 0, method, reserved=False)
+
+        index = get_version_index()
+        span = find_version(candidate)
+        directory, _name, rest = span.component(candidate)
+
+        if method == CLAIM_METHOD_AUTO:
+            method = CLAIM_METHOD_MKDIR if rest else CLAIM_METHOD_MARKER
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            print(f"VersionReservations: Cannot create {directory}, version not reserved: {e}")
+            return VersionClaim(candidate, span.number, method, reserved=False)
+
+        # Брошенная метка не должна навсегда занимать версию
+        self._cleanup_if_due(directory)
+
+        number = span.number
+        for _attempt in range(self.max_attempts):
+            path = span.splice(candidate, span.format(number))
+            _directory, name, _rest = find_version(path).component(path)
+            target = os.path.join(directory, name)
+
+            try:
+                if method == CLAIM_METHOD_MKDIR:
+                    os.mkdir(target)
+                    marker = target
+                else:
+                    marker = target + CLAIM_SUFFIX
+                    self._create_marker(marker, path)
+                    if _marker_settled(marker):
+                        # Метку убрали после рендера, а кандидат взят из
+                        # сканирования до появления файлов - версия занята
+                        # (метку может раньше нас убрать cleanup другого процесса)
+                        try:
+                            os.remove(marker)
+                        except FileNotFoundError:
+                            pass
+                        number += 1
+                        continue
+            except FileExistsError:
+                number += 1
+                continue
+            except OSError as e:
+                print(f"VersionReservations: Cannot reserve {path}: {e}")
+                return VersionClaim(path, number, method, reserved=False)
+
+            index.record(path)
+            return VersionClaim(path, number, method, marker)
+
+        print(f"VersionReservations: No free version for {candidate} "
+              f"after {self.max_attempts} attempts")
+        return VersionClaim(candidate, span.number, method, reserved=False)
+
+    def _cleanup_if_due(self, directory: str):
+        """Убрать метки директории, если с прошлой уборки прошло cleanup_interval"""
+        now = time.monotonic()
+        with self._cleaned_lock:
+            last = self._cleaned.get(directory)
+            if last is not None and now - last < self.cleanup_interval:
+                return
+            self._cleaned[directory] = now
+        self.cleanup(directory)
+
+    @staticmethod
+    def _create_marker(marker: str, path: str):
+        """Атомарно создать метку (FileExistsError если она уже есть)"""
+        fd = os.open(marker, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            os.write(fd, json.dumps({
+                'path': path,
+                'host': socket.gethostname(),
+                'pid': os.getpid(),
+                'created': time.time()
+            }).encode('utf-8'))
+        finally:
+            os.close(fd)
+
+
+# Глобальный экземпляр
+_reservations = None
+
+
+def get_version_reservations() -> VersionReservations:
+    """Получить глобальный объект резервирования"""
+    global _reservations
+    if _reservations is None:
+        _reservations = VersionReservations()
+    return _reservations
+
+
+def reserve_next_version(path: str) -> str:
+    """Зарезервировать следующую версию и вернуть путь к ней"""
+    return get_version_reservations().reserve(path).path
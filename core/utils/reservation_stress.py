@@ -0,0 +1,161 @@
+# atrain/core/utils/reservation_stress.py
+"""
+Многопроцессная стресс-проверка резервирования версий
+
+Несколько процессов одновременно резервируют версии в общей директории.
+Проверяется, что ни одна версия не выдана дважды, что брошенные метки
+старше TTL освобождают свои версии и что метки версий с файлами
+убираются. Запуск без Nuke во временной директории:
+
+    python -m atrain.core.utils.reservation_stress --processes 8 --claims 50
+
+Отчет выводится в JSON; код возврата 1, если проверка не прошла.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from .reservation import VersionReservations, CLAIM_SUFFIX, CLAIM_METHOD_MKDIR
+
+
+DEFAULT_PROCESSES = 8
+DEFAULT_CLAIMS = 50
+
+# Версии, занятые брошенными метками до начала проверки
+STALE_VERSIONS = (1, 2, 3)
+
+
+def _worker(directory: str, claims: int, method: str, render: bool,
+            start: Any, queue: Any):
+    """Процесс: резервировать версии и вернуть полученные номера"""
+    from .version_index import get_version_index
+
+    # Без Nuke и без общего кеша проекта - только файловая система
+    get_version_index().persistent = False
+    reservations = VersionReservations(ttl=60.0, cleanup_interval=0.0)
+
+    if method == CLAIM_METHOD_MKDIR:
+        base = os.path.join(directory, 'v001', 'shot.%04d.exr')
+    else:
+        base = os.path.join(directory, 'shot_v001.%04d.exr')
+
+    versions = []
+    errors = []
+    start.wait()
+
+    for _i in range(claims):
+        claim = reservations.reserve(base, method)
+        if not claim.reserved:
+            errors.append(f"Not reserved: {claim.path}")
+            continue
+        versions.append(claim.version)
+
+        if render:
+            # Имитация рендера: кадр версии появляется, метка больше не нужна
+            frame = claim.path.replace('%04d', '1001')
+            os.makedirs(os.path.dirname(frame), exist_ok=True)
+            open(frame, 'w').close()
+            claim.settle()
+
+    queue.put({'pid': os.getpid(), 'versions': versions, 'errors': errors})
+
+
+def run_stress(processes: int = DEFAULT_PROCESSES, claims: int = DEFAULT_CLAIMS,
+               method: str = 'marker', render: bool = True) -> Dict[str, Any]:
+    """
+    Запустить проверку
+
+    Args:
+        processes: Количество одновременных процессов
+        claims: Резервов на процесс
+        method: Способ резервирования ('marker' или 'mkdir')
+        render: Создавать файл версии после резерва (проверка уборки меток)
+
+    Returns:
+        Отчет: полученные версии, повторы, ошибки, оставшиеся метки
+    """
+    directory = tempfile.mkdtemp(prefix='atrain_reservation_stress_')
+    try:
+        if method != CLAIM_METHOD_MKDIR:
+            # Брошенные метки: старше TTL и без файлов версии
+            for version in STALE_VERSIONS:
+                marker = os.path.join(directory, f'shot_v{version:03d}.%04d.exr{CLAIM_SUFFIX}')
+                open(marker, 'w').close()
+                old = time.time() - 3600
+                os.utime(marker, (old, old))
+
+        context = multiprocessing.get_context('spawn')
+        start = context.Event()
+        queue = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(directory, claims, method, render, start, queue))
+            for _i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        started = time.monotonic()
+        start.set()
+        reports = [queue.get() for _worker_process in workers]
+        elapsed = time.monotonic() - started
+
+        for worker in workers:
+            worker.join()
+
+        versions = [version for report in reports for version in report['versions']]
+        duplicates = sorted(version for version, count in Counter(versions).items() if count > 1)
+        errors = [error for report in reports for error in report['errors']]
+        markers = sorted(name for name in os.listdir(directory) if name.endswith(CLAIM_SUFFIX))
+
+        reclaimed = method == CLAIM_METHOD_MKDIR or set(STALE_VERSIONS) <= set(versions)
+        passed = (
+            not duplicates and not errors and reclaimed and
+            len(versions) == processes * claims and
+            (not render or method == CLAIM_METHOD_MKDIR or not markers)
+        )
+
+        return {
+            'processes': processes,
+            'claims_per_process': claims,
+            'method': method,
+            'render': render,
+            'elapsed': round(elapsed, 3),
+            'claims': len(versions),
+            'duplicates': duplicates,
+            'errors': errors,
+            'stale_versions_reclaimed': reclaimed,
+            'markers_left': markers,
+            'passed': passed
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='A-Train version reservation stress test')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help='Concurrent processes')
+    parser.add_argument('--claims', type=int, default=DEFAULT_CLAIMS,
+                        help='Reservations per process')
+    parser.add_argument('--method', choices=('marker', 'mkdir'), default='marker',
+                        help='Reservation method')
+    parser.add_argument('--no-render', action='store_true',
+                        help='Do not create version files after reserving')
+    args = parser.parse_args(argv)
+
+    report = run_stress(args.processes, args.claims, args.method, not args.no_render)
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
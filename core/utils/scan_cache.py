@@ -0,0 +1,283 @@
+# atrain/core/utils/scan_cache.py
+"""
+Постоянный кеш сканирования директорий, общий для всех сессий
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .sequences import SequenceRecord
+
+
+# Имя файла базы в директории .atrain
+SCAN_CACHE_FILENAME = 'version_scans.db'
+
+# ATRAIN_SCAN_CACHE=0 отключает постоянный кеш
+SCAN_CACHE_ENV = 'ATRAIN_SCAN_CACHE'
+
+# Сколько директорий хранить в базе
+DEFAULT_MAX_DIRECTORIES = 20000
+
+# Сколько ждать блокировку базы, занятую другим процессом или хостом (секунды)
+BUSY_TIMEOUT = 5.0
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scans (
+    directory TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    scanned_ns INTEGER NOT NULL,
+    records TEXT NOT NULL
+)
+'''
+
+
+def encode_records(records: List[SequenceRecord]) -> str:
+    """
+    Сериализовать записи директории
+
+    Кадры хранятся диапазонами, поэтому последовательность из тысяч кадров
+    занимает несколько чисел.
+    """
+    encoded = []
+    for record in records:
+        ranges = []
+        for frame in record.frames:
+            if ranges and frame == ranges[-1][1] + 1:
+                ranges[-1][1] = frame
+            else:
+                ranges.append([frame, frame])
+        encoded.append([record.head, record.tail, record.padding, ranges])
+    return json.dumps(encoded, separators=(',', ':'))
+
+
+def decode_records(text: str, directory: str) -> List[SequenceRecord]:
+    """Восстановить записи директории"""
+    records = []
+    for head, tail, padding, ranges in json.loads(text):
+        frames = [frame for first, last in ranges for frame in range(first, last + 1)]
+        records.append(SequenceRecord(directory, head, tail, padding, frames))
+    return records
+
+
+class ScanCache:
+    """
+    Кеш результатов сканирования в SQLite
+
+    Хранит для директории mtime на момент сканирования и свернутые записи
+    (последовательности кадров). Любая сессия или задача фермы может взять
+    чужой результат, если mtime директории не изменился - это один stat
+    вместо полного чтения директории. Ошибки базы не мешают работе:
+    кеш просто отключается.
+
+    База лежит на общем хранилище проекта, которым одновременно пользуются
+    несколько хостов фермы. WAL требует общей памяти в пределах одного
+    хоста и небезопасен на сетевых файловых системах, поэтому используется
+    журнал отката (journal_mode=DELETE) с ожиданием блокировки.
+    """
+
+    def __init__(self, path: Path, max_directories: int = DEFAULT_MAX_DIRECTORIES):
+        """
+        Args:
+            path: Путь к файлу базы
+            max_directories: Сколько директорий хранить
+        """
+        self.path = Path(path)
+        self.max_directories = max_directories
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._disabled = False
+        self._writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Работает ли кеш"""
+        return not self._disabled
+
+    def get(self, directory: str) -> Optional[Tuple[int, int, List[SequenceRecord]]]:
+        """
+        Результат сканирования директории
+
+        Директории хранятся по абсолютному пути, чтобы сессии с разной
+        текущей директорией находили общие записи.
+
+        Returns:
+            (mtime_ns, scanned_ns, записи) или None
+        """
+        connection = self._connection()
+        if connection is None:
+            return None
+
+        try:
+            row = connection.execute(
+                'SELECT mtime_ns, scanned_ns, records FROM scans WHERE directory = ?',
+                (os.path.abspath(directory),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._disable(e)
+            return None
+
+        if row is None:
+            return None
+
+        try:
+            return row[0], row[1], decode_records(row[2], directory)
+        except (ValueError, TypeError):
+            return None
+
+    def put(self, directory: str, mtime_ns: int, scanned_ns: int,
+            records: List[SequenceRecord]):
+        """Сохранить результат сканирования"""
+        connection = self._connection()
+        if connection is None:
+            return
+
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO scans (directory, mtime_ns, scanned_ns, records) '
+                    'VALUES (?, ?, ?, ?)',
+                    (os.path.abspath(directory), mtime_ns, scanned_ns, encode_records(records))
+                )
+        except sqlite3.Error as e:
+            self._disable(e)
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 500 == 0
+        if prune:
+            self.prune()
+
+    def remove(self, directory: str):
+        """Забыть директорию"""
+        connection = self._connection()
+        if connection is None:
+            return
+        try:
+            with connection:
+                connection.execute('DELETE FROM scans WHERE directory = ?',
+                                   (os.path.abspath(directory),))
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    def prune(self) -> int:
+        """
+        Удалить самые старые сканирования сверх лимита
+
+        Returns:
+            Количество удаленных записей
+        """
+        connection = self._connection()
+        if connection is None:
+            return 0
+        try:
+            with connection:
+                cursor = connection.execute(
+                    'DELETE FROM scans WHERE directory NOT IN '
+                    '(SELECT directory FROM scans ORDER BY scanned_ns DESC LIMIT ?)',
+                    (self.max_directories,)
+                )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            self._disable(e)
+            return 0
+
+    def clear(self):
+        """Очистить кеш"""
+        connection = self._connection()
+        if connection is None:
+            return
+        try:
+            with connection:
+                connection.execute('DELETE FROM scans')
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    def get_info(self) -> Dict[str, object]:
+        """Информация о кеше"""
+        info = {'path': str(self.path), 'enabled': self.enabled, 'directories': 0}
+        connection = self._connection()
+        if connection is not None:
+            try:
+                info['directories'] = connection.execute('SELECT COUNT(*) FROM scans').fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return info
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Соединение текущего потока (SQLite не разделяет их между потоками)"""
+        if self._disabled:
+            return None
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            return connection
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT)
+            connection.execute(f'PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}')
+            # База, созданная в режиме WAL, переводится обратно; если она
+            # занята и остается в WAL, общий кеш на сетевом диске не используем
+            mode = connection.execute('PRAGMA journal_mode=DELETE').fetchone()[0]
+            if str(mode).lower() != 'delete':
+                connection.close()
+                raise sqlite3.OperationalError(f"journal_mode is {mode}, expected delete")
+            connection.execute(_SCHEMA)
+            connection.commit()
+        except (sqlite3.Error, OSError) as e:
+            self._disable(e)
+            return None
+
+        self._local.connection = connection
+        return connection
+
+    def _disable(self, error: Exception):
+        """Отключить кеш после ошибки базы"""
+        if not self._disabled:
+            print(f"ScanCache: Disabled ({self.path}): {error}")
+        self._disabled = True
+
+
+# Кеши по директориям хранилища
+_scan_caches: Dict[str, ScanCache] = {}
+_scan_caches_lock = threading.Lock()
+
+
+def get_scan_cache(storage_dir: Optional[Path] = None) -> Optional[ScanCache]:
+    """
+    Постоянный кеш сканирования проекта
+
+    База лежит в директории хранилища (папка проекта/.atrain), поэтому
+    все сессии и задачи одного проекта используют общий кеш.
+
+    Args:
+        storage_dir: Директория хранилища. Без нее директория разрешается
+            через текущий скрипт Nuke - это допустимо только в главном потоке
+
+    Returns:
+        ScanCache или None если кеш отключен
+    """
+    if os.environ.get(SCAN_CACHE_ENV, '1') == '0':
+        return None
+
+    if storage_dir is None:
+        from ..storage.file_storage import resolve_storage_directory
+        storage_dir = resolve_storage_directory()
+
+    directory = str(storage_dir)
+    with _scan_caches_lock:
+        cache = _scan_caches.get(directory)
+        if cache is None:
+            cache = ScanCache(Path(directory) / SCAN_CACHE_FILENAME)
+            _scan_caches[directory] = cache
+        return cache
@@ -0,0 +1,229 @@
+# atrain/core/utils/scanner.py
+"""
+Параллельное сканирование файловой системы для сетевых хранилищ
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+# Переменные окружения с настройками по умолчанию
+SCAN_WORKERS_ENV = 'ATRAIN_SCAN_WORKERS'
+SCAN_TIMEOUT_ENV = 'ATRAIN_SCAN_TIMEOUT'
+
+DEFAULT_SCAN_WORKERS = 8
+
+
+@dataclass
+class ScanResult:
+    """Результат параллельного сканирования (возможно, частичный)"""
+    results: Dict[Hashable, Any] = field(default_factory=dict)
+    errors: Dict[Hashable, str] = field(default_factory=dict)
+    pending: List[Hashable] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def complete(self) -> bool:
+        """Все ли элементы обработаны до истечения срока"""
+        return not self.pending
+
+
+class ParallelScanner:
+    """
+    Ограниченный пул потоков для scandir/stat
+
+    На NFS каждый вызов стоит миллисекунды задержки, поэтому вызовы по разным
+    директориям выполняются одновременно. Количество одновременных запросов
+    ограничено размером пула, чтобы не перегружать файловый сервер. Каждый
+    вызов может иметь срок: по его истечении возвращается то, что успело
+    выполниться, а необработанные элементы перечисляются в pending.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            max_workers: Максимум одновременных запросов к файловой системе
+                (по умолчанию ATRAIN_SCAN_WORKERS или 8)
+            timeout: Срок одного вызова в секундах по умолчанию
+                (ATRAIN_SCAN_TIMEOUT, без срока если не задан)
+        """
+        self.max_workers = max(1, max_workers or _env_number(SCAN_WORKERS_ENV, int)
+                               or DEFAULT_SCAN_WORKERS)
+        self.timeout = timeout if timeout is not None else _env_number(SCAN_TIMEOUT_ENV, float)
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Hashable],
+            timeout: Optional[float] = None) -> ScanResult:
+        """
+        Применить функцию к элементам параллельно
+
+        Args:
+            func: Функция одного элемента (обычно один scandir или stat)
+            items: Уникальные элементы (директории, пути)
+            timeout: Срок вызова в секундах (по умолчанию self.timeout)
+
+        Returns:
+            ScanResult с результатами, ошибками и необработанными элементами
+        """
+        started = time.monotonic()
+        items = list(dict.fromkeys(items))
+        timeout = self.timeout if timeout is None else timeout
+        result = ScanResult()
+
+        if not items:
+            return result
+
+        # Один элемент или один поток - без пула
+        if self.max_workers == 1 or len(items) == 1:
+            deadline = started + timeout if timeout is not None else None
+            for item in items:
+                if deadline is not None and time.monotonic() >= deadline:
+                    result.pending.append(item)
+                    continue
+                self._run_one(func, item, result)
+            result.elapsed = time.monotonic() - started
+            return result
+
+        executor = self._get_executor()
+        futures = {executor.submit(func, item): item for item in items}
+        remaining = set(futures)
+        deadline = started + timeout if timeout is not None else None
+
+        while remaining:
+            wait_time = None
+            if deadline is not None:
+                wait_time = deadline - time.monotonic()
+                if wait_time <= 0:
+                    break
+
+            done, remaining = wait(remaining, timeout=wait_time, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = futures[future]
+                try:
+                    result.results[item] = future.result()
+                except Exception as e:
+                    result.errors[item] = str(e)
+
+        for future in remaining:
+            # Еще не начатые задачи снимаем, начатые дорабатывают в фоне
+            future.cancel()
+            result.pending.append(futures[future])
+
+        if result.pending:
+            print(f"ParallelScanner: Deadline of {timeout}s reached, "
+                  f"{len(result.pending)} of {len(items)} items not scanned")
+
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def scandir(self, directories: Iterable[str],
+                timeout: Optional[float] = None) -> ScanResult:
+        """
+        Прочитать директории
+
+        Returns:
+            ScanResult: директория -> список имен записей
+        """
+        def list_names(directory):
+            with os.scandir(directory) as it:
+                return [entry.name for entry in it]
+
+        return self.map(list_names, directories, timeout)
+
+    def stat(self, paths: Iterable[str], timeout: Optional[float] = None) -> ScanResult:
+        """
+        Получить stat для путей
+
+        Returns:
+            ScanResult: путь -> os.stat_result или None если пути нет
+        """
+        def stat_path(path):
+            try:
+                return os.stat(path)
+            except FileNotFoundError:
+                return None
+
+        return self.map(stat_path, paths, timeout)
+
+    def exists(self, paths: Iterable[str], timeout: Optional[float] = None) -> ScanResult:
+        """
+        Проверить существование путей
+
+        Returns:
+            ScanResult: путь -> bool
+        """
+        return self.map(os.path.exists, paths, timeout)
+
+    def shutdown(self):
+        """Остановить пул потоков"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Пул создается при первом параллельном вызове и переиспользуется"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='ATrainScan'
+                )
+            return self._executor
+
+    @staticmethod
+    def _run_one(func: Callable[[Any], Any], item: Hashable, result: ScanResult):
+        """Обработать элемент в текущем потоке"""
+        try:
+            result.results[item] = func(item)
+        except Exception as e:
+            result.errors[item] = str(e)
+
+
+def _env_number(name: str, kind: type):
+    """Числовое значение переменной окружения или None"""
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        print(f"ParallelScanner: Ignoring invalid {name}={value!r}")
+        return None
+
+
+# Глобальный экземпляр
+_scanner = None
+
+
+def get_scanner() -> ParallelScanner:
+    """Получить глобальный сканер"""
+    global _scanner
+    if _scanner is None:
+        _scanner = ParallelScanner()
+    return _scanner
+
+
+def configure_scanner(max_workers: Optional[int] = None,
+                      timeout: Optional[float] = None) -> ParallelScanner:
+    """
+    Заменить глобальный сканер сканером с новыми ограничениями
+
+    Args:
+        max_workers: Максимум одновременных запросов к файловой системе
+        timeout: Срок одного вызова по умолчанию (секунды)
+    """
+    global _scanner
+    if _scanner is not None:
+        _scanner.shutdown()
+    _scanner = ParallelScanner(max_workers, timeout)
+    return _scanner
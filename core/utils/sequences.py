@@ -0,0 +1,152 @@
+# atrain/core/utils/sequences.py
+"""
+Сворачивание файлов кадров в последовательности
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Файл кадра: голова, номер кадра, расширение (shot_v03.1001.exr)
+FRAME_FILE_RE = re.compile(r'^(.*[._])(\d+)(\.[^.]+)$')
+
+
+@dataclass
+class SequenceRecord:
+    """
+    Последовательность кадров или одиночный файл директории
+
+    Для одиночного файла (без номера кадра) frames пуст, а head - полное имя.
+    """
+    directory: str
+    head: str
+    tail: str = ''
+    padding: int = 0
+    frames: List[int] = field(default_factory=list)
+
+    @property
+    def is_sequence(self) -> bool:
+        """Есть ли у записи номера кадров"""
+        return bool(self.frames)
+
+    @property
+    def pattern(self) -> str:
+        """Имя в формате Nuke: shot_v03.%04d.exr"""
+        if not self.frames:
+            return self.head
+        frame = f"%0{self.padding}d" if self.padding > 1 else '%d'
+        return f"{self.head}{frame}{self.tail}"
+
+    @property
+    def hash_pattern(self) -> str:
+        """Имя с решетками: shot_v03.####.exr"""
+        if not self.frames:
+            return self.head
+        return f"{self.head}{'#' * max(self.padding, 1)}{self.tail}"
+
+    @property
+    def path(self) -> str:
+        """Полный путь с шаблоном кадра"""
+        return os.path.join(self.directory, self.pattern)
+
+    @property
+    def first_frame(self) -> Optional[int]:
+        return self.frames[0] if self.frames else None
+
+    @property
+    def last_frame(self) -> Optional[int]:
+        return self.frames[-1] if self.frames else None
+
+    @property
+    def frame_range(self) -> str:
+        """Диапазон кадров: 1001-1200"""
+        if not self.frames:
+            return ''
+        return f"{self.frames[0]}-{self.frames[-1]}"
+
+    @property
+    def missing(self) -> int:
+        """Количество пропущенных кадров внутри диапазона"""
+        if not self.frames:
+            return 0
+        return self.frames[-1] - self.frames[0] + 1 - len(self.frames)
+
+    @property
+    def file_count(self) -> int:
+        """Количество файлов записи"""
+        return len(self.frames) or 1
+
+    def missing_frames(self) -> List[int]:
+        """Номера пропущенных кадров"""
+        if not self.missing:
+            return []
+        present = set(self.frames)
+        return [frame for frame in range(self.frames[0], self.frames[-1] + 1)
+                if frame not in present]
+
+    def filename(self, frame: int) -> str:
+        """Имя файла конкретного кадра"""
+        return f"{self.head}{frame:0{self.padding}d}{self.tail}"
+
+    def filenames(self) -> List[str]:
+        """Имена всех файлов записи"""
+        if not self.frames:
+            return [self.head]
+        return [self.filename(frame) for frame in self.frames]
+
+
+def collapse_sequences(names: Iterable[str], directory: str = '') -> List[SequenceRecord]:
+    """
+    Свернуть имена файлов в последовательности за один проход
+
+    Файлы с одинаковыми головой и расширением объединяются. Паддинг - длина
+    самого короткого номера кадра, поэтому %04d покрывает и 1001, и 10000.
+
+    Args:
+        names: Имена записей директории
+        directory: Директория (сохраняется в записях)
+
+    Returns:
+        Записи, отсортированные по имени
+    """
+    groups: Dict[Tuple[str, str], List[str]] = {}
+    records = []
+
+    for name in names:
+        match = FRAME_FILE_RE.match(name)
+        if match is None:
+            records.append(SequenceRecord(directory, name))
+            continue
+        head, digits, tail = match.groups()
+        groups.setdefault((head, tail), []).append(digits)
+
+    for (head, tail), digits_list in groups.items():
+        records.append(SequenceRecord(
+            directory=directory,
+            head=head,
+            tail=tail,
+            padding=min(len(digits) for digits in digits_list),
+            frames=sorted(int(digits) for digits in digits_list)
+        ))
+
+    records.sort(key=lambda record: record.pattern)
+    return records
+
+
+def scan_sequences(directory: str) -> List[SequenceRecord]:
+    """
+    Прочитать директорию одним scandir и свернуть файлы в последовательности
+
+    Returns:
+        Записи файлов (поддиректории не включаются)
+    """
+    try:
+        with os.scandir(directory) as it:
+            names = [entry.name for entry in it if not entry.is_dir()]
+    except OSError as e:
+        print(f"Sequences: Cannot scan {directory}: {e}")
+        return []
+
+    return collapse_sequences(names, directory)
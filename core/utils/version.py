@@ -5,8 +5,12 @@
 
 import os
 import re
-import glob
-from typing import Optional, List, Tuple
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, List, Tuple
+
+from .sequences import SequenceRecord
+from .scanner import ParallelScanner, get_scanner
 
 
 # Паттерны версий
@@ -18,36 +22,145 @@ VERSION_PATTERNS = [
     r'[vV](\d+)\.',         # v01.
 ]
 
+# Все паттерны выше - частные случаи одного выражения. Буква перед "v"
+# не допускается, чтобы не принимать за версию "rev2" или "dev10"
+VERSION_RE = re.compile(r'(?<![A-Za-z])([vV])(\d+)')
+
+# Какое вхождение версии в пути считается основным
+VERSION_POLICY_LAST_IN_FILENAME = 'last_in_filename'  # последнее в имени файла
+VERSION_POLICY_FIRST = 'first'                        # первое в пути
+VERSION_POLICY_LAST = 'last'                          # последнее в пути
+
+VERSION_POLICIES = (VERSION_POLICY_LAST_IN_FILENAME, VERSION_POLICY_FIRST, VERSION_POLICY_LAST)
+DEFAULT_VERSION_POLICY = VERSION_POLICY_LAST_IN_FILENAME
 
-def extract_version(path: str) -> Optional[str]:
+
+@dataclass
+class VersionSpan:
+    """Вхождение версии в строке"""
+    start: int
+    end: int
+    number: int
+    padding: int
+    prefix: str
+    
+    @property
+    def text(self) -> str:
+        """Текст версии как в исходной строке"""
+        return self.format(self.number)
+    
+    def format(self, number: int, padding: Optional[int] = None) -> str:
+        """Версия с тем же префиксом и паддингом (или указанным)"""
+        return f"{self.prefix}{number:0{padding or self.padding}d}"
+    
+    def splice(self, path: str, replacement: str) -> str:
+        """Заменить это вхождение в строке"""
+        return path[:self.start] + replacement + path[self.end:]
+    
+    def component(self, path: str) -> Tuple[str, str, str]:
+        """
+        Компонент пути, содержащий это вхождение
+        
+        Для /show/v003/exr/shot.%04d.exr и версии в директории:
+        ('/show', 'v003', '/exr/shot.%04d.exr').
+        
+        Returns:
+            (родительская директория, имя компонента, остаток пути после него)
+        """
+        start = max(path.rfind('/', 0, self.start), path.rfind('\\', 0, self.start)) + 1
+        ends = [i for i in (path.find('/', self.end), path.find('\\', self.end)) if i >= 0]
+        end = min(ends) if ends else len(path)
+        
+        if start == 0:
+            directory = '.'
+        else:
+            directory = path[:start - 1] or path[0]
+        
+        return directory, path[start:end], path[end:]
+
+
+def parse_versions(path: str) -> List[VersionSpan]:
     """
-    Извлечь версию из пути
+    Найти все вхождения версий за один проход
     
     Args:
-        path: Путь к файлу
+        path: Путь или имя файла
         
     Returns:
-        Найденная версия в формате vXX или None
+        Вхождения слева направо
     """
     if not path:
+        return []
+    
+    return [
+        VersionSpan(
+            start=match.start(),
+            end=match.end(),
+            number=int(match.group(2)),
+            padding=len(match.group(2)),
+            prefix=match.group(1)
+        )
+        for match in VERSION_RE.finditer(path)
+    ]
+
+
+def find_version(path: str, policy: str = DEFAULT_VERSION_POLICY) -> Optional[VersionSpan]:
+    """
+    Найти основное вхождение версии
+    
+    Args:
+        path: Путь к файлу
+        policy: Политика выбора вхождения (VERSION_POLICIES)
+        
+    Returns:
+        Вхождение или None если версии нет
+    """
+    spans = parse_versions(path)
+    if not spans:
         return None
     
-    for pattern in VERSION_PATTERNS:
-        match = re.search(pattern, path, re.IGNORECASE)
-        if match:
-            version_num = int(match.group(1))
-            return f"v{version_num:02d}"
+    if policy == VERSION_POLICY_FIRST:
+        return spans[0]
+    
+    if policy == VERSION_POLICY_LAST:
+        return spans[-1]
+    
+    if policy == VERSION_POLICY_LAST_IN_FILENAME:
+        name_start = max(path.rfind('/'), path.rfind('\\')) + 1
+        in_filename = [span for span in spans if span.start >= name_start]
+        # Версия только в директориях (.../v003/shot.exr) - берем ближайшую к имени
+        return in_filename[-1] if in_filename else spans[-1]
+    
+    raise ValueError(f"Unknown version policy: {policy}")
+
+
+def extract_version(path: str, policy: str = DEFAULT_VERSION_POLICY) -> Optional[str]:
+    """
+    Извлечь версию из пути
+    
+    Args:
+        path: Путь к файлу
+        policy: Политика выбора вхождения
+        
+    Returns:
+        Найденная версия в формате vXX или None
+    """
+    span = find_version(path, policy)
+    if span:
+        return f"v{span.number:02d}"
     
     return None
 
 
-def increment_version(path: str, padding: int = 2) -> str:
+def increment_version(path: str, padding: Optional[int] = None,
+                      policy: str = DEFAULT_VERSION_POLICY) -> str:
     """
     Увеличить версию в пути
     
     Args:
         path: Путь к файлу
-        padding: Количество цифр в версии
+        padding: Количество цифр в версии (по умолчанию как в исходной)
+        policy: Политика выбора вхождения
         
     Returns:
         Путь с увеличенной версией
@@ -55,23 +168,14 @@ def increment_version(path: str, padding: int = 2) -> str:
     if not path:
         return path
     
-    current_version = extract_version(path)
-    if current_version:
-        # Извлекаем номер версии
-        version_num = int(current_version[1:])  # убираем 'v'
-        new_version = f"v{version_num + 1:0{padding}d}"
-        
-        # Заменяем старую версию на новую
-        for pattern in VERSION_PATTERNS:
-            new_path = re.sub(pattern, lambda m: new_version, path, flags=re.IGNORECASE)
-            if new_path != path:
-                return new_path
-    else:
-        # Если версии нет, добавляем v01
-        name, ext = os.path.splitext(path)
-        return f"{name}_v{1:0{padding}d}{ext}"
-    
-    return path
+    span = find_version(path, policy)
+    if span:
+        # Меняем только основное вхождение
+        return span.splice(path, span.format(span.number + 1, padding))
+    
+    # Если версии нет, добавляем v01
+    name, ext = os.path.splitext(path)
+    return f"{name}_v{1:0{padding or 2}d}{ext}"
 
 
 def get_next_available_version(path: str, check_exists: bool = True) -> str:
@@ -91,57 +195,86 @@ def get_next_available_version(path: str, check_exists: bool = True) -> str:
     if not check_exists:
         return increment_version(path)
     
-    directory = os.path.dirname(path)
-    if not directory:
-        directory = "."
+    return resolve_next_versions([path])[0]
+
+
+def resolve_next_versions(paths: List[str], timeout: Optional[float] = None,
+                          scanner: Optional[ParallelScanner] = None,
+                          storage_dir: Optional[Path] = None) -> List[str]:
+    """
+    Получить следующие доступные версии для набора путей
+    
+    Пути группируются по директориям, каждая директория сканируется ровно
+    один раз, разные директории - параллельно. Пути одного семейства получают
+    разные версии: каждый следующий элемент набора получает версию выше уже
+    выданных.
     
-    # Если директория не существует, возвращаем исходный путь
-    if not os.path.exists(directory):
-        current_version = extract_version(path)
-        if not current_version:
-            # Добавляем v01 если версии нет
+    Args:
+        paths: Базовые пути
+        timeout: Срок параллельного сканирования в секундах. Директории, не
+            прочитанные до срока или с ошибкой в потоке сканера, дочитываются
+            синхронно в вызывающем потоке - версия никогда не угадывается
+        scanner: Сканер (по умолчанию глобальный, get_scanner())
+        storage_dir: Директория хранилища для постоянного кеша сканирования
+            (обязательна при вызове не из главного потока)
+        
+    Returns:
+        Пути с доступными версиями в порядке входного списка
+    """
+    from .version_index import get_version_index, family_key
+    
+    # Кеш привязывается здесь, в вызывающем потоке: потоки сканера Nuke не трогают
+    index = get_version_index()
+    index.bind_storage(storage_dir)
+    scanner = scanner or get_scanner()
+    
+    # Путь без версии получает v01, дальше обрабатывается как остальные
+    prepared = []
+    for path in paths:
+        if path and find_version(path) is None:
             name, ext = os.path.splitext(path)
-            return f"{name}_v01{ext}"
-        return path
+            path = f"{name}_v01{ext}"
+        prepared.append(path)
+    
+    # Версия может быть в имени файла или в директории (.../v003/shot.%04d.exr):
+    # сканируется директория, в которой лежит компонент с версией
+    components = {}
+    for path in prepared:
+        if path and path not in components:
+            span = find_version(path)
+            directory, name, _rest = span.component(path)
+            components[path] = (span, directory, family_key(name))
     
-    # Ищем существующие версии
-    base_name = os.path.basename(path)
-    existing_versions = []
-    
-    for pattern in VERSION_PATTERNS:
-        # Создаем паттерн для поиска всех версий
-        search_pattern = re.sub(pattern, r'v*', base_name, flags=re.IGNORECASE)
-        if search_pattern != base_name:
-            search_path = os.path.join(directory, search_pattern)
-            existing_files = glob.glob(search_path)
-            
-            for file_path in existing_files:
-                version = extract_version(file_path)
-                if version:
-                    version_num = int(version[1:])
-                    existing_versions.append(version_num)
-            
-            if existing_versions:
-                break
-    
-    if existing_versions:
-        # Находим максимальную версию и увеличиваем
-        max_version = max(existing_versions)
-        next_version = f"v{max_version + 1:02d}"
+    directories = sorted({directory for _span, directory, _key in components.values()})
+    
+    scan = scanner.map(index.directory_versions, directories, timeout)
+    scanned = scan.results
+    for directory in sorted(set(scan.pending) | set(scan.errors)):
+        # Без списка версий нельзя выдать свободную: ошибка повторного чтения
+        # пробрасывается вызывающему, а не превращается в версию +1
+        scanned[directory] = index.directory_versions(directory)
+    
+    results = []
+    for path in prepared:
+        if not path:
+            results.append(path)
+            continue
+        
+        span, directory, key = components[path]
+        versions = scanned[directory].setdefault(key, set())
+        
+        if versions:
+            # Выше всех существующих и уже выданных в этом наборе
+            next_number = max(versions) + 1
+            new_path = span.splice(path, span.format(next_number))
+        else:
+            next_number = span.number
+            new_path = path
         
-        # Заменяем версию в пути
-        for pattern in VERSION_PATTERNS:
-            new_path = re.sub(pattern, next_version, path, flags=re.IGNORECASE)
-            if new_path != path:
-                return new_path
-    
-    # Если версий не найдено, добавляем v01
-    current_version = extract_version(path)
-    if not current_version:
-        name, ext = os.path.splitext(path)
-        return f"{name}_v01{ext}"
-    
-    return path
+        versions.add(next_number)
+        results.append(new_path)
+    
+    return results
 
 
 def validate_version_format(version_string: str) -> bool:
@@ -157,13 +290,16 @@ def validate_version_format(version_string: str) -> bool:
     if not version_string:
         return False
     
-    return bool(re.match(r'^[vV]\d{1,3}, version_string))
+    return bool(re.match(r'^[vV]\d{1,3}$', version_string))
 
 
 def get_version_history(path: str) -> List[Tuple[str, str]]:
     """
     Получить историю версий файла
     
+    Кадры последовательности не перечисляются по одному: каждая
+    последовательность версии - одна запись с шаблоном кадра (%04d).
+    
     Args:
         path: Путь к файлу
         
@@ -173,46 +309,78 @@ def get_version_history(path: str) -> List[Tuple[str, str]]:
     if not path:
         return []
     
-    directory = os.path.dirname(path)
-    if not directory:
-        directory = "."
+    history = []
+    for version_num, records in sorted(get_version_sequences(path).items()):
+        for record in records:
+            history.append((f"v{version_num:02d}", record.path))
     
-    if not os.path.exists(directory):
-        return []
+    return history
+
+
+def get_version_sequences(path: str,
+                          storage_dir: Optional[Path] = None) -> Dict[int, List[SequenceRecord]]:
+    """
+    Существующие версии файла в виде последовательностей кадров
+    
+    Поддерживает версию в имени файла (shot_v03.%04d.exr) и в директории
+    (.../v003/shot.%04d.exr): во втором случае перебираются директории
+    версий, и в каждой ищется последовательность с тем же именем.
+    
+    Args:
+        path: Путь к файлу любой версии
+        storage_dir: Директория хранилища для постоянного кеша сканирования
+            (обязательна при вызове не из главного потока)
+        
+    Returns:
+        Номер версии -> последовательности (с диапазонами и пропусками кадров)
+    """
+    from .version_index import get_version_index, family_key, sequence_key
+    
+    span = find_version(path) if path else None
+    if span is None:
+        return {}
+    
+    index = get_version_index()
+    index.bind_storage(storage_dir)
+    directory, name, rest = span.component(path)
+    found = index.directory_families(directory).get(family_key(name), {})
+    
+    if not rest:
+        return found
     
-    base_name = os.path.basename(path)
-    version_files = []
-    
-    # Создаем паттерн для поиска всех версий
-    for pattern in VERSION_PATTERNS:
-        search_pattern = re.sub(pattern, r'v*', base_name, flags=re.IGNORECASE)
-        if search_pattern != base_name:
-            search_path = os.path.join(directory, search_pattern)
-            existing_files = glob.glob(search_path)
-            
-            for file_path in existing_files:
-                version = extract_version(file_path)
-                if version:
-                    version_num = int(version[1:])
-                    version_files.append((version_num, version, file_path))
-            
-            if version_files:
-                break
-    
-    # Сортируем по номеру версии
-    version_files.sort(key=lambda x: x[0])
-    
-    # Возвращаем только версию и путь
-    return [(v[1], v[2]) for v in version_files]
+    # Версия в директории: ищем остаток пути внутри каждой директории версии
+    sub_path, filename = os.path.split(rest.lstrip('/\\'))
+    key = sequence_key(filename)
+    
+    # Директории версий читаются параллельно
+    version_dirs = {
+        os.path.join(directory, version_dir.pattern, sub_path): version_num
+        for version_num, dirs in found.items()
+        for version_dir in dirs
+    }
+    scan = get_scanner().map(index.directory_records, version_dirs)
+    
+    result = {}
+    for version_path, records in scan.results.items():
+        records = [record for record in records if sequence_key(record.pattern) == key]
+        if records:
+            result.setdefault(version_dirs[version_path], []).extend(records)
+    
+    for records in result.values():
+        records.sort(key=lambda record: record.path)
+    
+    return result
 
 
-def replace_version(path: str, new_version: str) -> str:
+def replace_version(path: str, new_version: str,
+                    policy: str = DEFAULT_VERSION_POLICY) -> str:
     """
     Заменить версию в пути
     
     Args:
         path: Исходный путь
         new_version: Новая версия (например, "v05")
+        policy: Политика выбора вхождения
         
     Returns:
         Путь с новой версией
@@ -223,19 +391,14 @@ def replace_version(path: str, new_version: str) -> str:
     if not validate_version_format(new_version):
         raise ValueError(f"Invalid version format: {new_version}")
     
-    current_version = extract_version(path)
-    if current_version:
-        # Заменяем существующую версию
-        for pattern in VERSION_PATTERNS:
-            new_path = re.sub(pattern, lambda m: new_version, path, flags=re.IGNORECASE)
-            if new_path != path:
-                return new_path
-    else:
-        # Добавляем версию если её нет
-        name, ext = os.path.splitext(path)
-        return f"{name}_{new_version}{ext}"
-    
-    return path
+    span = find_version(path, policy)
+    if span:
+        # Заменяем основное вхождение
+        return span.splice(path, new_version)
+    
+    # Добавляем версию если её нет
+    name, ext = os.path.splitext(path)
+    return f"{name}_{new_version}{ext}"
 
 
 def compare_versions(version1: str, version2: str) -> int:
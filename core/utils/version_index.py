@@ -0,0 +1,361 @@
+# atrain/core/utils/version_index.py
+"""
+Индекс версий файлов по директориям
+"""
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .version import VERSION_RE, find_version
+from .sequences import SequenceRecord, collapse_sequences
+
+
+# Номер кадра перед расширением: .1001.exr, _%04d.exr, .####.exr, .$F4.exr
+FRAME_RE = re.compile(r'([._])(?:\d+|#+|%0?\d*d|\$F\d*)(\.[^.]+)$')
+
+# Заменитель номера версии в ключе семейства
+VERSION_PLACEHOLDER = '\x00v'
+
+
+def sequence_key(filename: str) -> str:
+    """
+    Ключ имени без учета версий и номера кадра
+
+    shot_v01.1001.exr, shot_v02.%04d.exr и shot_v03.####.exr дают один ключ.
+    """
+    return FRAME_RE.sub(r'\1#\2', VERSION_RE.sub(VERSION_PLACEHOLDER, filename))
+
+
+def family_key(filename: str) -> Optional[str]:
+    """
+    Ключ семейства версий для имени файла
+
+    Версии и номер кадра заменяются заменителями, поэтому shot_v01.1001.exr,
+    shot_v02.%04d.exr и shot_v03.####.exr попадают в одно семейство.
+
+    Returns:
+        Ключ или None если в имени нет версии
+    """
+    if VERSION_RE.search(filename) is None:
+        return None
+    return sequence_key(filename)
+
+
+def parse_entry(filename: str) -> Optional[Tuple[str, int]]:
+    """
+    Разобрать имя записи директории
+
+    Returns:
+        (ключ семейства, номер версии) или None если версии нет
+    """
+    span = find_version(filename)
+    if span is None:
+        return None
+    return family_key(filename), span.number
+
+
+class _DirectoryEntry:
+    """Результат сканирования одной директории"""
+
+    __slots__ = ('mtime_ns', 'scanned_ns', 'records', 'families')
+
+    def __init__(self, mtime_ns: int, scanned_ns: int, records: List[SequenceRecord],
+                 families: Dict[str, Dict[int, List[SequenceRecord]]]):
+        self.mtime_ns = mtime_ns
+        self.scanned_ns = scanned_ns
+        self.records = records    # все записи директории
+        self.families = families  # ключ семейства -> версия -> записи
+
+
+class VersionIndex:
+    """
+    Кеш версий в директориях
+
+    Директория сканируется одним os.scandir, файлы кадров сворачиваются в
+    последовательности, и версия разбирается один раз на последовательность,
+    а не на каждый кадр. Результат хранится до изменения
+    mtime директории. Версии, созданные этим процессом (record), учитываются
+    сразу, не дожидаясь появления файлов на диске.
+
+    Результаты сканирования также сохраняются в постоянный кеш проекта
+    (ScanCache): другая сессия с холодным индексом берет их оттуда за один
+    stat директории. Кеш привязывается к директории хранилища через
+    bind_storage() в вызывающем потоке; потоки сканера используют
+    привязанный кеш и никогда не обращаются к Nuke.
+    """
+
+    def __init__(self, max_directories: int = 512, racy_window: float = 2.0,
+                 persistent: bool = True):
+        """
+        Args:
+            max_directories: Сколько директорий держать в кеше
+            racy_window: Если директория изменилась менее чем за столько секунд
+                до сканирования, результат перепроверяется (грубый mtime, NFS)
+            persistent: Использовать постоянный кеш сканирования проекта
+        """
+        self.max_directories = max_directories
+        self.racy_window_ns = int(racy_window * 1e9)
+        self.persistent = persistent
+
+        self._lock = threading.RLock()
+        self._entries: 'OrderedDict[str, _DirectoryEntry]' = OrderedDict()
+        self._pending: Dict[str, Dict[str, Set[int]]] = {}
+        self._bound_cache = None
+        self._bound_dir: Optional[str] = None
+
+    # =====================
+    # Запросы
+    # =====================
+
+    def versions(self, path: str) -> Dict[int, List[str]]:
+        """
+        Существующие версии семейства файла
+
+        Args:
+            path: Путь к файлу (любой версии семейства)
+
+        Returns:
+            Номер версии -> имена записей (последовательности в виде
+            shot_v03.%04d.exr; для зарезервированных версий - пустой список)
+        """
+        directory, filename = os.path.split(path)
+        directory = directory or '.'
+        key = family_key(filename)
+        if key is None:
+            return {}
+
+        entry = self._get_entry(directory)
+        with self._lock:
+            result = {
+                version: [record.pattern for record in records]
+                for version, records in (entry.families.get(key, {}) if entry else {}).items()
+            }
+            for version in self._pending.get(directory, {}).get(key, ()):
+                result.setdefault(version, [])
+            return result
+
+    def max_version(self, path: str) -> Optional[int]:
+        """Максимальная существующая версия семейства или None"""
+        versions = self.versions(path)
+        return max(versions) if versions else None
+
+    def directory_versions(self, directory: str) -> Dict[str, Set[int]]:
+        """
+        Номера версий всех семейств директории за одно сканирование
+
+        Включает версии, зарезервированные через record().
+        """
+        directory = directory or '.'
+        entry = self._get_entry(directory)
+        with self._lock:
+            result = {
+                key: set(family)
+                for key, family in (entry.families.items() if entry else ())
+            }
+            for key, versions in self._pending.get(directory, {}).items():
+                result.setdefault(key, set()).update(versions)
+            return result
+
+    def directory_families(self, directory: str) -> Dict[str, Dict[int, List[SequenceRecord]]]:
+        """Все семейства директории: ключ -> версия -> записи (копия)"""
+        entry = self._get_entry(directory or '.')
+        if entry is None:
+            return {}
+        return {
+            key: {version: list(records) for version, records in family.items()}
+            for key, family in entry.families.items()
+        }
+
+    def directory_records(self, directory: str) -> List[SequenceRecord]:
+        """Все записи директории, включая файлы без версии и поддиректории"""
+        entry = self._get_entry(directory or '.')
+        return list(entry.records) if entry else []
+
+    # =====================
+    # Обновление
+    # =====================
+
+    def record(self, path: str):
+        """
+        Учесть версию, созданную этим процессом
+
+        Версия сразу видна в versions() и переживает пересканирование,
+        пока файл не появится на диске. Для версии в директории
+        (.../v003/shot.%04d.exr) учитывается директория версии.
+        """
+        span = find_version(path)
+        if span is None:
+            return
+
+        directory, name, _rest = span.component(path)
+        key, version = family_key(name), span.number
+        with self._lock:
+            entry = self._entries.get(directory)
+            if entry is not None and version in entry.families.get(key, {}):
+                return
+            self._pending.setdefault(directory, {}).setdefault(key, set()).add(version)
+
+    def invalidate(self, directory: Optional[str] = None):
+        """Сбросить кеш директории (или весь кеш)"""
+        with self._lock:
+            if directory is None:
+                self._entries.clear()
+                self._pending.clear()
+            else:
+                self._entries.pop(directory, None)
+
+        scan_cache = self._scan_cache()
+        if scan_cache is not None:
+            if directory is None:
+                scan_cache.clear()
+            else:
+                scan_cache.remove(directory)
+
+    def bind_storage(self, storage_dir: Optional[Path] = None):
+        """
+        Привязать постоянный кеш к директории хранилища проекта
+
+        Args:
+            storage_dir: Уже разрешенная директория хранилища. Без нее директория
+                разрешается через текущий скрипт Nuke, но только в главном
+                потоке; в остальных потоках привязка не меняется
+        """
+        if not self.persistent:
+            return
+        if storage_dir is None:
+            if threading.current_thread() is not threading.main_thread():
+                return
+            from ..storage.file_storage import resolve_storage_directory
+            storage_dir = resolve_storage_directory()
+
+        directory = str(storage_dir)
+        with self._lock:
+            if directory == self._bound_dir:
+                return
+
+        from .scan_cache import get_scan_cache
+        scan_cache = get_scan_cache(Path(directory))
+        with self._lock:
+            self._bound_cache = scan_cache
+            self._bound_dir = directory
+
+    # =====================
+    # Внутренние методы
+    # =====================
+
+    def _get_entry(self, directory: str) -> Optional[_DirectoryEntry]:
+        """
+        Получить актуальный результат сканирования директории
+
+        Сканирование идет без блокировки, чтобы разные директории
+        можно было читать параллельно.
+        """
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._entries.pop(directory, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(directory)
+            if entry is not None and self._is_fresh(entry.mtime_ns, entry.scanned_ns, mtime_ns):
+                self._entries.move_to_end(directory)
+                return entry
+
+        entry = None
+        scan_cache = self._scan_cache()
+
+        if scan_cache is not None:
+            cached = scan_cache.get(directory)
+            if cached is not None and self._is_fresh(cached[0], cached[1], mtime_ns):
+                entry = self._make_entry(*cached)
+
+        if entry is None:
+            entry = self._scan(directory, mtime_ns)
+            if entry is None:
+                return None
+            if scan_cache is not None:
+                scan_cache.put(directory, entry.mtime_ns, entry.scanned_ns, entry.records)
+
+        with self._lock:
+            self._entries[directory] = entry
+            self._entries.move_to_end(directory)
+            while len(self._entries) > self.max_directories:
+                self._entries.popitem(last=False)
+
+            self._drop_seen_pending(directory, entry)
+
+        return entry
+
+    def _is_fresh(self, scanned_mtime_ns: int, scanned_ns: int, mtime_ns: int) -> bool:
+        """Можно ли доверять сканированию при текущем mtime директории"""
+        return scanned_mtime_ns == mtime_ns and scanned_ns - mtime_ns > self.racy_window_ns
+
+    def _scan_cache(self):
+        """Привязанный постоянный кеш сканирования или None (в главном потоке - привязывается)"""
+        if not self.persistent:
+            return None
+        if self._bound_dir is None:
+            self.bind_storage()
+        return self._bound_cache
+
+    @classmethod
+    def _scan(cls, directory: str, mtime_ns: int) -> Optional[_DirectoryEntry]:
+        """Прочитать директорию одним scandir и свернуть кадры в последовательности"""
+        scanned_ns = time.time_ns()
+
+        try:
+            with os.scandir(directory) as it:
+                names = [dir_entry.name for dir_entry in it]
+        except OSError as e:
+            print(f"VersionIndex: Cannot scan {directory}: {e}")
+            return None
+
+        return cls._make_entry(mtime_ns, scanned_ns, collapse_sequences(names, directory))
+
+    @staticmethod
+    def _make_entry(mtime_ns: int, scanned_ns: int,
+                    records: List[SequenceRecord]) -> _DirectoryEntry:
+        """Разобрать версии записей директории"""
+        families: Dict[str, Dict[int, List[SequenceRecord]]] = {}
+
+        for record in records:
+            parsed = parse_entry(record.pattern)
+            if parsed is None:
+                continue
+            key, version = parsed
+            families.setdefault(key, {}).setdefault(version, []).append(record)
+
+        return _DirectoryEntry(mtime_ns, scanned_ns, records, families)
+
+    def _drop_seen_pending(self, directory: str, entry: _DirectoryEntry):
+        """Забыть зарезервированные версии, которые появились на диске"""
+        pending = self._pending.get(directory)
+        if not pending:
+            return
+
+        for key in list(pending):
+            pending[key] -= set(entry.families.get(key, {}))
+            if not pending[key]:
+                del pending[key]
+
+        if not pending:
+            del self._pending[directory]
+
+
+# Глобальный экземпляр
+_version_index = None
+
+
+def get_version_index() -> VersionIndex:
+    """Получить глобальный индекс версий"""
+    global _version_index
+    if _version_index is None:
+        _version_index = VersionIndex()
+    return _version_index
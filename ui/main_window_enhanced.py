@@ -10,6 +10,10 @@ from PySide2 import QtWidgets, QtCore, QtGui
 from ..core.preset_manager import PresetManager
 from ..core.version_manager import VersionManager
 from ..core.event_bus import EventBus
+from ..core.utils import event_bus as atrain_event_bus
+from ..core.utils import get_version_prefetcher, get_version_reservations
+from ..core.utils.prefetch import VERSION_PREFETCHED_EVENT
+from ..core.storage import get_storage_manager
 from .styles import StyleManager
 from .widgets import TagListWidget, PresetListWidget
 
@@ -38,11 +42,24 @@ class ATrainWindow(QtWidgets.QDialog):
         self.tag_list_widget = None
         self.main_splitter = None
         
+        # Базовый путь, для которого в фоне разрешается следующая версия
+        self._prefetch_path = None
+        
         self.setup_ui()
         self.preset_list_widget.update_buttons_visibility(False)
         self.adjust_window_to_content()
         
         self.event_bus.subscribe('data_changed', self.on_data_changed)
+        atrain_event_bus().subscribe(VERSION_PREFETCHED_EVENT, self.on_version_prefetched)
+        
+        # Изменения настроек другими сессиями приходят точечными событиями
+        self.watched_storage = get_storage_manager()
+        self.watched_storage.start_watching()
+        
+        # Смена скрипта может сменить хранилище и набор слоев настроек
+        self.storage_sync_timer = QtCore.QTimer()
+        self.storage_sync_timer.timeout.connect(self.sync_watched_storage)
+        self.storage_sync_timer.start(1000)
         
         # Таймер для обновления Read нод
         self.read_info_timer = QtCore.QTimer()
@@ -124,6 +141,11 @@ class ATrainWindow(QtWidgets.QDialog):
         self.path_preview.setMaximumHeight(80)
         preview_layout.addWidget(self.path_preview)
         
+        # Прогноз следующей версии (разрешается в фоне)
+        self.version_preview = QtWidgets.QLabel("")
+        self.version_preview.setStyleSheet("color: #aaa; font-size: 10px;")
+        preview_layout.addWidget(self.version_preview)
+        
         preview_group.setLayout(preview_layout)
         layout.addWidget(preview_group, 0)
     
@@ -203,6 +225,11 @@ class ATrainWindow(QtWidgets.QDialog):
         self.basic_path_preview.setMaximumHeight(80)
         basic_preview_layout.addWidget(self.basic_path_preview)
         
+        # Прогноз следующей версии (разрешается в фоне)
+        self.basic_version_preview = QtWidgets.QLabel("")
+        self.basic_version_preview.setStyleSheet("color: #aaa; font-size: 10px;")
+        basic_preview_layout.addWidget(self.basic_version_preview)
+        
         self.basic_preview_group.setLayout(basic_preview_layout)
         layout.addWidget(self.basic_preview_group, 0)
     
@@ -433,6 +460,7 @@ class ATrainWindow(QtWidgets.QDialog):
                 current_path = path_chain.get_current_path(live_preview=False)
                 if self._is_widget_valid(self.path_preview):
                     self.path_preview.setText(current_path)
+                self.request_version_prefetch(current_path)
             else:
                 from ..core.path_builder import PathBuilder
                 path_builder = PathBuilder()
@@ -455,6 +483,7 @@ class ATrainWindow(QtWidgets.QDialog):
                 basic_path = path_builder.build_path()
                 if self._is_widget_valid(self.basic_path_preview):
                     self.basic_path_preview.setText(basic_path)
+                self.request_version_prefetch(basic_path)
         
         except Exception as e:
             error_msg = f"Error loading preset: {e}"
@@ -490,8 +519,11 @@ class ATrainWindow(QtWidgets.QDialog):
                 QtWidgets.QMessageBox.information(self, "Info", "No path built - load a preset first!")
                 return
             
-            # Используем VersionManager
-            incremented_path = VersionManager.get_next_available_version(current_path)
+            # Версия уже разрешена в фоне при загрузке пресета - берем прогноз
+            # как кандидата и резервируем атомарно
+            predicted = get_version_prefetcher().result(current_path)
+            claim = get_version_reservations().reserve(predicted or current_path)
+            incremented_path = claim.path
             
             # Создаем Write ноду
             from ..utils.quick_ops import QuickOperations
@@ -503,10 +535,12 @@ class ATrainWindow(QtWidgets.QDialog):
             )
             
             if write_node:
+                claim.settle()
                 version_str = VersionManager.extract_version_from_path(incremented_path)
                 # ИСПРАВЛЕНО: убрали уведомление, только в консоль
                 print(f"Created Write node: {write_node.name()} -> {os.path.basename(incremented_path)} ({version_str})")
             else:
+                claim.release()
                 QtWidgets.QMessageBox.critical(self, "Error", "Failed to create Write node")
                 
         except Exception as e:
@@ -557,6 +591,36 @@ class ATrainWindow(QtWidgets.QDialog):
                 self.path_preview.setText(path)
             else:
                 self.path_preview.setText("No path")
+        
+        self.request_version_prefetch(path)
+    
+    def request_version_prefetch(self, path):
+        """Запустить фоновое разрешение следующей версии для предпросмотра"""
+        if not path or path in ["No path - load a preset", "No path", "Error loading preset"]:
+            self._prefetch_path = None
+            self._set_version_preview("")
+            return
+        
+        self._prefetch_path = path
+        self._set_version_preview("Next version: resolving...")
+        get_version_prefetcher().request(path)
+    
+    def on_version_prefetched(self, data=None):
+        """Результат фонового разрешения версии"""
+        if not data or data.get('path') != self._prefetch_path:
+            return
+        
+        from ..core.utils.version import extract_version
+        next_path = data['next_path']
+        version = extract_version(next_path) or ''
+        self._set_version_preview(f"Next version: {version} ({os.path.basename(next_path)})")
+    
+    def _set_version_preview(self, text):
+        """Показать прогноз версии в обоих режимах"""
+        for label in (getattr(self, 'version_preview', None),
+                      getattr(self, 'basic_version_preview', None)):
+            if self._is_widget_valid(label):
+                label.setText(text)
     
     def toggle_live_preview(self, enabled):
         """Live preview переключение"""
@@ -606,11 +670,32 @@ class ATrainWindow(QtWidgets.QDialog):
         except:
             pass
     
+    def sync_watched_storage(self):
+        """Следить за хранилищем и слоями текущего скрипта"""
+        try:
+            manager = get_storage_manager()
+            if manager is not self.watched_storage:
+                self.watched_storage.stop_watching()
+                self.watched_storage = manager
+                manager.start_watching()
+                self.on_data_changed()
+            else:
+                # Повторный запуск только обновляет список слоев
+                manager.start_watching()
+        except Exception as e:
+            print(f"Error syncing watched storage: {e}")
+    
     def closeEvent(self, event):
         """Закрытие окна"""
         try:
             self.event_bus.unsubscribe('data_changed', self.on_data_changed)
+            atrain_event_bus().unsubscribe(VERSION_PREFETCHED_EVENT, self.on_version_prefetched)
             self.read_info_timer.stop()
+            self.storage_sync_timer.stop()
+            self.watched_storage.stop_watching()
+            for widget in (self.preset_list_widget, self.tag_list_widget):
+                if self._is_widget_valid(widget):
+                    widget.unsubscribe_storage_events()
         except:
             pass
         event.accept()
@@ -11,6 +11,7 @@ from PySide2 import QtWidgets, QtCore, QtGui
 from ..core.preset_manager import PresetManager
 from ..core.version_manager import VersionManager
 from ..core.event_bus import EventBus
+from ..core.utils import event_bus as atrain_event_bus
 from .styles import StyleManager
 
 class DebouncedSearchMixin:
@@ -40,6 +41,12 @@ class DebouncedSearchMixin:
 class BaseListWidget(QtWidgets.QWidget, DebouncedSearchMixin):
     """Базовый класс для списков"""
     
+    # События хранилища -> имя обработчика (переопределяется в наследниках)
+    STORAGE_EVENTS = {}
+    
+    # Показывать "(empty)" в пустой группе
+    SHOW_EMPTY_PLACEHOLDER = False
+    
     def __init__(self, parent=None):
         QtWidgets.QWidget.__init__(self, parent)
         DebouncedSearchMixin.__init__(self)
@@ -49,6 +56,134 @@ class BaseListWidget(QtWidgets.QWidget, DebouncedSearchMixin):
         
         self.current_data = {}
         self.filtered_data = {}
+        
+        # Элементы дерева для точечного обновления
+        self._group_items = {}  # группа -> элемент группы
+        self._entry_items = {}  # имя -> элементы записей
+    
+    def subscribe_storage_events(self):
+        """Подписаться на точечные события хранилища (в т.ч. внешние изменения)"""
+        for event_type, handler_name in self.STORAGE_EVENTS.items():
+            atrain_event_bus().subscribe(event_type, getattr(self, handler_name))
+    
+    def unsubscribe_storage_events(self):
+        """Отписаться от событий хранилища"""
+        for event_type, handler_name in self.STORAGE_EVENTS.items():
+            atrain_event_bus().unsubscribe(event_type, getattr(self, handler_name))
+    
+    def lookup_entries(self, name):
+        """Актуальные записи с именем name: список (группа, запись) - переопределяется"""
+        return []
+    
+    def create_entry_item(self, group_name, entry, flat):
+        """Элемент дерева для записи - переопределяется"""
+        raise NotImplementedError("Subclasses must implement create_entry_item")
+    
+    def update_entries(self, name):
+        """
+        Обновить записи с именем name после изменения в хранилище
+        
+        Меняются только затронутые элементы дерева; список целиком
+        перестраивается только при появлении новой группы.
+        """
+        entries = self.lookup_entries(name)
+        if any(group_name not in self.current_data for group_name, _entry in entries):
+            self.refresh_data()
+            return
+        
+        # Новая запись встает на место старой в той же группе
+        positions = {}
+        touched = set()
+        for group_name, group_entries in self.current_data.items():
+            for i, entry in enumerate(group_entries):
+                if entry.get('name') == name:
+                    positions.setdefault(group_name, i)
+            if group_name in positions:
+                self.current_data[group_name] = [
+                    entry for entry in group_entries if entry.get('name') != name
+                ]
+                touched.add(group_name)
+        
+        for group_name, entry in entries:
+            group_entries = self.current_data[group_name]
+            group_entries.insert(positions.pop(group_name, len(group_entries)), entry)
+            touched.add(group_name)
+        
+        if self.pending_search.strip():
+            # Плоский список поиска строится из данных в памяти
+            self.filter_items(self.pending_search)
+            return
+        
+        self.filtered_data = self.current_data
+        
+        for item in self._entry_items.pop(name, []):
+            parent = item.parent()
+            if parent is not None:
+                parent.removeChild(item)
+        
+        for group_name, entry in entries:
+            group_item = self._group_items.get(group_name)
+            if group_item is None:
+                self.refresh_data()
+                return
+            self._remove_placeholders(group_item)
+            index = next(i for i, e in enumerate(self.current_data[group_name]) if e is entry)
+            group_item.insertChild(index, self._track_item(entry, self.create_entry_item(
+                group_name, entry, flat=False
+            )))
+        
+        for group_name in touched:
+            self.update_group_item(group_name)
+    
+    def create_group_item(self, group_name):
+        """Элемент группы (заголовок с количеством заполняет update_group_item)"""
+        group_item = QtWidgets.QTreeWidgetItem()
+        group_item.setExpanded(True)
+        
+        font = group_item.font(0)
+        font.setBold(True)
+        group_item.setFont(0, font)
+        
+        self._group_items[group_name] = group_item
+        return group_item
+    
+    def update_group_item(self, group_name):
+        """Обновить заголовок группы и заглушку пустой группы"""
+        group_item = self._group_items.get(group_name)
+        if group_item is None:
+            return
+        
+        entries = self.filtered_data.get(group_name, [])
+        group_item.setText(0, f"{group_name} ({len(entries)})")
+        
+        self._remove_placeholders(group_item)
+        if not entries and self.SHOW_EMPTY_PLACEHOLDER:
+            empty_item = QtWidgets.QTreeWidgetItem(["(empty)"])
+            empty_item.setForeground(0, QtGui.QBrush(QtGui.QColor(128, 128, 128)))
+            font = empty_item.font(0)
+            font.setItalic(True)
+            empty_item.setFont(0, font)
+            empty_item.setFlags(QtCore.Qt.NoItemFlags)
+            group_item.addChild(empty_item)
+    
+    def reset_tree(self):
+        """Очистить дерево и индексы элементов"""
+        self.tree.clear()
+        self._group_items = {}
+        self._entry_items = {}
+    
+    def _track_item(self, entry, item):
+        """Запомнить элемент записи для точечного обновления"""
+        self._entry_items.setdefault(entry.get('name'), []).append(item)
+        return item
+    
+    @staticmethod
+    def _remove_placeholders(group_item):
+        """Убрать заглушки (элементы без данных) из группы"""
+        for i in reversed(range(group_item.childCount())):
+            child = group_item.child(i)
+            if child.data(0, QtCore.Qt.UserRole) is None:
+                group_item.removeChild(child)
     
     def setup_ui(self):
         """Настройка базового UI"""
@@ -118,6 +253,20 @@ class TagListWidget(BaseListWidget):
     
     tag_selected = QtCore.Signal(dict)
     
+    STORAGE_EVENTS = {
+        'tag_saved': 'on_tag_saved',
+        'tag_deleted': 'update_entries',
+        'tags_imported': 'refresh_data',
+        'tag_category_added': 'refresh_data',
+        'tag_category_removed': 'refresh_data',
+        'tag_category_renamed': 'refresh_data',
+        'tag_categories_updated': 'refresh_data',
+        'settings_restored': 'refresh_data',
+        'settings_imported': 'refresh_data'
+    }
+    
+    SHOW_EMPTY_PLACEHOLDER = True
+    
     def __init__(self, preset_manager, parent=None):
         super().__init__(parent)
         self.preset_manager = preset_manager
@@ -127,6 +276,7 @@ class TagListWidget(BaseListWidget):
         self.refresh_data()
         
         self.event_bus.subscribe('data_changed', self.refresh_data)
+        self.subscribe_storage_events()
     
     def force_refresh(self):
         """Принудительное обновление"""
@@ -137,9 +287,18 @@ class TagListWidget(BaseListWidget):
     def refresh_data(self, data=None):
         """Обновление данных тегов"""
         tags = self.preset_manager.get_all_tags_grouped()
-        self.current_data = tags
+        # Копия: представление закешировано хранилищем и меняется точечно
+        self.current_data = {group: list(group_tags) for group, group_tags in tags.items()}
         self.filter_items("")
     
+    def on_tag_saved(self, tag):
+        """Тег сохранен (здесь или другим процессом)"""
+        self.update_entries(tag.name)
+    
+    def lookup_entries(self, name):
+        """Актуальные теги с именем name"""
+        return self.preset_manager.get_tag_group_entries(name)
+    
     def filter_items(self, search_text):
         """Фильтрация тегов"""
         if not search_text:
@@ -159,7 +318,7 @@ class TagListWidget(BaseListWidget):
     
     def populate_tree(self):
         """Заполнение дерева тегов"""
-        self.tree.clear()
+        self.reset_tree()
         search_active = bool(self.pending_search.strip())
         
         for group_name, tags in self.filtered_data.items():
@@ -169,54 +328,35 @@ class TagListWidget(BaseListWidget):
             if search_active:
                 # Плоский список при поиске
                 for tag in tags:
-                    item = QtWidgets.QTreeWidgetItem()
-                    preview = self.get_tag_preview(tag)
-                    display_text = f"[{group_name}] {tag['name']}"
-                    if preview and preview != tag['name']:
-                        display_text += f" → {preview}"
-                    
-                    item.setText(0, display_text)
-                    item.setData(0, QtCore.Qt.UserRole, tag)
-                    
-                    color = self.get_tag_color(tag)
-                    item.setForeground(0, QtGui.QBrush(color))
-                    
-                    self.tree.addTopLevelItem(item)
+                    self.tree.addTopLevelItem(self._track_item(
+                        tag, self.create_entry_item(group_name, tag, flat=True)
+                    ))
             else:
                 # Группированный список
-                group_item = QtWidgets.QTreeWidgetItem([f"{group_name} ({len(tags)})"])
-                group_item.setExpanded(True)
-                
-                font = group_item.font(0)
-                font.setBold(True)
-                group_item.setFont(0, font)
-                
-                if not tags:
-                    empty_item = QtWidgets.QTreeWidgetItem(["(empty)"])
-                    empty_item.setForeground(0, QtGui.QBrush(QtGui.QColor(128, 128, 128)))
-                    font = empty_item.font(0)
-                    font.setItalic(True)
-                    empty_item.setFont(0, font)
-                    empty_item.setFlags(QtCore.Qt.NoItemFlags)
-                    group_item.addChild(empty_item)
-                else:
-                    for tag in tags:
-                        child_item = QtWidgets.QTreeWidgetItem()
-                        preview = self.get_tag_preview(tag)
-                        display_text = tag['name']
-                        if preview and preview != tag['name']:
-                            display_text += f" → {preview}"
-                        
-                        child_item.setText(0, display_text)
-                        child_item.setData(0, QtCore.Qt.UserRole, tag)
-                        
-                        color = self.get_tag_color(tag)
-                        child_item.setForeground(0, QtGui.QBrush(color))
-                        
-                        group_item.addChild(child_item)
+                group_item = self.create_group_item(group_name)
+                for tag in tags:
+                    group_item.addChild(self._track_item(
+                        tag, self.create_entry_item(group_name, tag, flat=False)
+                    ))
+                self.update_group_item(group_name)
                 
                 self.tree.addTopLevelItem(group_item)
     
+    def create_entry_item(self, group_name, tag, flat):
+        """Элемент дерева для тега"""
+        item = QtWidgets.QTreeWidgetItem()
+        preview = self.get_tag_preview(tag)
+        display_text = f"[{group_name}] {tag['name']}" if flat else tag['name']
+        if preview and preview != tag['name']:
+            display_text += f" → {preview}"
+        
+        item.setText(0, display_text)
+        item.setData(0, QtCore.Qt.UserRole, tag)
+        
+        color = self.get_tag_color(tag)
+        item.setForeground(0, QtGui.QBrush(color))
+        return item
+    
     def create_buttons(self):
         """Создание кнопок управления"""
         self.buttons_container = QtWidgets.QWidget()
@@ -591,6 +731,19 @@ class PresetListWidget(BaseListWidget):
     
     preset_selected = QtCore.Signal(str, dict)
     
+    STORAGE_EVENTS = {
+        'preset_saved': 'on_preset_saved',
+        'preset_deleted': 'update_entries',
+        'preset_renamed': 'on_preset_renamed',
+        'presets_imported': 'refresh_data',
+        'preset_category_added': 'refresh_data',
+        'preset_category_removed': 'refresh_data',
+        'preset_category_renamed': 'refresh_data',
+        'preset_categories_updated': 'refresh_data',
+        'settings_restored': 'refresh_data',
+        'settings_imported': 'refresh_data'
+    }
+    
     def __init__(self, preset_manager, parent_window, parent=None):
         super().__init__(parent)
         self.preset_manager = preset_manager
@@ -601,13 +754,28 @@ class PresetListWidget(BaseListWidget):
         self.refresh_data()
         
         self.event_bus.subscribe('data_changed', self.refresh_data)
+        self.subscribe_storage_events()
     
     def refresh_data(self, data=None):
         """Обновление данных пресетов"""
         presets = self.preset_manager.get_all_presets_grouped()
-        self.current_data = presets
+        # Копия: представление закешировано хранилищем и меняется точечно
+        self.current_data = {group: list(entries) for group, entries in presets.items()}
         self.filter_items("")
     
+    def on_preset_saved(self, preset):
+        """Пресет сохранен (здесь или другим процессом)"""
+        self.update_entries(preset.name)
+    
+    def on_preset_renamed(self, data):
+        """Пресет переименован"""
+        self.update_entries(data.get('old_name'))
+        self.update_entries(data.get('new_name'))
+    
+    def lookup_entries(self, name):
+        """Актуальный пресет с именем name"""
+        return self.preset_manager.get_preset_group_entries(name)
+    
     def filter_items(self, search_text):
         """Фильтрация пресетов"""
         if not search_text:
@@ -631,7 +799,7 @@ class PresetListWidget(BaseListWidget):
     
     def populate_tree(self):
         """Заполнение дерева пресетов"""
-        self.tree.clear()
+        self.reset_tree()
         search_active = bool(self.pending_search.strip())
         
         for group_name, presets in self.filtered_data.items():
@@ -641,45 +809,37 @@ class PresetListWidget(BaseListWidget):
             if search_active:
                 # Плоский список при поиске
                 for preset in presets:
-                    item = QtWidgets.QTreeWidgetItem()
-                    name = preset.get('name', 'Unknown')
-                    tags_count = preset.get('tags_count', 0)
-                    format_type = preset.get('format', 'exr')
-                    
-                    display_text = f"[{group_name}] {name} ({tags_count} tags, {format_type})"
-                    item.setText(0, display_text)
-                    item.setData(0, QtCore.Qt.UserRole, preset)
-                    
-                    color = self.get_preset_color(preset)
-                    item.setForeground(0, QtGui.QBrush(color))
-                    
-                    self.tree.addTopLevelItem(item)
+                    self.tree.addTopLevelItem(self._track_item(
+                        preset, self.create_entry_item(group_name, preset, flat=True)
+                    ))
             else:
                 # Группированный список
-                group_item = QtWidgets.QTreeWidgetItem([f"{group_name} ({len(presets)})"])
-                group_item.setExpanded(True)
-                
-                font = group_item.font(0)
-                font.setBold(True)
-                group_item.setFont(0, font)
-                
+                group_item = self.create_group_item(group_name)
                 for preset in presets:
-                    child_item = QtWidgets.QTreeWidgetItem()
-                    name = preset.get('name', 'Unknown')
-                    tags_count = preset.get('tags_count', 0)
-                    format_type = preset.get('format', 'exr')
-                    
-                    display_text = f"{name} ({tags_count} tags, {format_type})"
-                    child_item.setText(0, display_text)
-                    child_item.setData(0, QtCore.Qt.UserRole, preset)
-                    
-                    color = self.get_preset_color(preset)
-                    child_item.setForeground(0, QtGui.QBrush(color))
-                    
-                    group_item.addChild(child_item)
+                    group_item.addChild(self._track_item(
+                        preset, self.create_entry_item(group_name, preset, flat=False)
+                    ))
+                self.update_group_item(group_name)
                 
                 self.tree.addTopLevelItem(group_item)
     
+    def create_entry_item(self, group_name, preset, flat):
+        """Элемент дерева для пресета"""
+        item = QtWidgets.QTreeWidgetItem()
+        name = preset.get('name', 'Unknown')
+        tags_count = preset.get('tags_count', 0)
+        format_type = preset.get('format', 'exr')
+        
+        display_text = f"{name} ({tags_count} tags, {format_type})"
+        if flat:
+            display_text = f"[{group_name}] {display_text}"
+        item.setText(0, display_text)
+        item.setData(0, QtCore.Qt.UserRole, preset)
+        
+        color = self.get_preset_color(preset)
+        item.setForeground(0, QtGui.QBrush(color))
+        return item
+    
     def get_preset_color(self, preset):
         """Получить цвет пресета"""
         if preset.get('source') == 'default':